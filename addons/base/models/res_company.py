@@ -4,6 +4,7 @@ from core.fields import Char, Many2one
 class ResCompany(Model):
     _name = 'res.company'
     _description = 'Company'
+    _cache_records = True
 
     name = Char(string='Company Name', required=True)
     currency_id = Many2one('res.currency', string='Currency', required=True)
@@ -4,6 +4,8 @@ from core.fields import Char, Float, Boolean
 class ResCurrency(Model):
     _name = 'res.currency'
     _description = 'Currency'
+    _cache_records = True
+    _cache_search = True
 
     name = Char(string='Currency', required=True)
     symbol = Char(string='Symbol', required=True)
@@ -4,6 +4,8 @@ from core.fields import Char, Boolean, Selection
 class ResLang(Model):
     _name = 'res.lang'
     _description = 'Languages'
+    _cache_records = True
+    _cache_search = True
     
     name = Char(string='Name', required=True)
     code = Char(string='Locale Code', required=True) # e.g. en_US, es_ES
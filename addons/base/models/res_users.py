@@ -2,11 +2,13 @@ from core.orm import Model
 from core.fields import Char, Many2one
 from core.orm import Model
 from core.fields import Char, Many2one, Many2many
-from core.auth import verify_password, get_password_hash
+from core.auth import verify_password_async, get_password_hash_async
 
 class ResUsers(Model):
     _name = 'res.users'
     _description = 'Users'
+    _cache_records = True
+    _cache_records_exclude = ('password',)
 
     login = Char(string="Login", required=True)
     password = Char(string="Password")
@@ -34,13 +36,13 @@ class ResUsers(Model):
         
         for vals in vals_seq:
             if 'password' in vals:
-                vals['password'] = get_password_hash(vals['password'])
+                vals['password'] = await get_password_hash_async(vals['password'])
         
         return await super().create(vals_list)
     
     async def write(self, vals):
         if 'password' in vals:
-            vals['password'] = get_password_hash(vals['password'])
+            vals['password'] = await get_password_hash_async(vals['password'])
         return await super().write(vals)
 
     async def _check_credentials(self, login, password):
@@ -65,7 +67,7 @@ class ResUsers(Model):
 
         # 1. Try Hash Verification (The Secure Way)
         try:
-            if verify_password(password, stored_password):
+            if await verify_password_async(password, stored_password):
                 return user_id
         except ValueError:
             # Stored password is not a valid hash (likely plaintext)
@@ -77,7 +79,7 @@ class ResUsers(Model):
         if stored_password == password:
             print(f"SECURITY ALERT: User {login} using plaintext password. Migrating to Hash...", flush=True)
             
-            new_hash = get_password_hash(password)
+            new_hash = await get_password_hash_async(password)
             
             # Direct SQL Update to bypass ORM loop/overhead
             table = self._table
@@ -97,6 +99,10 @@ class ResUsers(Model):
         """
         if not self: return []
         
+        # Already resolved for the request user by Environment.bootstrap()
+        if self.id == self.env.uid and getattr(self.env, 'user_group_ids', None) is not None:
+            return list(self.env.user_group_ids)
+        
         # Start with direct groups
         # We use explicit SQL for performance and to avoid infinite recursion issues 
         # if the ORM tries to check access rights while computing groups.
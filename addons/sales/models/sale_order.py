@@ -29,13 +29,16 @@ class SaleOrder(Model):
             total += (line.product_uom_qty or 0.0) * (line.price_unit or 0.0)
         self.amount_total = total
 
-    async def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            # Use Sequence
-            seq = await self.env['ir.sequence'].next_by_code('sale.order') or 'New'
-            vals['name'] = seq
-            
-        return await super().create(vals)
+    async def create(self, vals_list):
+        if isinstance(vals_list, dict):
+            vals_list = [vals_list]
+        for vals in vals_list:
+            if vals.get('name', 'New') == 'New':
+                # Use Sequence
+                seq = await self.env['ir.sequence'].next_by_code('sale.order') or 'New'
+                vals['name'] = seq
+
+        return await super().create(vals_list)
 
     async def action_confirm(self):
         await self.write({'state': 'confirm'})
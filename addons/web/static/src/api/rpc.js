@@ -11,20 +11,31 @@ function log(msg) {
 
 export const rpc = {
     async call(model, method, args = [], kwargs = {}) {
+        log(`RPC Call: ${model}.${method}`);
+        return this._post('/web/dataset/call_kw', { model, method, args, kwargs });
+    },
+
+    /**
+     * Several calls in one HTTP request and one server transaction.
+     * calls: [{model, method, args, kwargs}, ...] (run in order)
+     * Default: all-or-nothing, resolves to the list of results.
+     * { savepoints: true }: each call commits or fails on its own,
+     * resolves to [{result} | {error}, ...].
+     */
+    async batch(calls, { savepoints = false } = {}) {
+        log(`RPC Batch: ${calls.map(c => `${c.model}.${c.method}`).join(', ')}`);
+        const entries = await this._post('/web/dataset/call_kw_batch', { calls, savepoints });
+        return savepoints ? entries : entries.map(e => e.result);
+    },
+
+    async _post(url, params) {
         const payload = {
             jsonrpc: "2.0",
             method: "call",
-            params: {
-                model,
-                method,
-                args,
-                kwargs
-            },
+            params,
             id: Math.floor(Math.random() * 1000000)
         };
 
-        log(`RPC Call: ${model}.${method}`);
-
         // CSRF Token Management
         let csrfToken = localStorage.getItem('csrf_token');
         if (!csrfToken) {
@@ -45,7 +56,7 @@ export const rpc = {
 
         let response;
         try {
-            response = await fetch('/web/dataset/call_kw', {
+            response = await fetch(url, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
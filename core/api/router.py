@@ -1,35 +1,72 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from core.db_async import AsyncDatabase
+from core.pool import PoolGate
 from core.env import Environment
-from core.api.schema import get_pydantic_model, GenericResponse, LoginRequest, CallKwRequest
+from core.api.schema import get_pydantic_model, GenericResponse, LoginRequest, CallKwRequest, BatchRequest
+from core import rpc, sql_stats, profiler
 from core.session import Session, get_session
 from typing import List, Any
+from contextlib import asynccontextmanager
 from pydantic import ValidationError
 import logging
-import inspect
+
+from core.logger import category_logger
 
 api_router = APIRouter(prefix="/api")
+_logger = category_logger('http')
 
 # Dependency to get Async Env
-async def get_env(session: Session = Depends(get_session)):
+@asynccontextmanager
+async def _env(session, http_request, readonly=False, method=None):
     uid = session.uid
     context = session.context
     
-    async with AsyncDatabase.acquire() as cr:
-         if uid:
-             await cr.execute(f"SET LOCAL app.current_uid = '{uid}'")
-         
-         env = Environment(cr, uid=uid, context=context)
-         if uid:
-             await env.prefetch_user()
+    # Sampling profiler covers the endpoint too (same task)
+    with profiler.profiling(http_request.url.path, uid, http_request.headers.get(profiler.HEADER), method):
+        # Connection taken on the first query only
+        async with AsyncDatabase.cursor(readonly=readonly, uid=uid, priority=PoolGate.API) as cr:
+             env = Environment(cr, uid=uid, context=context)
+             if uid:
+                 # RLS GUC + user/company/groups in one round trip
+                 await env.bootstrap()
+             yield env
+    sql_stats.report(http_request.url.path, cr.stats, method=method)
+
+async def get_env(http_request: Request, session: Session = Depends(get_session)):
+    async with _env(session, http_request) as env:
+         yield env
+
+async def get_readonly_env(http_request: Request, session: Session = Depends(get_session)):
+    # READ ONLY transaction, on the replica when configured
+    async with _env(session, http_request, readonly=True) as env:
          yield env
 
+async def _run_rpc(session, http_request, readonly, method, fn):
+    """
+    fn(env) in a transaction, READ ONLY (replica) when the call(s) look like
+    pure reads. A misclassified method that writes is replayed read-write on
+    the primary, like the /web routes (see http_fastapi).
+    """
+    try:
+        async with _env(session, http_request, readonly=readonly, method=method) as env:
+            return await fn(env)
+    except AsyncDatabase.READONLY_ERRORS:
+        if not readonly: raise
+        _logger.warning(f"WARNING: Readonly call {method or http_request.url.path} attempted a write, retrying on primary")
+        async with _env(session, http_request, readonly=False, method=method) as env:
+            return await fn(env)
+
 @api_router.post("/call", response_model=GenericResponse)
-async def call(request: CallKwRequest, env: Environment = Depends(get_env)):
+async def call(request: CallKwRequest, http_request: Request, session: Session = Depends(get_session)):
     """
     Generic execution endpoint.
     JSON: {model, method, args, kwargs}
     """
+    method = f"{request.model}.{request.method}"
+    return await _run_rpc(session, http_request, rpc.is_readonly_call(request.method), method,
+                          lambda env: _call(request, env))
+
+async def _call(request, env):
     uid = env.uid
     model_name = request.model
     method_name = request.method
@@ -42,40 +79,45 @@ async def call(request: CallKwRequest, env: Environment = Depends(get_env)):
     if not env.registry.get(model_name):
          raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
          
-    Model = env[model_name]
-    
     try:
-         # Handle Instance Methods (args[0] is list of IDs)
-         instance_methods = ['read', 'write', 'unlink', 'check_access_rights', 'name_get']
-         is_instance_call = method_name in instance_methods or (args and isinstance(args[0], list) and method_name not in ['search', 'search_count', 'create', 'search_read', 'name_search'])
-         
-         if is_instance_call and args and isinstance(args[0], list):
-             ids = args[0]
-             method_args = args[1:]
-             record = Model.browse(ids)
-             method = getattr(record, method_name)
-             result = method(*method_args, **kwargs)
-         else:
-             method = getattr(Model, method_name)
-             result = method(*args, **kwargs)
-         
-         if inspect.iscoroutine(result):
-             result = await result
-
-         if hasattr(result, 'ids'):
-              result = result.ids
-              
+         result = await rpc.call_kw(env, model_name, method_name, args, kwargs)
          return GenericResponse(success=True, data=result)
          
+    except rpc.UNHANDLED_ERRORS:
+         raise
     except Exception as e:
          import traceback
          traceback.print_exc()
          return GenericResponse(success=False, message=str(e))
 
+@api_router.post("/batch", response_model=GenericResponse)
+async def batch(request: BatchRequest, http_request: Request, session: Session = Depends(get_session)):
+    """
+    Ordered calls in one transaction and one Environment.
+    JSON: {calls: [{model, method, args, kwargs}, ...], savepoints: false}
+    data: [{result} | {error}, ...] in call order. Without savepoints the batch
+    is all-or-nothing: success=False and data stops at the failing call.
+    """
+    readonly = all(rpc.is_readonly_call(c.method) for c in request.calls)
+    return await _run_rpc(session, http_request, readonly, None, lambda env: _batch(request, env))
+
+async def _batch(request, env):
+    calls = [c.dict() for c in request.calls]
+    try:
+         results, failure = await rpc.call_kw_batch(env, calls, savepoints=request.savepoints)
+    except rpc.RpcError as e:
+         raise HTTPException(status_code=400, detail=str(e))
+
+    if failure:
+         index, error_data = failure
+         results.append({'error': error_data})
+         return GenericResponse(success=False, data=results, message=f"Call {index} failed: {error_data['message']}")
+    return GenericResponse(success=True, data=results)
+
 @api_router.post("/login", response_model=GenericResponse)
 async def login(request: LoginRequest, session: Session = Depends(get_session)):
     # 1. Create Sudo Env for Auth Check
-    async with AsyncDatabase.acquire() as cr:
+    async with AsyncDatabase.acquire(priority=PoolGate.API) as cr:
          sudo_env = Environment(cr, uid=1)
          Users = sudo_env['res.users']
          
@@ -83,11 +125,12 @@ async def login(request: LoginRequest, session: Session = Depends(get_session)):
          uid = await Users._check_credentials(request.login, request.password)
          
          if uid:
-             session.rotate()
+             await session.rotate()
              session.uid = uid
              session.login = request.login
-             session.save()
-             return GenericResponse(success=True, data={'uid': uid, 'session_id': session.sid})
+             await session.save()
+             # Signed stateless token: read-only API clients can skip the session store
+             return GenericResponse(success=True, data={'uid': uid, 'session_id': session.sid, 'token': session.issue_token()})
          else:
              # return 401? Or success=False?
              # GenericResponse suggests success=False logic usually?
@@ -96,7 +139,7 @@ async def login(request: LoginRequest, session: Session = Depends(get_session)):
              raise HTTPException(status_code=401, detail="Access Denied")
 
 @api_router.get("/{model}", response_model=GenericResponse)
-async def list_records(model: str, env: Environment = Depends(get_env)):
+async def list_records(model: str, env: Environment = Depends(get_readonly_env)):
     if not env.registry.get(model):
         raise HTTPException(status_code=404, detail="Model not found")
         
@@ -107,7 +150,7 @@ async def list_records(model: str, env: Environment = Depends(get_env)):
     return GenericResponse(success=True, data=data)
 
 @api_router.get("/{model}/{id}", response_model=GenericResponse)
-async def read_record(model: str, id: int, env: Environment = Depends(get_env)):
+async def read_record(model: str, id: int, env: Environment = Depends(get_readonly_env)):
     if not env.registry.get(model):
         raise HTTPException(status_code=404, detail="Model not found")
         
@@ -71,3 +71,7 @@ class CallKwRequest(BaseModel):
     args: List[Any] = []
     kwargs: Dict[str, Any] = {}
 
+class BatchRequest(BaseModel):
+    calls: List[CallKwRequest]
+    savepoints: bool = False
+
@@ -1,4 +1,6 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from jose import jwt
 from datetime import datetime, timedelta
 from typing import Optional
@@ -49,6 +51,26 @@ def get_password_hash(password):
     """Genera un hash seguro para la contraseña."""
     return pwd_context.hash(password)
 
+# Argon2/bcrypt are deliberately slow (tens to hundreds of ms) and release the
+# GIL: hash in a bounded thread pool so a burst of logins never blocks the loop.
+# Extra requests wait for a worker instead of adding CPU load.
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+_hash_executor = None
+
+def _executor():
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='nexo-hash')
+    return _hash_executor
+
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """get_password_hash off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor(), get_password_hash, password)
+
 def needs_update(hashed_password):
     """Verifica si el hash usa un algoritmo obsoleto (opcional pero recomendado)."""
     return pwd_context.needs_update(hashed_password)
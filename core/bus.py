@@ -1,42 +1,191 @@
-
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, Set
+import asyncio
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+class ClientConnection:
+    """
+    One connected browser.
+    Holds its subscriptions, a bounded send queue and the writer task draining it,
+    so a slow socket only ever delays itself.
+    """
+    QUEUE_SIZE = 256
+    SEND_TIMEOUT = 10 # seconds before a stuck client is dropped
+
+    def __init__(self, websocket: WebSocket, queue_size=None):
+        self.websocket = websocket
+        # {model: None (all records) | set(ids)}
+        # Until its first subscribe a client gets everything (clients predating subscriptions)
+        self.subscriptions: Dict[str, Set[int]] = {'*': None}
+        self.implicit = True
+        self.queue = asyncio.Queue(maxsize=queue_size or self.QUEUE_SIZE)
+        self.dropped = 0
+        self.task = None
+
+    def matches(self, model, ids_set, ranges):
+        """
+        ids_set/ranges come from the (compact) notification; ids_set None = model-wide.
+        """
+        if '*' in self.subscriptions: return True
+        if model not in self.subscriptions: return False
+        wanted = self.subscriptions[model]
+        if wanted is None or ids_set is None: return True
+        for rid in wanted:
+            if rid in ids_set: return True
+            for start, end in ranges:
+                if start <= rid <= end: return True
+        return False
+
+    def push(self, message, payload):
+        """
+        Non-blocking enqueue. On overflow, pending messages are merged into a
+        single 'overflow' notice listing the models the client must reload.
+        """
+        try:
+            self.queue.put_nowait((message, payload))
+            return
+        except asyncio.QueueFull:
+            pass
+
+        models = set()
+        while not self.queue.empty():
+            pending, _ = self.queue.get_nowait()
+            self.dropped += 1
+            if pending.get('type') == 'overflow':
+                models.update(pending.get('models', []))
+            elif pending.get('model'):
+                models.add(pending['model'])
+        if message.get('model'):
+            models.add(message['model'])
+
+        notice = {'type': 'overflow', 'models': sorted(models)}
+        self.queue.put_nowait((notice, json.dumps(notice)))
+
+    async def writer(self, on_error):
+        try:
+            while True:
+                _, payload = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(payload), self.SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to send to client: {e}")
+            on_error(self.websocket)
+
+
 class NotificationBus:
     def __init__(self):
-        self.connections: List[WebSocket] = []
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        # Subscription Index: model -> clients ('*' = every model)
+        self._by_model: Dict[str, Set[ClientConnection]] = {}
+        self.dropped = 0 # Messages dropped by clients since disconnected (metrics)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.connections.append(websocket)
+        client = ClientConnection(websocket)
+        self.connections[websocket] = client
+        self._by_model.setdefault('*', set()).add(client)
+        client.task = asyncio.create_task(client.writer(self.disconnect))
         logger.info(f"WebSocket Client connected. Active: {len(self.connections)}")
+        return client
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.connections:
-            self.connections.remove(websocket)
-            logger.info(f"WebSocket Client disconnected. Active: {len(self.connections)}")
+        client = self.connections.pop(websocket, None)
+        if client is None: return
+        self.dropped += client.dropped
+        for model in client.subscriptions:
+            subscribers = self._by_model.get(model)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers: del self._by_model[model]
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        logger.info(f"WebSocket Client disconnected. Active: {len(self.connections)}")
+
+    def subscribe(self, websocket: WebSocket, model, ids=None):
+        """
+        Subscribe to changes of a model ('*' for all), optionally restricted to ids.
+        Subscribing without ids widens an existing ids subscription to the whole model.
+        The first subscribe replaces the implicit '*' of a new connection.
+        """
+        client = self.connections.get(websocket)
+        if client is None or not model: return
+        if client.implicit:
+            client.implicit = False
+            self.unsubscribe(websocket, '*')
+
+        if ids and client.subscriptions.get(model, set()) is not None:
+            client.subscriptions.setdefault(model, set()).update(ids)
+        else:
+            client.subscriptions[model] = None
+        self._by_model.setdefault(model, set()).add(client)
+
+    def unsubscribe(self, websocket: WebSocket, model):
+        client = self.connections.get(websocket)
+        if client is None: return
+        client.implicit = False
+        client.subscriptions.pop(model, None)
+        subscribers = self._by_model.get(model)
+        if subscribers is not None:
+            subscribers.discard(client)
+            if not subscribers: del self._by_model[model]
+
+    def handle_message(self, websocket: WebSocket, text):
+        """
+        Client protocol: {"action": "subscribe"|"unsubscribe", "model", "ids"}
+        model: str ('*' for all models); ids: list of ints, absent on '*'.
+        Malformed messages are ignored (the connection stays open).
+        Returns True when the message was applied.
+        """
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return False
+        if not isinstance(data, dict): return False
+
+        action = data.get('action')
+        model = data.get('model')
+        ids = data.get('ids')
+        if not isinstance(model, str) or not model:
+            logger.debug(f"WS message ignored (model must be a string): {text[:200]}")
+            return False
+        if action == 'subscribe':
+            valid_ids = ids is None or (
+                isinstance(ids, list) and model != '*'
+                and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+            )
+            if not valid_ids:
+                logger.debug(f"WS message ignored (ids must be a list of ints, not on '*'): {text[:200]}")
+                return False
+            self.subscribe(websocket, model, ids)
+            return True
+        elif action == 'unsubscribe':
+            self.unsubscribe(websocket, model)
+            return True
+        return False
 
     async def broadcast(self, message: dict):
         """
-        Send a message to all connected clients.
+        Fan a message out to the subscribed clients.
+        Encoded once; delivery is done by each client's writer task, so this never
+        waits on a socket.
         """
+        model = message.get('model')
+        targets = set(self._by_model.get('*', ()))
+        targets.update(self._by_model.get(model, ()))
+        if not targets: return
+
         payload = json.dumps(message)
-        dead_connections = []
-        
-        for connection in list(self.connections):
-            try:
-                # Direct send of text (JSON)
-                await connection.send_text(payload)
-            except Exception as e:
-                logger.warning(f"Failed to send to client: {e}")
-                dead_connections.append(connection)
-                
-        for dead in dead_connections:
-            self.disconnect(dead)
+        ids = message.get('ids')
+        ids_set = set(ids) if ids is not None else None
+        ranges = message.get('ranges') or ()
+
+        for client in targets:
+            if client.matches(model, ids_set, ranges):
+                client.push(message, payload)
 
 # Global Instance
 bus = NotificationBus()
@@ -1,7 +1,13 @@
 import os
+import sys
 import json
+import math
+import time
+import random
+import uuid
 import logging
 import asyncio
+from collections import OrderedDict
 
 # Use redis.asyncio for non-blocking I/O
 try:
@@ -10,8 +16,145 @@ except ImportError:
     # Fallback if older redis installed (though requirements has 'redis')
     import redis
 
+from core.codec import get_codec, cache_key, CacheCodec
+from core.logger import category_logger
+
+_logger = category_logger('cache')
+
+_MISSING = object()
+
+def _estimate_size(value):
+    """
+    Cheap approximation of the memory held by a cached value (bytes).
+    """
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class MemoryStore:
+    """
+    Bounded L1 store: LRU by entry count and approximate bytes, with per-entry TTL.
+    Supports the dict operations the cache layer uses (in, [], del, keys, pop).
+    """
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, on_evict=None):
+        self._data = OrderedDict() # key -> (value, expires_at, size)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict # Called with key when the store drops an entry itself
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None, size=None):
+        if key in self._data:
+            self._discard(key)
+        if size is None:
+            size = _estimate_size(value)
+        if size > self.max_bytes:
+            return # Never let one entry flush the whole store
+            
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at, size)
+        self.bytes += size
+        
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None: return default
+        self._discard(key)
+        return entry[0]
+
+    def _discard(self, key):
+        _, _, size = self._data.pop(key)
+        self.bytes -= size
+
+    def _drop(self, key):
+        self._discard(key)
+        if self.on_evict:
+            self.on_evict(key)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        if entry is None: return False
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return False
+        return True
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING: raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if key not in self._data: raise KeyError(key)
+        self._discard(key)
+
+    def __len__(self):
+        return len(self._data)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._data),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
 class RedisCache:
     _instance = None
+    # Cross-process L1 coherence: every L1-affecting mutation is published here
+    INVALIDATION_CHANNEL = 'cache:invalidate'
+    # Local copies of namespace generations are re-read at least this often (seconds)
+    NS_REFRESH = 30
+    # get_or_compute: cross-process recompute lease and how long expired values may still be served
+    LOCK_LEASE = 5
+    LOCK_POLL = 0.05
+    STALE_TTL = 60
+    # Compare-and-delete so a lease that expired mid-compute can't free someone else's lock
+    _UNLOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    # L2 value serializer (CACHE_CODEC=binary|json); values are framed, so both stay readable
+    codec = get_codec(os.getenv('CACHE_CODEC'), int(os.getenv('CACHE_COMPRESS_MIN', 1024)))
+    # Client without response decoding, for reading framed binary values
+    redis_raw = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -28,8 +171,7 @@ class RedisCache:
         self.password = os.getenv('REDIS_PASSWORD', None)
         
         self.use_redis = True
-        self.memory_store = {}
-        self._model_index = {}
+        self._setup_l1()
         
         try:
             self.redis = redis.Redis(
@@ -40,59 +182,125 @@ class RedisCache:
                 decode_responses=True
             )
             await self.redis.ping()
-            print("Cache: Connected to Async Redis.")
+            self.redis_raw = redis.Redis(
+                host=self.host,
+                port=self.port,
+                db=self.db,
+                password=self.password,
+                decode_responses=False
+            )
+            _logger.info("Cache: Connected to Async Redis.")
         except Exception as e:
-            print(f"Cache Warning: Async Redis connection failed ({e}). Using In-Memory Fallback.")
+            _logger.warning(f"Cache Warning: Async Redis connection failed ({e}). Using In-Memory Fallback.")
             self.use_redis = False
             
         self.initialized = True
 
-    async def get(self, key, default=None):
+    def _setup_l1(self):
+        # L1: bounded per-process store. Entries filled from Redis live at most l1_ttl.
+        self.l1_ttl = int(os.getenv('CACHE_L1_TTL', 300))
+        self.memory_store = MemoryStore(
+            max_entries=int(os.getenv('CACHE_L1_MAX_ENTRIES', 10000)),
+            max_bytes=int(os.getenv('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024)),
+            on_evict=self._unindex
+        )
+        self._model_index = {} # {model: {id: set(keys)}} for L1 invalidation
+        self._ns_gen = {} # {namespace: (generation, refresh_at)}
+        self.node_id = uuid.uuid4().hex # Skip our own invalidation messages
+        self.l2_hits = 0
+        self.l2_misses = 0
+        # Single-flight: key -> Future shared by concurrent get_or_compute callers
+        self._inflight = {}
+        self.flight_stats = {'computes': 0, 'coalesced': 0, 'lock_waits': 0, 'stale_served': 0, 'early_refreshes': 0}
+
+    def _index(self, key):
+        # Index (model, id, ...) keys so invalidate_model() is O(len(ids))
+        if isinstance(key, tuple) and len(key) >= 1:
+            model = key[0]
+            res_id = key[1] if len(key) >= 2 else None
+            self._model_index.setdefault(model, {}).setdefault(res_id, set()).add(key)
+
+    def _unindex(self, key):
+        if isinstance(key, tuple) and len(key) >= 1:
+            model = key[0]
+            res_id = key[1] if len(key) >= 2 else None
+            by_id = self._model_index.get(model)
+            if by_id is None: return
+            keys = by_id.get(res_id)
+            if keys is None: return
+            keys.discard(key)
+            if not keys:
+                del by_id[res_id]
+                if not by_id: del self._model_index[model]
+
+    def stats(self):
+        """
+        L1/L2 counters for monitoring.
+        """
+        if not self.initialized: return {}
+        res = self.memory_store.stats()
+        res['l2_hits'] = self.l2_hits
+        res['l2_misses'] = self.l2_misses
+        res.update(self.flight_stats)
+        return res
+
+    async def get(self, key, default=None, l1_ttl=None):
+        """
+        l1_ttl: lifetime of the L1 copy when filled from Redis (default CACHE_L1_TTL).
+        """
         if not self.initialized: await self.initialize()
         
         # L1: Memory
-        if key in self.memory_store:
-            return self.memory_store[key]
+        data = self.memory_store.get(key, _MISSING)
+        if data is not _MISSING:
+            return data
 
         # L2: Redis
         try:
             if self.use_redis:
-                val = await self.redis.get(key)
+                val = await (self.redis_raw or self.redis).get(cache_key(key))
                 if val is not None:
                     try:
-                        data = json.loads(val)
-                    except:
-                        data = val
+                        data = CacheCodec.decode(val)
+                    except Exception as e:
+                        _logger.error(f"Cache Error (decode {cache_key(key)}): {e}")
+                        self.l2_misses += 1
+                        return default
+                    self.l2_hits += 1
                     
-                    # Populate L1
-                    self.memory_store[key] = data
+                    # Populate L1 (bounded lifetime, Redis keeps the authoritative TTL)
+                    self.memory_store.set(key, data, ttl=l1_ttl or self.l1_ttl, size=len(val))
+                    self._index(key)
                     return data
+                self.l2_misses += 1
         except Exception as e:
-            print(f"Cache Error (get): {e}")
+            _logger.error(f"Cache Error (get): {e}")
             
         return default
 
-    async def set(self, key, value, ttl=3600):
+    async def set(self, key, value, ttl=3600, l1_ttl=None):
+        """
+        l1_ttl: keep the local L1 copy shorter than the Redis ttl.
+        """
         if not self.initialized: await self.initialize()
         
-        # L1: Memory
-        self.memory_store[key] = value
+        blob, size = None, None
+        try:
+            blob, size = self.codec.encode(value)
+        except Exception as e:
+            _logger.error(f"Cache Error (set): {e}")
         
-        # Indexing for L1 Invalidation
-        if isinstance(key, tuple) and len(key) >= 1:
-            model = key[0]
-            if model not in self._model_index:
-                 self._model_index[model] = set()
-            self._model_index[model].add(key)
+        # L1: Memory (honours ttl)
+        self.memory_store.set(key, value, ttl=min(ttl, l1_ttl) if l1_ttl else ttl, size=size)
+        self._index(key)
         
         # L2: Redis
         try:
-            val_str = json.dumps(value)
-            key_str = str(key)
+            key_str = cache_key(key)
             
-            if self.use_redis:
+            if self.use_redis and blob is not None:
                 async with self.redis.pipeline() as pipe:
-                    await pipe.setex(key_str, ttl, val_str)
+                    await pipe.setex(key_str, ttl, blob)
                     
                     # Dependency Tracking
                     if isinstance(key, tuple) and len(key) >= 2:
@@ -101,80 +309,154 @@ class RedisCache:
                         await pipe.sadd(dep_key, key_str)
                         await pipe.expire(dep_key, ttl + 3600) 
                     
+                    # Other workers drop their stale L1 copy (same round trip)
+                    await pipe.publish(self.INVALIDATION_CHANNEL, self._message('del', k=[self._encode_key(key)]))
                     await pipe.execute()
         except Exception as e:
-            print(f"Cache Error (set): {e}")
+            _logger.error(f"Cache Error (set): {e}")
 
     async def delete(self, key):
         if not self.initialized: await self.initialize()
         
         # L1
-        if key in self.memory_store:
-            del self.memory_store[key]
-            
-        if isinstance(key, tuple) and len(key) >= 1:
-            model = key[0]
-            if model in self._model_index:
-                self._model_index[model].discard(key)
+        self.memory_store.pop(key)
+        self._unindex(key)
             
         # L2
         try:
             if self.use_redis:
-                await self.redis.delete(str(key))
+                await self.redis.delete(cache_key(key))
         except Exception as e:
-             print(f"Cache Error (delete): {e}")
+             _logger.error(f"Cache Error (delete): {e}")
+             
+        await self._publish('del', k=[self._encode_key(key)])
 
-    async def invalidate_model(self, model, ids=None):
+    async def get_many(self, keys):
+        """
+        Batched get: {key: value} for the keys found.
+        L1 is consulted first; all L1 misses cost a single MGET.
+        """
+        if not self.initialized: await self.initialize()
+        
+        res = {}
+        missing = []
+        for key in keys:
+            data = self.memory_store.get(key, _MISSING)
+            if data is _MISSING:
+                missing.append(key)
+            else:
+                res[key] = data
+                
+        if not missing or not self.use_redis: return res
+        
+        try:
+            vals = await (self.redis_raw or self.redis).mget([cache_key(k) for k in missing])
+        except Exception as e:
+            _logger.error(f"Cache Error (get_many): {e}")
+            return res
+            
+        for key, val in zip(missing, vals):
+            if val is None:
+                self.l2_misses += 1
+                continue
+            try:
+                data = CacheCodec.decode(val)
+            except Exception as e:
+                _logger.error(f"Cache Error (decode {cache_key(key)}): {e}")
+                self.l2_misses += 1
+                continue
+            self.l2_hits += 1
+            self.memory_store.set(key, data, ttl=self.l1_ttl, size=len(val))
+            self._index(key)
+            res[key] = data
+        return res
+
+    async def set_many(self, mapping, ttl=3600):
+        """
+        Batched set: one pipeline (values, dependency sets, one invalidation message).
+        """
+        if not self.initialized: await self.initialize()
+        if not mapping: return
+        
+        blobs = {}
+        for key, value in mapping.items():
+            size = None
+            try:
+                blobs[key], size = self.codec.encode(value)
+            except Exception as e:
+                _logger.error(f"Cache Error (set_many): {e}")
+            self.memory_store.set(key, value, ttl=ttl, size=size)
+            self._index(key)
+            
+        if not self.use_redis or not blobs: return
+        
+        try:
+            deps = {}
+            async with self.redis.pipeline() as pipe:
+                for key, blob in blobs.items():
+                    key_str = cache_key(key)
+                    await pipe.setex(key_str, ttl, blob)
+                    if isinstance(key, tuple) and len(key) >= 2:
+                        deps.setdefault(f"deps:{key[0]}:{key[1]}", []).append(key_str)
+                for dep_key, members in deps.items():
+                    await pipe.sadd(dep_key, *members)
+                    await pipe.expire(dep_key, ttl + 3600)
+                await pipe.publish(self.INVALIDATION_CHANNEL, self._message('del', k=[self._encode_key(k) for k in blobs]))
+                await pipe.execute()
+        except Exception as e:
+            _logger.error(f"Cache Error (set_many): {e}")
+
+    async def delete_many(self, keys):
+        """
+        Batched delete: one DEL and one invalidation message.
+        """
         if not self.initialized: await self.initialize()
+        keys = list(keys)
+        if not keys: return
         
-        # 1. L1 Invalidation
-        if model in self._model_index:
-            keys_to_remove = list(self._model_index[model])
-            for k in keys_to_remove:
-                if ids is None or k[1] in ids:
-                    if k in self.memory_store:
-                        del self.memory_store[k]
-                    self._model_index[model].discard(k)
+        for key in keys:
+            self.memory_store.pop(key)
+            self._unindex(key)
             
-        # 2. L2 Redis Invalidation
         try:
             if self.use_redis:
-                keys_to_del_redis = []
-                sets_to_del = []
-                
-                if ids:
-                    for rid in ids:
-                        dep_key = f"deps:{model}:{rid}"
-                        members = await self.redis.smembers(dep_key)
-                        if members:
-                            keys_to_del_redis.extend(members)
-                        sets_to_del.append(dep_key)
-                else:
-                    # Generic invalidation handling (Complex if not tracking all keys)
-                    pass 
-
-                if keys_to_del_redis:
-                    async with self.redis.pipeline() as pipe:
-                        # Redis pipeline methods add to pipe, execute runs them
-                        # await not needed for adding to pipe?
-                        # redis-py async pipeline: pipe.delete(...) returns Coroutine? 
-                        # usually pipe commands return self or future.
-                        # Correct pattern: await pipe.delete(...).
-                        # Wait, pipe commands are chainable but in async they are awaited if immediate?
-                        # Documentation says: `await pipe.set(...)` ?
-                        # No, usually in pipeline context you just `pipe.set()` then `await pipe.execute()`.
-                        # BUT redis-py async might differ.
-                        # To be safe: await pipe.delete(...)
-                        if keys_to_del_redis:
-                             await pipe.delete(*keys_to_del_redis)
-                        if sets_to_del:
-                             await pipe.delete(*sets_to_del)
-                        await pipe.execute()
+                await self.redis.delete(*[cache_key(k) for k in keys])
+        except Exception as e:
+            _logger.error(f"Cache Error (delete_many): {e}")
+            
+        await self._publish('del', k=[self._encode_key(k) for k in keys])
+
+    async def invalidate_model(self, model, ids=None, publish=True):
+        """
+        publish=False when every process already receives the event
+        (e.g. the 'record_change' LISTEN in core/pg_listener.py).
+        """
+        if not self.initialized: await self.initialize()
+        
+        # 1. L1 Invalidation (per (model, id) index)
+        self._invalidate_l1(model, ids)
+            
+        # 2. L2 Redis Invalidation: all dependency sets in one pipeline, then one DEL
+        try:
+            if self.use_redis and ids:
+                sets_to_del = [f"deps:{model}:{rid}" for rid in ids]
+                async with self.redis.pipeline() as pipe:
+                    for dep_key in sets_to_del:
+                        await pipe.smembers(dep_key)
+                    members = await pipe.execute()
                     
-                print(f"Cache: Invalidated {len(keys_to_del_redis)} Redis keys for {model} ids={ids}")
+                keys_to_del_redis = [k for group in members if group for k in group]
+                await self.redis.delete(*keys_to_del_redis, *sets_to_del)
+                _logger.debug("Cache: Invalidated %s Redis keys for %s ids=%s", len(keys_to_del_redis), model, ids)
+            # ids=None: nothing to delete in Redis. Model-wide changes are carried by the
+            # model generation (core/generations.py) embedded in derived keys.
                 
         except Exception as e:
-            print(f"Cache Error (invalidate): {e}")
+            _logger.error(f"Cache Error (invalidate): {e}")
+            
+        # 3. Other workers (after L2, so they can't refill L1 from stale Redis)
+        if publish:
+            await self._publish('model', m=model, i=list(ids) if ids is not None else None)
 
     async def delete_pattern(self, pattern: str):
         """
@@ -197,19 +479,273 @@ class RedisCache:
                 if keys_to_del:
                     await self.redis.delete(*keys_to_del)
                     
-                print(f"Cache: Deleted pattern '{pattern}'")
+                _logger.debug("Cache: Deleted pattern '%s'", pattern)
+                
+            # L1 Memory (also needed with Redis: L1 holds copies)
+            self._delete_pattern_l1(pattern)
+            await self._publish('pattern', p=pattern)
+
+        except Exception as e:
+            _logger.error(f"Cache Error (delete_pattern): {e}")
+
+    def _invalidate_l1(self, model, ids=None):
+        by_id = self._model_index.get(model)
+        if not by_id: return
+        if ids is None:
+            keys_to_remove = [k for keys in by_id.values() for k in keys]
+            del self._model_index[model]
+        else:
+            keys_to_remove = []
+            for rid in ids:
+                keys_to_remove.extend(by_id.pop(rid, ()))
+            if not by_id: del self._model_index[model]
+        for k in keys_to_remove:
+            self.memory_store.pop(k)
+
+    def _delete_pattern_l1(self, pattern):
+        # Naive loop. keys() returns a copy, safe to delete while iterating
+        for key in self.memory_store.keys():
+            # Very simple glob check? or Startswith?
+            # Redis patterns are glob-like.
+            # As fallback, let's assume prefix match if pattern ends with *
+            if pattern == "*" or (pattern.endswith("*") and str(key).startswith(pattern[:-1])):
+                 self.memory_store.pop(key)
+                 self._unindex(key)
+
+    # --- Single-Flight ---
+
+    async def get_or_compute(self, key, coro_factory, ttl=3600, stale_ttl=None, beta=1.0):
+        """
+        Cached value of key, computing it with `await coro_factory()` when missing.
+        
+        - Concurrent callers in this process share one computation (single-flight);
+          across processes a short Redis lease lets one worker compute while the
+          others wait for the result.
+        - Entries are refreshed early with probability growing towards expiry
+          (XFetch, scaled by the measured compute time and `beta`).
+        - For stale_ttl seconds after expiry the old value is still served while
+          one caller recomputes it.
+        
+        The refresh runs inline in the caller that wins the lease, so factories may
+        use the caller's cursor. Keys used here must only be read through this method
+        (values are stored wrapped with their expiry).
+        """
+        if not self.initialized: await self.initialize()
+        if stale_ttl is None: stale_ttl = self.STALE_TTL
+        
+        entry = await self.get(key)
+        if isinstance(entry, dict) and 'v' in entry:
+            now = time.time()
+            if now < entry['e']:
+                # XFetch: now - delta * beta * ln(U) >= expiry, U in (0, 1]
+                if now - entry['d'] * beta * math.log(1.0 - random.random()) < entry['e']:
+                    return entry['v']
+                refresh = 'early_refreshes'
             else:
-                # L1 Memory Fallback (Naive loop)
-                # Iterate copy of keys to avoid runtime change error
-                for key in list(self.memory_store.keys()):
-                    # Very simple glob check? or Startswith?
-                    # Redis patterns are glob-like.
-                    # As fallback, let's assume prefix match if pattern ends with *
-                    if pattern == "*" or (pattern.endswith("*") and str(key).startswith(pattern[:-1])):
-                         del self.memory_store[key]
+                refresh = 'stale_served'
+                
+            # One refresher; everyone else keeps the current value
+            if key in self._inflight or not await self._acquire_lease(key):
+                if refresh == 'stale_served': self.flight_stats[refresh] += 1
+                return entry['v']
+            if refresh == 'early_refreshes': self.flight_stats[refresh] += 1
+            try:
+                return await self._lead(key, coro_factory, ttl, stale_ttl, locked=True)
+            except Exception as e:
+                _logger.error(f"Cache Error (refresh {key}): {e}")
+                return entry['v']
+                
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                return await self._lead(key, coro_factory, ttl, stale_ttl)
+            self.flight_stats['coalesced'] += 1
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # The leader was cancelled, not us: take over
+                if not fut.cancelled(): raise
+
+    async def _lead(self, key, coro_factory, ttl, stale_ttl, locked=False):
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            if not locked:
+                locked = await self._acquire_lease(key)
+                if not locked:
+                    # Another process is computing: wait for its result up to the lease
+                    self.flight_stats['lock_waits'] += 1
+                    entry = await self._wait_for_value(key)
+                    if entry is not None:
+                        fut.set_result(entry['v'])
+                        return entry['v']
+                        
+            start = time.monotonic()
+            value = await coro_factory()
+            delta = time.monotonic() - start
+            self.flight_stats['computes'] += 1
+            
+            await self.set(key, {'v': value, 'd': delta, 'e': time.time() + ttl}, ttl=ttl + stale_ttl)
+            fut.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                fut.cancel()
+            else:
+                fut.set_exception(e)
+                fut.exception() # Retrieved: no "never retrieved" warning without followers
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+            if locked is True and self.use_redis:
+                await self._release_lease(key)
+
+    def _lease_key(self, key):
+        return f"lock:{cache_key(key)}"
+
+    async def _acquire_lease(self, key):
+        if not self.use_redis: return True
+        try:
+            token = self.node_id
+            return bool(await self.redis.set(self._lease_key(key), token, nx=True, px=int(self.LOCK_LEASE * 1000)))
+        except Exception as e:
+            _logger.error(f"Cache Error (lease): {e}")
+            return True # Redis trouble: compute locally rather than block
 
+    async def _release_lease(self, key):
+        try:
+            await self.redis.eval(self._UNLOCK_SCRIPT, 1, self._lease_key(key), self.node_id)
         except Exception as e:
-            print(f"Cache Error (delete_pattern): {e}")
+            _logger.error(f"Cache Error (lease release): {e}")
+
+    async def _wait_for_value(self, key):
+        deadline = time.monotonic() + self.LOCK_LEASE
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL)
+            entry = await self.get(key)
+            if isinstance(entry, dict) and 'v' in entry:
+                return entry
+        return None
+
+    # --- Versioned Namespaces ---
+    
+    async def get_generation(self, ns):
+        """
+        Current generation of a namespace (0 if never bumped).
+        """
+        if not self.initialized: await self.initialize()
+        
+        entry = self._ns_gen.get(ns)
+        now = time.monotonic()
+        if entry and entry[1] > now:
+            return entry[0]
+            
+        gen = entry[0] if entry else 0
+        if self.use_redis:
+            try:
+                val = await self.redis.get(f"ns:{ns}:gen")
+                gen = int(val) if val else 0
+            except Exception as e:
+                _logger.error(f"Cache Error (generation): {e}")
+        self._ns_gen[ns] = (gen, now + self.NS_REFRESH)
+        return gen
+
+    async def namespaced(self, ns, key):
+        """
+        Build a key inside a versioned namespace: '{ns}:{generation}:{key}'.
+        """
+        gen = await self.get_generation(ns)
+        return f"{ns}:{gen}:{key}"
+
+    async def bump_namespace(self, ns):
+        """
+        Invalidate a whole namespace in O(1): old keys become unreachable and age out.
+        """
+        if not self.initialized: await self.initialize()
+        
+        gen = None
+        if self.use_redis:
+            try:
+                gen = await self.redis.incr(f"ns:{ns}:gen")
+            except Exception as e:
+                _logger.error(f"Cache Error (bump): {e}")
+        if gen is None:
+            gen = self._ns_gen.get(ns, (0, 0))[0] + 1
+            
+        self._ns_gen[ns] = (gen, time.monotonic() + self.NS_REFRESH)
+        await self._publish('ns', ns=ns, g=gen)
+        return gen
+
+    # --- Cross-Process Invalidation ---
+
+    @staticmethod
+    def _encode_key(key):
+        return list(key) if isinstance(key, tuple) else key
+
+    @staticmethod
+    def _decode_key(key):
+        return tuple(key) if isinstance(key, list) else key
+
+    def _message(self, op, **kwargs):
+        kwargs['op'] = op
+        kwargs['n'] = self.node_id
+        return json.dumps(kwargs, separators=(',', ':'))
+
+    async def _publish(self, op, **kwargs):
+        if not self.use_redis: return
+        try:
+            await self.redis.publish(self.INVALIDATION_CHANNEL, self._message(op, **kwargs))
+        except Exception as e:
+            _logger.error(f"Cache Error (publish): {e}")
+
+    def _apply_invalidation(self, data):
+        """
+        Apply an invalidation published by another process to the local L1.
+        """
+        if data.get('n') == self.node_id: return
+        op = data.get('op')
+        
+        if op == 'del':
+            for k in data.get('k', ()):
+                key = self._decode_key(k)
+                self.memory_store.pop(key)
+                self._unindex(key)
+        elif op == 'model':
+            self._invalidate_l1(data.get('m'), data.get('i'))
+        elif op == 'pattern':
+            self._delete_pattern_l1(data.get('p', ''))
+        elif op == 'ns':
+            self._ns_gen[data['ns']] = (data['g'], time.monotonic() + self.NS_REFRESH)
+
+    async def invalidation_listener(self):
+        """
+        Background Task (one per process): apply other workers' L1 invalidations.
+        """
+        if not self.initialized: await self.initialize()
+        if not self.use_redis: return
+        
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                _logger.info(f"Cache: Listening on '{self.INVALIDATION_CHANNEL}'...")
+                
+                async for msg in pubsub.listen():
+                    if msg.get('type') != 'message': continue
+                    try:
+                        self._apply_invalidation(json.loads(msg['data']))
+                    except Exception as e:
+                        _logger.error(f"Cache Invalidation Error: {e}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                _logger.error(f"Cache Listener Crash: {e}. Retrying in 5s...")
+                # Messages may have been missed while disconnected: L1 can't be trusted
+                self.memory_store.clear()
+                self._model_index.clear()
+                self._ns_gen.clear()
+                await asyncio.sleep(5)
 
 # Global Instance
 Cache = RedisCache()
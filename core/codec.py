@@ -0,0 +1,196 @@
+import json
+import zlib
+import datetime
+from decimal import Decimal
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+class CacheCodec:
+    """
+    Serializer for values stored in Redis (L2).
+    Subclasses implement dumps()/loads(); encode()/decode() add the frame:
+
+        MAGIC (0x00) | VERSION | codec id | flags | body
+
+    MAGIC never starts a JSON document, so values written before framing
+    existed (plain JSON text) are still readable. Bodies of at least
+    `compress_min` bytes are zlib-compressed when that actually saves space.
+    """
+    MAGIC = 0
+    VERSION = 1
+    FLAG_ZLIB = 0x01
+    HEADER_SIZE = 4
+
+    codec_id = 0
+    name = None
+    _by_id = {}
+
+    def __init__(self, compress_min=1024, level=1):
+        self.compress_min = compress_min
+        self.level = level # zlib level 1: cache traffic wants speed over ratio
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.codec_id:
+            CacheCodec._by_id[cls.codec_id] = cls()
+
+    def dumps(self, value) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+    def encode(self, value):
+        """
+        Returns (blob, size) where size is the uncompressed body length,
+        used to weigh the entry in L1.
+        """
+        body = self.dumps(value)
+        size = len(body)
+        flags = 0
+        if self.compress_min and size >= self.compress_min:
+            packed = zlib.compress(body, self.level)
+            if len(packed) < size:
+                body = packed
+                flags |= self.FLAG_ZLIB
+        return bytes((self.MAGIC, self.VERSION, self.codec_id, flags)) + body, size
+
+    @classmethod
+    def decode(cls, blob):
+        """
+        Decode a blob written by any registered codec (or legacy JSON text).
+        """
+        if isinstance(blob, str):
+            return json.loads(blob)
+        if not blob or blob[0] != cls.MAGIC:
+            return json.loads(blob)
+        if len(blob) < cls.HEADER_SIZE:
+            raise ValueError("Truncated cache frame")
+        if blob[1] != cls.VERSION:
+            raise ValueError(f"Unsupported cache frame version {blob[1]}")
+        codec = cls._by_id.get(blob[2])
+        if codec is None:
+            raise ValueError(f"Unknown cache codec id {blob[2]}")
+        body = blob[cls.HEADER_SIZE:]
+        if blob[3] & cls.FLAG_ZLIB:
+            body = zlib.decompress(body)
+        return codec.loads(body)
+
+
+class JsonCodec(CacheCodec):
+    """
+    Plain JSON. Tuples come back as lists and dates can't be stored.
+    """
+    codec_id = 1
+    name = 'json'
+
+    def dumps(self, value):
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class BinaryCodec(CacheCodec):
+    """
+    msgpack with extension types, so ORM values round-trip unchanged:
+    tuples (many2one (id, name) pairs), datetime, date, time, Decimal and sets.
+    """
+    codec_id = 2
+    name = 'binary'
+
+    EXT_TUPLE = 1
+    EXT_DATETIME = 2
+    EXT_DATE = 3
+    EXT_TIME = 4
+    EXT_DECIMAL = 5
+    EXT_SET = 6
+
+    def dumps(self, value):
+        # strict_types: tuples must reach _default instead of packing as arrays
+        return msgpack.packb(value, default=self._default, strict_types=True, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+    def _default(self, obj):
+        if isinstance(obj, tuple):
+            return msgpack.ExtType(self.EXT_TUPLE, self.dumps(list(obj)))
+        if isinstance(obj, datetime.datetime):
+            return msgpack.ExtType(self.EXT_DATETIME, obj.isoformat().encode())
+        if isinstance(obj, datetime.date):
+            return msgpack.ExtType(self.EXT_DATE, obj.isoformat().encode())
+        if isinstance(obj, datetime.time):
+            return msgpack.ExtType(self.EXT_TIME, obj.isoformat().encode())
+        if isinstance(obj, Decimal):
+            return msgpack.ExtType(self.EXT_DECIMAL, str(obj).encode())
+        if isinstance(obj, (set, frozenset)):
+            return msgpack.ExtType(self.EXT_SET, self.dumps(list(obj)))
+        # strict_types also routes subclasses here (e.g. IntEnum, OrderedDict)
+        if isinstance(obj, dict): return dict(obj)
+        if isinstance(obj, list): return list(obj)
+        if isinstance(obj, bool): return bool(obj)
+        if isinstance(obj, int): return int(obj)
+        if isinstance(obj, float): return float(obj)
+        if isinstance(obj, str): return str(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not cacheable")
+
+    def _ext_hook(self, code, data):
+        if code == self.EXT_TUPLE:
+            return tuple(self.loads(data))
+        if code == self.EXT_DATETIME:
+            return datetime.datetime.fromisoformat(data.decode())
+        if code == self.EXT_DATE:
+            return datetime.date.fromisoformat(data.decode())
+        if code == self.EXT_TIME:
+            return datetime.time.fromisoformat(data.decode())
+        if code == self.EXT_DECIMAL:
+            return Decimal(data.decode())
+        if code == self.EXT_SET:
+            return set(self.loads(data))
+        return msgpack.ExtType(code, data)
+
+
+CODECS = {'json': JsonCodec, 'binary': BinaryCodec}
+
+def get_codec(name=None, compress_min=1024):
+    """
+    Codec by name ('binary' | 'json'). 'binary' needs msgpack and falls
+    back to JSON when it is not installed.
+    """
+    name = name or ('binary' if msgpack else 'json')
+    if name == 'binary' and msgpack is None:
+        print("Cache Warning: msgpack not installed, using JSON codec.")
+        name = 'json'
+    if name not in CODECS:
+        raise ValueError(f"Unknown cache codec '{name}' (expected one of {sorted(CODECS)})")
+    return CODECS[name](compress_min=compress_min)
+
+def _key_part(p):
+    # '%' and ':' are escaped in strings, so any other '%' sequence is a type tag
+    if p is None:
+        return '%00'
+    if isinstance(p, str):
+        p = p.replace('%', '%25').replace(':', '%3A')
+        # Digit strings are tagged so ('m', '7') and ('m', 7) differ
+        return '%27' + p if p.lstrip('-').isdigit() else p
+    if isinstance(p, int) and not isinstance(p, bool):
+        return str(p)
+    return f"%{type(p).__name__}=" + str(p).replace('%', '%25').replace(':', '%3A')
+
+def cache_key(key):
+    """
+    Stable, compact Redis key. Tuple keys such as ('res.partner', 7, 'name')
+    become 'c:res.partner:7:name'; strings are used as-is. Distinct keys
+    never collide: parts are escaped, None and non-int parts carry a type
+    tag, and the few strings that look like encoded keys ('c:', 'k:', 's:')
+    are moved under 's:'.
+    """
+    if isinstance(key, str):
+        return 's:' + key if key[:2] in ('c:', 'k:', 's:') else key
+    if isinstance(key, tuple):
+        return 'c:' + ':'.join(_key_part(p) for p in key)
+    return 'k:' + _key_part(key)
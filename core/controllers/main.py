@@ -1,5 +1,8 @@
 from core.routing import route, Response
-import inspect
+from core import rpc
+from core.logger import category_logger
+
+_logger = category_logger('auth')
 
 @route('/', auth='public')
 async def index(req, env):
@@ -12,7 +15,7 @@ async def login(req, env):
     login = params.get('login') or req.json.get('login')
     password = params.get('password') or req.json.get('password')
     
-    print(f"LOGIN ATTEMPT: {login}", flush=True)
+    _logger.info(f"LOGIN ATTEMPT: {login}")
     
     # Use SUDO to check credentials (Public user cannot search res.users)
     from core.env import Environment
@@ -32,7 +35,7 @@ async def login(req, env):
     else:
         return Response({'error': 'Access Denied'}, status=401)
 
-@route('/web/dataset/call_kw', auth='user')
+@route('/web/dataset/call_kw', auth='user', readonly=rpc.readonly_call_kw)
 async def call_kw(req, env):
     """
     JSON-RPC:
@@ -59,106 +62,78 @@ async def call_kw(req, env):
     
 
     # 3. Dynamic API Validation (Phase 6)
-    if method_name in ('create', 'write'):
-        from core.api.schema import SchemaFactory
-        try:
-            if method_name == 'create':
-                schema = SchemaFactory.get_create_schema(env, model_name)
-                # create args: [vals] or [vals_list]
-                vals_arg = args[0]
-                vals_list = vals_arg if isinstance(vals_arg, list) else [vals_arg]
-                
-                for v in vals_list:
-                    schema(**v) # Validates and raises ValidationError
-                    
-            elif method_name == 'write':
-                # write args: [ids, vals]
-                # Check args length
-                if len(args) > 1:
-                    vals = args[1]
-                    schema = SchemaFactory.get_write_schema(env, model_name)
-                    schema(**vals)
-                    
-        except Exception as e:
-            # Pydantic ValidationError or other
-            import traceback
-            # traceback.print_exc()
-            return Response({
-                "jsonrpc": "2.0",
-                "id": None,
-                "error": {
-                    "code": 400,
-                    "message": "Validation Error",
-                    "data": {
-                        "name": "ValidationError",
-                        "message": str(e)
-                    }
+    try:
+        rpc.validate_call(env, model_name, method_name, args)
+    except Exception as e:
+        # Pydantic ValidationError or other
+        return Response({
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": 400,
+                "message": "Validation Error",
+                "data": {
+                    "name": "ValidationError",
+                    "message": str(e)
                 }
-            })
+            }
+        })
     try:
-        # Transactional Wrapper
-        # If any error occurs inside, rollback happens automatically via context manager.
-        # But here we are already inside global handler transaction. A savepoint is useful for partial errors.
-        # Using Async Savepoint logic? AsyncCursor wrapper should support it or we use raw conn.transaction(savepoint=True).
-        # For simplicity, we rely on main transaction now.
-        if True: # with env.cr.savepoint(): # TODO: implement async savepoint on Env or Cursor
-            model = env[model_name]
-            
-            # Handle Instance Methods (read, write, unlink)
-            # These methods expect 'self' to be a recordset, so we must instantiate it 
-            # using the first argument (ids) from args.
-            instance_methods = ['read', 'write', 'unlink', 'check_access_rights']
-            # And many Odoo methods.
-            
-            # We assume instance method if args[0] is list of IDs? Or based on name?
-            # Safer: Try to bind if first arg matches?
-            # Standard Odoo call_kw logic:
-            
-            is_instance_call = method_name in instance_methods or (args and isinstance(args[0], list) and method_name not in ['search', 'search_count', 'create', 'search_read', 'name_search'])
-            
-            if is_instance_call and args and isinstance(args[0], list):
-                ids = args[0]
-                method_args = args[1:]
-                record = model.browse(ids)
-                method = getattr(record, method_name)
-                result = method(*method_args, **kwargs)
-            else:
-                # Static methods or methods called on empty recordset (search, create, etc.)
-                method = getattr(model, method_name)
-                result = method(*args, **kwargs)
-            
-            if inspect.iscoroutine(result):
-                result = await result
-
-            if hasattr(result, 'ids'):
-                 result = result.ids
-            
-            return Response({'result': result})
+        # Transactional Wrapper: we are inside the handler transaction
+        # (rolled back on error). Per-call savepoints: see call_kw_batch.
+        result = await rpc.call_kw(env, model_name, method_name, args, kwargs)
+        return Response({'result': result})
         
+    except rpc.UNHANDLED_ERRORS:
+        raise # READ ONLY write: retried on the primary; PoolTimeout: 503
     except Exception as e:
-        import traceback
-        error_data = {
-            "name": str(type(e).__name__),
-            "debug": traceback.format_exc(),
-            "message": str(e),
-            "arguments": e.args
-        }
         # Odoo-like Error Structure
         return Response({
             "jsonrpc": "2.0",
             "id": None, # Should be the ID from request
+            "error": {
+                "code": 200,
+                "message": "Odoo Server Error",
+                "data": rpc.error_data(e)
+            }
+        })
+
+@route('/web/dataset/call_kw_batch', auth='user', readonly=rpc.readonly_call_kw_batch)
+async def call_kw_batch(req, env):
+    """
+    Several call_kw in one request, one transaction and one Environment:
+    {
+        "calls": [{"model": ..., "method": ..., "args": [], "kwargs": {}}, ...],
+        "savepoints": false
+    }
+    Result: [{"result": ...}, ...] in call order. Without savepoints the batch
+    is all-or-nothing and the first failure is returned as the error (data.index
+    = failing call). With savepoints each entry is {"result"} or {"error"}.
+    """
+    params = req.json.get('params', req.json)
+    try:
+        results, failure = await rpc.call_kw_batch(env, params.get('calls'), savepoints=bool(params.get('savepoints')))
+    except rpc.RpcError as e:
+        return Response({'error': 'Invalid Request', 'message': str(e)}, status=400)
+
+    if failure:
+        index, error_data = failure
+        error_data['index'] = index
+        return Response({
+            "jsonrpc": "2.0",
+            "id": None,
             "error": {
                 "code": 200,
                 "message": "Odoo Server Error",
                 "data": error_data
             }
         })
+    return Response({'result': results})
 
 
 @route('/web/session/destroy', auth='public')
 async def destroy(req, env):
-    req.session.uid = None
-    await req.session.save()
+    await req.session.destroy()
     return Response({'result': True})
 
 @route('/web/session/check', auth='public')
@@ -171,3 +146,87 @@ async def get_token(req, env):
     Returns the CSRF token for the current session.
     """
     return Response({'result': {'token': req.session.csrf_token}})
+
+@route('/web/debug/pool', auth='user')
+async def pool_stats(req, env):
+    """
+    Connection pool metrics (admin only): in-use, waiters and wait time
+    histogram per priority class, open/idle connections.
+    """
+    if env.uid != 1:
+        return Response({'error': 'Access Denied'}, status=403)
+    from core.db_async import AsyncDatabase
+    return Response({'result': AsyncDatabase.pool_stats()})
+
+@route('/web/debug/slow_queries', auth='user')
+async def slow_queries(req, env):
+    """
+    Recent slow statements, newest first (admin only): normalized SQL,
+    parameter types, call site, search domain and sampled EXPLAIN plan.
+    ?limit=N (default 50)
+    """
+    if env.uid != 1:
+        return Response({'error': 'Access Denied'}, status=403)
+    from core.slow_query import SlowQueryLog
+    try:
+        limit = int(req.query_params.get('limit', 50))
+    except ValueError:
+        limit = 50
+    return Response({'result': SlowQueryLog.recent(limit)})
+
+@route('/web/debug/profiler', auth='user')
+async def profiler_config(req, env):
+    """
+    Sampling profiler settings (admin only). POST {rate, routes, uids}
+    changes them for this worker until restart; GET returns them.
+    """
+    if env.uid != 1:
+        return Response({'error': 'Access Denied'}, status=403)
+    from core.profiler import Profiler
+    params = req.json.get('params', req.json) if isinstance(req.json, dict) else {}
+    if params:
+        try:
+            config = Profiler.configure(params.get('rate'), params.get('routes'), params.get('uids'))
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({'result': config})
+    return Response({'result': Profiler.config()})
+
+@route('/web/debug/profiles', auth='user')
+async def profiles(req, env):
+    """
+    Last profiles taken by this worker, newest first (admin only): path,
+    call_kw method, duration, samples and time per category.
+    ?limit=N (default 10)
+    """
+    if env.uid != 1:
+        return Response({'error': 'Access Denied'}, status=403)
+    from core.profiler import Profiler
+    try:
+        limit = int(req.query_params.get('limit', 10))
+    except ValueError:
+        limit = 10
+    return Response({'result': [p.summary() for p in Profiler.recent(limit)]})
+
+@route('/web/debug/profiles/collapsed', auth='user')
+async def profiles_collapsed(req, env):
+    """
+    Collapsed stacks for flamegraph.pl / speedscope (admin only): one
+    profile (?id=N) or the last N merged (?limit=N, default 10).
+    """
+    if env.uid != 1:
+        return Response({'error': 'Access Denied'}, status=403)
+    from core.profiler import Profiler
+    try:
+        profile_id = int(req.query_params['id']) if 'id' in req.query_params else None
+        limit = int(req.query_params.get('limit', 10))
+    except ValueError:
+        return Response({'error': 'Invalid id or limit'}, status=400)
+    if profile_id is not None:
+        profile = Profiler.get(profile_id)
+        if profile is None:
+            return Response({'error': 'Profile not found'}, status=404)
+        body, filename = profile.collapsed(), f"profile-{profile_id}.folded"
+    else:
+        body, filename = Profiler.collapsed(limit), "profiles.folded"
+    return Response(body, content_type='text/plain', headers={'Content-Disposition': f'attachment; filename="{filename}"'})
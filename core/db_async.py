@@ -1,10 +1,22 @@
+import asyncio
 import asyncpg
 import os
+import math
+import time
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, AsyncExitStack
+from .pool import PoolGate, PoolTimeout
+from . import sql_stats
+from .sql_stats import QueryStats
+from .slow_query import SlowQueryLog
+from .logger import category_logger
+from .generations import ModelGenerations
 
-# Global Pool
+_logger = category_logger('db')
+
+# Global Pools
 _pool = None
+_replica_pool = None # Optional read-only replica (DB_REPLICA_*)
 
 class AsyncDatabase:
     @staticmethod
@@ -14,58 +26,242 @@ class AsyncDatabase:
              raise ValueError(f"Security Error: Invalid Identifier '{name}'. Only lowercase alphanumeric and underscores allowed.")
         return name
 
+    # Read-only transactions go to the replica pool (DB_REPLICA_HOST) when configured.
+    # After a user's own write, their reads stay on the primary for REPLICA_RYW seconds
+    # so they never see a replica that hasn't replayed it yet (read-your-writes).
+    REPLICA_RYW = float(os.getenv('DB_REPLICA_RYW', 5))
+    REPLICA_ACQUIRE_TIMEOUT = float(os.getenv('DB_REPLICA_ACQUIRE_TIMEOUT', 2))
+    # Raised by a write inside a READ ONLY transaction (route wrongly marked readonly)
+    READONLY_ERRORS = (asyncpg.exceptions.ReadOnlySQLTransactionError,)
+    _recent_writers = {} # {uid: monotonic deadline} (this process)
+
+    # Pool sizing. DB_POOL_MIN connections are opened and checked at startup (pre-warm).
+    # The LISTEN connection is separate (connect()) and not counted here.
+    POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+    POOL_MAX = int(os.getenv('DB_POOL_MAX', 20))
+    POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300)) # Close connections idle this long
+    # Slots only interactive (UI) requests may take
+    POOL_RESERVED_UI = int(os.getenv('DB_POOL_RESERVED_UI', 2))
+    # Max wait for a connection per priority class before PoolTimeout (503)
+    ACQUIRE_TIMEOUTS = {
+        PoolGate.UI: float(os.getenv('DB_ACQUIRE_TIMEOUT_UI', 5)),
+        PoolGate.API: float(os.getenv('DB_ACQUIRE_TIMEOUT_API', 10)),
+        PoolGate.QUEUE: float(os.getenv('DB_ACQUIRE_TIMEOUT_QUEUE', 60)),
+    }
+    _gates = {} # {'primary' | 'replica': PoolGate}
+
+    @staticmethod
+    def _connect_kwargs(prefix='DB'):
+        """
+        Connection settings from {prefix}_HOST/_PORT/_USER/_PASSWORD/_NAME.
+        Replica settings default to the primary ones (same credentials, other host).
+        """
+        def env(name, default):
+            value = os.getenv(f'{prefix}_{name}')
+            if value is None and prefix != 'DB':
+                value = os.getenv(f'DB_{name}')
+            return value if value is not None else default
+        return {
+            'host': env('HOST', 'localhost'),
+            'user': env('USER', 'postgres'),
+            'password': env('PASSWORD', '1234'),
+            'database': env('NAME', 'nexo'),
+            'port': env('PORT', '5432'),
+        }
+
+    @classmethod
+    async def _create_pool(cls, role, prefix):
+        pool = await asyncpg.create_pool(
+            **cls._connect_kwargs(prefix),
+            min_size=min(cls.POOL_MIN, cls.POOL_MAX),
+            max_size=cls.POOL_MAX,
+            max_inactive_connection_lifetime=cls.POOL_MAX_IDLE
+        )
+        await cls._prewarm(pool)
+        cls._gates[role] = PoolGate(role, cls.POOL_MAX, reserved=cls.POOL_RESERVED_UI, timeouts=cls.ACQUIRE_TIMEOUTS)
+        return pool
+
+    @staticmethod
+    async def _prewarm(pool):
+        # Round trip on every min_size connection: auth and type introspection
+        # are paid at startup, not by the first requests
+        async def ping():
+            async with pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+        await asyncio.gather(*(ping() for _ in range(pool.get_min_size())))
+
     @classmethod
     async def initialize(cls):
-        global _pool
+        global _pool, _replica_pool
         if _pool is None:
-            host = os.getenv('DB_HOST', 'localhost')
-            user = os.getenv('DB_USER', 'postgres')
-            password = os.getenv('DB_PASSWORD', '1234')
-            dbname = os.getenv('DB_NAME', 'nexo')
-            port = os.getenv('DB_PORT', '5432')
-            
             try:
-                _pool = await asyncpg.create_pool(
-                    user=user,
-                    password=password,
-                    database=dbname,
-                    host=host,
-                    port=port,
-                    min_size=1,
-                    max_size=20
-                )
-                print("AsyncDatabase: Pool Initialized")
+                _pool = await cls._create_pool('primary', 'DB')
+                print(f"AsyncDatabase: Pool Initialized (min={cls.POOL_MIN}, max={cls.POOL_MAX})")
+                
+                # Bumped by every committing write transaction (ChangeBuffer.flush)
+                async with _pool.acquire() as conn:
+                    await ModelGenerations.ensure_table(conn)
             except Exception as e:
                 print(f"CRITICAL: Async Pool Init Failed: {e}")
                 raise e
 
+            if os.getenv('DB_REPLICA_HOST'):
+                try:
+                    _replica_pool = await cls._create_pool('replica', 'DB_REPLICA')
+                    print("AsyncDatabase: Replica Pool Initialized")
+                except Exception as e:
+                    # Not fatal: read-only transactions fall back to the primary
+                    print(f"WARNING: Replica Pool Init Failed, reads stay on primary: {e}")
+                    _replica_pool = None
+
+    @classmethod
+    async def connect(cls):
+        """
+        Standalone connection outside the pool, for long-lived side work that
+        must not reduce request capacity: LISTEN (PgListener), EXPLAIN sampling.
+        """
+        return await asyncpg.connect(**cls._connect_kwargs())
+
     @classmethod
     def get_pool(cls):
         return _pool
 
+    @classmethod
+    def get_replica_pool(cls):
+        return _replica_pool
+
+    @classmethod
+    def pool_stats(cls):
+        """
+        Pool metrics per role: admission (in-use, waiters, wait histogram per
+        priority class) plus the asyncpg pool's open and idle connections.
+        """
+        res = {}
+        for role, pool in (('primary', _pool), ('replica', _replica_pool)):
+            gate = cls._gates.get(role)
+            if pool is None or gate is None: continue
+            stats = gate.stats()
+            stats['open'] = pool.get_size()
+            stats['idle'] = pool.get_idle_size()
+            res[role] = stats
+        return res
+
     @classmethod
     async def close(cls):
-        global _pool
+        global _pool, _replica_pool
+        if _replica_pool:
+            await _replica_pool.close()
+            _replica_pool = None
         if _pool:
             await _pool.close()
             _pool = None
             print("AsyncDatabase: Pool Closed")
+        cls._gates.clear()
+
+    @classmethod
+    async def mark_write(cls, uid):
+        """
+        uid committed a write: pin their reads to the primary for REPLICA_RYW seconds.
+        Shared through the cache so other workers honour it too.
+        """
+        if not uid or _replica_pool is None: return
+        cls._recent_writers[uid] = time.monotonic() + cls.REPLICA_RYW
+        from .cache import Cache
+        await Cache.set(f"ryw:{uid}", 1, ttl=max(1, math.ceil(cls.REPLICA_RYW)), l1_ttl=cls.REPLICA_RYW)
+
+    @classmethod
+    async def recently_wrote(cls, uid):
+        if not uid: return False
+        deadline = cls._recent_writers.get(uid)
+        if deadline is not None:
+            if deadline > time.monotonic(): return True
+            del cls._recent_writers[uid]
+        from .cache import Cache
+        return bool(await Cache.get(f"ryw:{uid}"))
+
+    @classmethod
+    async def _checkout(cls, role, pool, priority, timeout=None):
+        """
+        Admission (priority, timeout) then an asyncpg connection.
+        Raises PoolTimeout.
+        """
+        gate = cls._gates.get(role)
+        if gate is not None:
+            await gate.acquire(priority, timeout)
+        try:
+            return await pool.acquire()
+        except BaseException:
+            if gate is not None: gate.release()
+            raise
+
+    @classmethod
+    async def _checkin(cls, role, pool, conn):
+        try:
+            await pool.release(conn)
+        finally:
+            gate = cls._gates.get(role)
+            if gate is not None: gate.release()
 
     @classmethod
     @asynccontextmanager
-    async def acquire(cls):
+    async def acquire(cls, readonly=False, uid=None, priority=PoolGate.UI):
+        """
+        Cursor inside a transaction (COMMIT on exit, ROLLBACK on error).
+        readonly=True: READ ONLY transaction, served by the replica when there
+        is one and uid has no recent write; the primary otherwise.
+        priority: PoolGate class (UI, API, QUEUE). Raises PoolTimeout when no
+        connection is available within the class timeout.
+        """
         if _pool is None:
             await cls.initialize()
-        
-        async with _pool.acquire() as conn:
+
+        role, pool, conn = 'primary', _pool, None
+        if readonly and _replica_pool is not None and not await cls.recently_wrote(uid):
+            try:
+                conn = await cls._checkout('replica', _replica_pool, priority, timeout=cls.REPLICA_ACQUIRE_TIMEOUT)
+                role, pool = 'replica', _replica_pool
+            except Exception as e:
+                _logger.warning(f"AsyncDatabase: Replica unavailable, using primary: {e}")
+        if conn is None:
+            conn = await cls._checkout('primary', _pool, priority)
+
+        try:
             # We wrap the connection to behave like a cursor/transaction manager
-            # But asyncpg connection has 'execute', 'fetch', etc. directly.
             # Our ORM expects env.cr.execute(), env.cr.fetchall()
-            
-            # Smart Wrapper
             cursor = AsyncCursor(conn)
-            async with conn.transaction():
+            cursor.readonly = readonly
+            cursor.is_replica = role == 'replica'
+            cursor.uid = uid
+            bumped = None
+            async with conn.transaction(readonly=readonly):
                 yield cursor
+                wrote = bool(cursor.notifications)
+                # Coalesced change notifications go out once, just before COMMIT
+                if not readonly:
+                    bumped = await cursor.notifications.flush(cursor)
+            if bumped:
+                # Committed: our own generations, without waiting for the NOTIFY
+                ModelGenerations.apply(bumped)
+            if wrote:
+                await cls.mark_write(uid)
+        finally:
+            await cls._checkin(role, pool, conn)
+
+    @classmethod
+    @asynccontextmanager
+    async def cursor(cls, readonly=False, uid=None, priority=PoolGate.UI):
+        """
+        Like acquire(), but the pooled connection is only taken on the first
+        query (see LazyCursor). Handlers that never query never hold one.
+        """
+        cr = LazyCursor(readonly=readonly, uid=uid, priority=priority)
+        try:
+            yield cr
+        except BaseException as e:
+            await cr.release(e)
+            raise
+        else:
+            await cr.release()
 
     @classmethod
     async def create_table(cls, cr, table_name, columns, constraints):
@@ -186,7 +382,14 @@ class AsyncDatabase:
 class AsyncCursor:
     def __init__(self, conn):
         self.conn = conn
+        self.readonly = False # READ ONLY transaction (see AsyncDatabase.acquire)
+        self.is_replica = False
+        # Per-request statement counters (core.sql_stats); LazyCursor shares its own
+        self.stats = QueryStats() if sql_stats.ENABLED else None
+        self.uid = None # For slow query EXPLAIN (same RLS uid)
         self._last_result = None
+        from core.notify import ChangeBuffer
+        self.notifications = ChangeBuffer()
         import sqlparams
         self._params_converter = sqlparams.SQLParams('format', 'numeric_dollar')
         
@@ -206,6 +409,7 @@ class AsyncCursor:
         
         args = args or ()
         
+        start = time.perf_counter()
         try:
             if is_fetch:
                 # Use fetch for data
@@ -215,8 +419,15 @@ class AsyncCursor:
                 await self.conn.execute(pg_query, *args)
                 self._last_result = [] # No result
         except Exception as e:
-            print(f"AsyncDB Error: {e} | Query: {pg_query}")
+            _logger.error(f"AsyncDB Error: {e} | Query: {pg_query}")
             raise e
+        finally:
+            duration = time.perf_counter() - start
+            if self.stats is not None:
+                self.stats.record(pg_query, duration)
+            slow = SlowQueryLog.threshold()
+            if slow is not None and duration >= slow:
+                SlowQueryLog.record(pg_query, args, duration, uid=self.uid)
 
     def _convert_sql_params(self, query, args):
         """
@@ -277,7 +488,7 @@ class AsyncCursor:
         DO NOT USE FOR EXECUTION.
         Returns bytes (mocking psycopg2) or str.
         """
-        print("WARNING: 'mogrify' is deprecated and unsafe. Use parameterized queries.")
+        _logger.warning("WARNING: 'mogrify' is deprecated and unsafe. Use parameterized queries.")
         try:
              # Very basic simulation: try generic python formatting
              # This handles %s -> value textual replacement
@@ -330,8 +541,112 @@ class AsyncCursor:
             # For purely %s -> $1, args are untouched.
             # Let's trust that validation/structure is simpler here.
             
+        start = time.perf_counter()
         try:
             await self.conn.executemany(pg_query, args_list)
         except Exception as e:
-            print(f"AsyncDB Bulk Error: {e} | Query: {pg_query}")
+            _logger.error(f"AsyncDB Bulk Error: {e} | Query: {pg_query}")
             raise e
+        finally:
+            duration = time.perf_counter() - start
+            if self.stats is not None:
+                self.stats.record(pg_query, duration)
+            slow = SlowQueryLog.threshold()
+            if slow is not None and duration >= slow:
+                SlowQueryLog.record(pg_query, args_list[0] if args_list else (), duration, uid=self.uid)
+
+
+class LazyCursor:
+    """
+    AsyncCursor stand-in that acquires its connection (and opens the
+    transaction) on the first query, through AsyncDatabase.acquire().
+    release() commits (or rolls back) and hands the connection back to the
+    pool as soon as the caller is done with the database, e.g. before the
+    response is rendered.
+    """
+    def __init__(self, readonly=False, uid=None, priority=PoolGate.UI):
+        self.readonly = readonly
+        self.uid = uid
+        self.priority = priority
+        from core.notify import ChangeBuffer
+        # Exists before the connection does: Environments share it (see Environment)
+        self.notifications = ChangeBuffer()
+        self.stats = QueryStats() if sql_stats.ENABLED else None
+        self._cursor = None
+        self._stack = None
+        self._on_connect = [] # (query, args) run right after acquisition
+        self._released = False
+
+    @property
+    def connected(self):
+        return self._cursor is not None
+
+    @property
+    def is_replica(self):
+        return bool(self._cursor and self._cursor.is_replica)
+
+    @property
+    def conn(self):
+        if self._cursor is None:
+            raise RuntimeError("LazyCursor: no connection yet (execute a query first)")
+        return self._cursor.conn
+
+    async def _ensure(self):
+        if self._cursor is None:
+            if self._released:
+                raise RuntimeError("LazyCursor: used after release()")
+            stack = AsyncExitStack()
+            cursor = await stack.enter_async_context(AsyncDatabase.acquire(readonly=self.readonly, uid=self.uid, priority=self.priority))
+            cursor.notifications = self.notifications
+            cursor.stats = self.stats
+            self._stack, self._cursor = stack, cursor
+            for query, args in self._on_connect:
+                await cursor.execute(query, args)
+            self._on_connect = []
+        return self._cursor
+
+    async def on_connect(self, query, args=None):
+        """
+        Transaction setup (e.g. the RLS GUC): runs now if connected,
+        otherwise right after the connection is acquired.
+        """
+        if self._cursor is not None:
+            await self._cursor.execute(query, args)
+        else:
+            self._on_connect.append((query, args))
+
+    async def execute(self, query, args=None):
+        cursor = await self._ensure()
+        return await cursor.execute(query, args)
+
+    async def executemany(self, query, args_list):
+        cursor = await self._ensure()
+        return await cursor.executemany(query, args_list)
+
+    def fetchall(self):
+        return self._cursor.fetchall() if self._cursor else []
+
+    def fetchone(self):
+        return self._cursor.fetchone() if self._cursor else None
+
+    @asynccontextmanager
+    async def savepoint(self):
+        cursor = await self._ensure()
+        async with cursor.savepoint():
+            yield
+
+    async def release(self, exc=None):
+        """
+        End the transaction: COMMIT (or ROLLBACK if exc is given) and
+        release the connection. No-op if no query ever ran.
+        """
+        self._released = True
+        stack, self._stack, self._cursor = self._stack, None, None
+        if stack is None:
+            return
+        if exc is None:
+            await stack.aclose()
+        else:
+            # Rolls back; the exception itself is re-raised by the caller
+            await stack.__aexit__(type(exc), exc, exc.__traceback__)
+
@@ -1,10 +1,36 @@
 from .registry import Registry
+from .notify import ChangeBuffer
+from .cache import MemoryStore
+
+# One round trip per request: RLS GUC + user row + company row + group closure.
+# The LATERAL subquery runs after set_config, so RLS policies already see the uid.
+BOOTSTRAP_SQL = """
+    WITH RECURSIVE closure(gid) AS (
+        SELECT res_groups_id FROM res_groups_res_users_rel WHERE res_users_id = $2
+        UNION
+        SELECT r.hid FROM res_groups_implied_rel r JOIN closure c ON r.gid = c.gid
+    )
+    SELECT b.* FROM (SELECT set_config('app.current_uid', $1::text, true) AS guc) s
+    CROSS JOIN LATERAL (
+        SELECT u.id, u.login, u.company_id,
+               c.name AS company_name, c.currency_id AS company_currency_id,
+               ARRAY(SELECT res_groups_id FROM res_groups_res_users_rel WHERE res_users_id = u.id) AS group_ids,
+               ARRAY(SELECT gid FROM closure) AS all_group_ids
+        FROM res_users u LEFT JOIN res_company c ON c.id = u.company_id
+        WHERE u.id = $2 AND s.guc IS NOT NULL
+    ) b
+"""
 
 class Environment:
     """
     The environment stores the context of the current transaction.
     It encapsulates the database cursor, the user ID, the context, and the cache.
     """
+    # bootstrap() results per uid; keys embed the generations below, so a change to
+    # users, groups or companies is picked up on the next request
+    BOOTSTRAP_TTL = 10
+    BOOTSTRAP_MODELS = ('res.users', 'res.groups', 'res.company')
+    _bootstrap_l1 = MemoryStore(max_entries=10000)
     def __init__(self, cr, uid, context=None):
         self.cr = cr # AsyncCursor (core.db_async)
         self.uid = uid
@@ -15,6 +41,14 @@ class Environment:
         self.permission_cache = {} # Cache for access rights: {(model_name, operation): bool}
         self.to_compute = set() # Queue for recomputation: {(model_name, id, field_name)}
         self.pending_writes = {} # {(model_name, id): {field_name: value}}
+        self.to_relate = {} # Stored related propagation: {(model_name, field_name, hop): set(source_ids)}
+        # Change notifications are transaction-scoped: share the cursor buffer so every
+        # Environment on the same transaction (sudo envs included) is flushed together.
+        self.notifications = getattr(cr, 'notifications', None)
+        if self.notifications is None:
+            self.notifications = ChangeBuffer()
+        self.user_group_ids = None # Group closure of uid, set by bootstrap()
+        self._bootstrap_data = None
 
     @property
     def registry(self):
@@ -35,6 +69,11 @@ class Environment:
         # The Model class (RecordSet) constructor expects (env, ids)
         return model_cls(self, ())
 
+    @property
+    def sql_stats(self):
+        """QueryStats of this transaction's cursor (core.sql_stats), or None."""
+        return getattr(self.cr, 'stats', None)
+
     @property
     def user(self):
         """Returns the RecordSet of the current user."""
@@ -55,6 +94,18 @@ class Environment:
         # Fallback or initialization
         return self.get('res.company').browse([]) # Empty if not set
         
+    def discard_pending(self):
+        """
+        Forget transaction-local state after a rolled back savepoint: cached
+        values and queued computes/writes may describe rows that no longer exist.
+        """
+        self.cache.clear()
+        self.to_compute.clear()
+        self.pending_writes.clear()
+        self.to_relate.clear()
+        if self._bootstrap_data:
+            self._prime_bootstrap(self._bootstrap_data) # Keep env.user/env.company usable
+
     async def prefetch_user(self):
         """
         Prefetch user and company data to ensure sync properties (env.user, env.company) 
@@ -68,3 +119,45 @@ class Environment:
         # Prefetch Company
         if user.company_id:
             await user.company_id.read(['name', 'currency_id'])
+
+    async def bootstrap(self):
+        """
+        Per-request setup of an authenticated uid: sets the app.current_uid GUC
+        (RLS) and loads what prefetch_user + get_group_ids would, in one statement.
+        Memoized per uid; a memo hit only costs the (transaction-local) set_config,
+        deferred to the first query on a LazyCursor.
+        """
+        if not self.uid: return
+        from .generations import ModelGenerations
+        
+        key = await ModelGenerations.key(self.cr, f"bootstrap:{self.uid}", self.BOOTSTRAP_MODELS)
+        data = self._bootstrap_l1.get(key)
+        if data is not None:
+            guc = ("SELECT set_config('app.current_uid', $1::text, true)", (str(self.uid),))
+            on_connect = getattr(self.cr, 'on_connect', None)
+            if on_connect:
+                # LazyCursor: no connection is taken just for the GUC
+                await on_connect(*guc)
+            else:
+                await self.cr.execute(*guc)
+        else:
+            await self.cr.execute(BOOTSTRAP_SQL, (str(self.uid), self.uid))
+            row = self.cr.fetchone()
+            if row is None: return # Unknown uid: leave the caches cold (ACL will deny)
+            data = {k: row[k] for k in ('login', 'company_id', 'company_name', 'company_currency_id')}
+            data['group_ids'] = list(row['group_ids'] or [])
+            data['all_group_ids'] = list(row['all_group_ids'] or [])
+            self._bootstrap_l1.set(key, data, ttl=self.BOOTSTRAP_TTL)
+        self._bootstrap_data = data
+        self._prime_bootstrap(data)
+
+    def _prime_bootstrap(self, data):
+        uid = self.uid
+        self.cache[('res.users', uid, 'login')] = data['login']
+        self.cache[('res.users', uid, 'company_id')] = data['company_id']
+        self.cache[('res.users', uid, 'groups_id')] = list(data['group_ids'])
+        if data['company_id']:
+            cid = data['company_id']
+            self.cache[('res.company', cid, 'name')] = data['company_name']
+            self.cache[('res.company', cid, 'currency_id')] = data['company_currency_id']
+        self.user_group_ids = list(data['all_group_ids'])
@@ -13,7 +13,7 @@ class Field(Generic[T]):
     _type = None
     _sql_type = None
 
-    def __init__(self, string=None, required=False, help=None, readonly=False, compute=None, store=True, default=None, translate=False, groups=None, index=None):
+    def __init__(self, string=None, required=False, help=None, readonly=False, compute=None, store=True, default=None, translate=False, groups=None, index=None, related=None):
         self.string = string
         self.required = required
         self.help = help
@@ -25,11 +25,20 @@ class Field(Generic[T]):
         self.translate = translate
         self.groups = groups
         self.index = index
+        self.related = related
         
         if compute and not store:
             self.store = False
             self._sql_type = None 
 
+        # Related Fields (Denormalized Copy)
+        # related='order_id.partner_id.name' is stored in the owning table and kept
+        # in sync by the ORM (see Model._update_related). Only stored mode is supported.
+        if related:
+            if not store:
+                raise ValueError(f"Related field '{related}' must be stored (store=True).")
+            self.readonly = True
+
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.name}>"
 
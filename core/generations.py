@@ -0,0 +1,110 @@
+import json
+import time
+from core.logger import category_logger
+
+_logger = category_logger('cache')
+
+class ModelGenerations:
+    """
+    Per-model generation counters.
+
+    Every transaction that changes a model bumps its row in ir_model_generation
+    right before COMMIT (same statement as the record_change NOTIFY, see
+    ChangeBuffer.flush), so a new generation is never visible before the data.
+    Committed generations are pushed to every listening process (PgListener)
+    on the 'model_generation' channel and applied by the writer itself after
+    COMMIT; entries not confirmed within REFRESH seconds are re-read from the DB.
+
+    Derived cache keys embed the generations of the models they depend on:
+    invalidating anything model-wide is one increment, stale entries age out.
+    """
+    TABLE = 'ir_model_generation'
+    CHANNEL = 'model_generation'
+    REFRESH = 30
+
+    _gens = {} # {model: (generation, refresh_at)}
+
+    DDL = f"""
+        CREATE TABLE IF NOT EXISTS "{TABLE}" (
+            model VARCHAR PRIMARY KEY,
+            gen BIGINT NOT NULL DEFAULT 0
+        )
+    """
+
+    # $3: changed models, $4: this channel. The statement using it must select
+    # FROM "generations" (one row) so the notify runs. The row lock on each
+    # model lives only from this statement to COMMIT.
+    BUMP_CTE = f"""
+        WITH bumped AS (
+            INSERT INTO "{TABLE}" (model, gen)
+            SELECT m, 1 FROM unnest($3::text[]) AS m
+            ON CONFLICT (model) DO UPDATE SET gen = "{TABLE}".gen + 1
+            RETURNING model, gen
+        ), generations AS (
+            SELECT pg_notify($4, (SELECT json_object_agg(model, gen) FROM bumped)::text)
+        )
+    """
+
+    @classmethod
+    async def ensure_table(cls, conn):
+        await conn.execute(cls.DDL)
+
+    @classmethod
+    def apply(cls, data):
+        """
+        Mirror generations received on CHANNEL ({model: generation}).
+        Generations only move forward.
+        """
+        refresh_at = time.monotonic() + cls.REFRESH
+        for model, gen in data.items():
+            current = cls._gens.get(model)
+            if current is None or gen >= current[0]:
+                cls._gens[model] = (gen, refresh_at)
+            else:
+                cls._gens[model] = (current[0], refresh_at)
+
+    @classmethod
+    def on_notify(cls, payload):
+        try:
+            cls.apply(json.loads(payload) or {})
+        except Exception as e:
+            _logger.error(f"Generation Notify Error: {e}")
+
+    @classmethod
+    def clear(cls):
+        # Notifications may have been missed (listener reconnect): re-read everything
+        cls._gens.clear()
+
+    @classmethod
+    async def get(cls, cr, models):
+        """
+        {model: generation} for the given models (0 if never changed).
+        One query for the entries that are unknown or due for refresh.
+        """
+        now = time.monotonic()
+        res = {}
+        stale = []
+        for model in models:
+            entry = cls._gens.get(model)
+            if entry and entry[1] > now:
+                res[model] = entry[0]
+            else:
+                stale.append(model)
+
+        if stale:
+            await cr.execute(f'SELECT model, gen FROM "{cls.TABLE}" WHERE model = ANY($1::text[])', [stale])
+            found = {r['model']: r['gen'] for r in cr.fetchall()}
+            cls.apply({m: found.get(m, 0) for m in stale})
+            for model in stale:
+                res[model] = cls._gens[model][0]
+        return res
+
+    @classmethod
+    async def key(cls, cr, key, models):
+        """
+        Derived cache key embedding the generations of `models`:
+        'menus:2' + ['ir.ui.menu'] -> 'menus:2@ir.ui.menu=14'
+        """
+        models = sorted(set(models))
+        gens = await cls.get(cr, models)
+        return f"{key}@" + ",".join(f"{m}={gens[m]}" for m in models)
@@ -17,9 +17,17 @@ from core.cache import Cache
 
 # Import middleware/deps
 from core.db_async import AsyncDatabase
+from core.pool import PoolGate, PoolTimeout
+from core import sql_stats
+from core import profiler
+from core.loop_monitor import LoopMonitor
+from core.logger import category_logger
+from core.metrics import Metrics, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from core.env import Environment
 from core.api.router import api_router
 
+_logger = category_logger('http')
+
 # --- Module Loading Logic ---
 def load_modules():
     print("Loading Modules...")
@@ -70,6 +78,15 @@ async def lifespan(app: FastAPI):
     # Start PG Listener
     task = asyncio.create_task(pg_listener())
     
+    # Start L1 Invalidation Listener (cross-worker cache coherence)
+    cache_task = asyncio.create_task(Cache.invalidation_listener())
+
+    # Push this worker's metrics for /metrics (served by any worker)
+    metrics_task = asyncio.create_task(Metrics.publisher())
+
+    # Event loop stall detector (logs the blocking stack)
+    loop_monitor_task = asyncio.create_task(LoopMonitor.run())
+    
     yield
     # Shutdown: Close Pool
     # task.cancel() # Optional
@@ -82,12 +99,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-SQL-Stats"],
 )
+app.add_middleware(MetricsMiddleware)
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    # Prometheus scrape: every worker's counters merged (METRICS_TOKEN = bearer auth)
+    if not Metrics.authorized(request.headers.get('authorization')):
+        return Response(status_code=401)
+    return Response(content=await Metrics.scrape(), media_type=METRICS_CONTENT_TYPE)
+
+def pool_timeout_response():
+    return JSONResponse(status_code=503, content={"error": "Server busy, please retry."}, headers={"Retry-After": "1"})
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # /api endpoints (dependency cursors)
+    _logger.warning(f"Pool Timeout: {request.url.path}: {exc}")
+    return pool_timeout_response()
+
 # --- WebSockets Logic ---
 from fastapi import WebSocket, WebSocketDisconnect
 from core.bus import bus
+from core.pg_listener import PgListener
 import asyncio
 import json
 
@@ -96,62 +132,34 @@ async def websocket_endpoint(websocket: WebSocket):
     await bus.connect(websocket)
     try:
         while True:
-            # Keep alive / Heartbeat
-            # Just read text, we don't expect client messages yet
-            await websocket.receive_text()
+            # Client messages: subscriptions (and keep alive)
+            text = await websocket.receive_text()
+            bus.handle_message(websocket, text)
     except WebSocketDisconnect:
         bus.disconnect(websocket)
     except Exception as e:
-        print(f"WS Error: {e}")
+        _logger.error(f"WS Error: {e}")
         bus.disconnect(websocket)
 
 async def pg_listener():
     """
-    Background Task to listen for Postgres notifications.
+    Background Task to listen for Postgres notifications (L1 invalidation,
+    generations) and push record changes to the WebSockets.
     """
-    import asyncio
-    print("PG Listener: Starting...")
-    while True:
-        try:
-            pool = AsyncDatabase.get_pool()
-            if not pool:
-                await asyncio.sleep(1)
-                continue
-                
-            # Acquire Dedicated Connection
-            async with pool.acquire() as conn:
-                print("PG Listener: Connected to DB. Listening on 'record_change'...")
-                
-                # Callback (must be non-blocking)
-                def on_notify(conn, pid, channel, payload):
-                    # print(f"PG Notify: {payload}")
-                    try:
-                        data = json.loads(payload)
-                        # 1. Invalidar Caché L1 (Critico para Scale)
-                        asyncio.create_task(Cache.invalidate_model(data.get('model'), data.get('ids')))
-                        
-                        # 2. Broadcast a WebSockets
-                        asyncio.create_task(bus.broadcast(data))
-                    except Exception as e:
-                        print(f"PG Notify Error: {e}")
-
-                await conn.add_listener('record_change', on_notify)
-                
-                # Halt loop to keep connection open
-                while True:
-                    await asyncio.sleep(60)
-        except asyncio.CancelledError:
-            print("PG Listener: Cancelled")
-            break
-        except Exception as e:
-            print(f"PG Listener Crash: {e}. Retrying in 5s...")
-            await asyncio.sleep(5)
+    await PgListener.run(broadcast=bus.broadcast)
             
 # ------------------------
 
 
 from core.session import Session, get_session
 
+def rpc_method(nx_req):
+    # 'model.method' of a call_kw request, for SQL stats / logs
+    params = nx_req.json.get('params', nx_req.json) if isinstance(nx_req.json, dict) else {}
+    if isinstance(params, dict) and params.get('model') and params.get('method'):
+        return f"{params['model']}.{params['method']}"
+    return None
+
 # Adapter for Nexus Request
 class NexusRequest:
     def __init__(self, request: Request, session: Session, params: dict):
@@ -191,7 +199,7 @@ for path, info in ROUTES.items():
     fastapi_path = convert_route_path(path)
     
     # Wrapper function generator
-    def make_handler(func, auth):
+    def make_handler(func, auth, info_readonly=False):
         async def handler(request: Request, response: Response, session: Session = Depends(get_session)):
             # 1. CSRF Protection (Audit Remediation)
             if request.method in ("POST", "PUT", "DELETE", "PATCH"):
@@ -200,36 +208,27 @@ for path, info in ROUTES.items():
                     pass
                 else:
                     csrf_header = request.headers.get("X-CSRF-Token")
-                    if not csrf_header or csrf_header != session.csrf_token:
+                    # Bearer-token sessions aren't sent automatically by browsers: no CSRF exposure
+                    if not session.stateless and not session.check_csrf(csrf_header):
                          return JSONResponse(status_code=403, content={"error": "CSRF Validation Failed. Please refresh the page."})
 
             # 2. Auth Check
             if auth == 'user' and not session.uid:
                  return JSONResponse(status_code=403, content={"error": "Login Required"})
 
-            # Async DB Connection (Transaction Managed by acquire context)
-            try:
-                # acquire() yields a cursor inside a transaction.
-                # If we exit block without error -> Commit. 
-                # If we raise exception -> Rollback.
-                async with AsyncDatabase.acquire() as cr:
+            async def run(nx_req, readonly):
+                # The cursor takes a pooled connection on the first query only
+                # (routes that never query never hold one). Leaving the block
+                # commits (rollback on exception) and releases it, before the
+                # response is rendered and the session saved.
+                async with AsyncDatabase.cursor(readonly=readonly, uid=session.uid, priority=PoolGate.UI) as cr:
                     uid = session.uid
-                    
-                    # RLS Context
-                    if uid:
-                        # Use set_config for safe parameterization (SET syntax doesn't support $1)
-                        await cr.execute("SELECT set_config('app.current_uid', $1::text, true)", (str(uid),))
-                    
                     env = Environment(cr, uid=uid, context=session.context)
                     
-                    # Async Prefetch to support Sync Properties (env.user, env.company) in Controllers
+                    # RLS Context (app.current_uid GUC) + user, company and groups in one
+                    # round trip, so sync properties (env.user, env.company) work in Controllers
                     if uid:
-                        await env.prefetch_user()
-                    
-                    # Prepare Nexus Request
-                    params = request.path_params
-                    nx_req = NexusRequest(request, session, params)
-                    await nx_req.load_body()
+                        await env.bootstrap()
                     
                     # Call Controller
                     # Controllers can be sync (old) or async (new).
@@ -239,48 +238,83 @@ for path, info in ROUTES.items():
                     else:
                         # Fallback for legacy sync controllers that DO NOT use ORM logic?
                         # If a sync controller uses ORM, it will crash.
-                        print(f"WARNING: Sync Controller called: {func.__name__}. Migration Required.")
+                        _logger.warning(f"WARNING: Sync Controller called: {func.__name__}. Migration Required.")
                         nx_resp = func(nx_req, env)
                         if inspect.iscoroutine(nx_resp):
                              nx_resp = await nx_resp
+                return nx_resp, cr.stats
+
+            def convert(nx_resp):
+                if isinstance(nx_resp, NexusResponse):
+                    final_response = Response(content=nx_resp.render(), status_code=nx_resp.status, media_type=nx_resp.content_type)
+                    
+                    # headers
+                    for k, v in nx_resp.headers.items():
+                        final_response.headers[k] = v
+                    # cookies
+                    for k, v in nx_resp.cookies.items():
+                         final_response.set_cookie(key=k, value=v.value, httponly=v['httponly'], path=v['path'])
                     
-                    # Convert Response
-                    # Convert Response
-                    if isinstance(nx_resp, NexusResponse):
-                        final_response = Response(content=nx_resp.render(), status_code=nx_resp.status, media_type=nx_resp.content_type)
-                        
-                        # headers
-                        for k, v in nx_resp.headers.items():
-                            final_response.headers[k] = v
-                        # cookies
-                        for k, v in nx_resp.cookies.items():
-                             final_response.set_cookie(key=k, value=v.value, httponly=v['httponly'], path=v['path'])
-                        
-                        # session cookie
-                        # Ensure samesite='lax' for localhost dev. Secure if HTTPS.
+                    # session cookie (only for sessions that exist in the store)
+                    # Ensure samesite='lax' for localhost dev. Secure if HTTPS.
+                    if session.is_stored:
                         is_secure = os.getenv('SESSION_SECURE', 'False').lower() == 'true'
                         final_response.set_cookie('session_id', session.sid, httponly=True, samesite='lax', secure=is_secure)
-                        
-                        return final_response
-                    elif isinstance(nx_resp, (dict, list)):
-                         return JSONResponse(content=nx_resp)
-                    else:
-                         return HTMLResponse(content=str(nx_resp))
+                    return final_response
+                elif isinstance(nx_resp, (dict, list)):
+                     return JSONResponse(content=nx_resp)
+                else:
+                     return HTMLResponse(content=str(nx_resp))
 
-            except Exception as e:
-                # Transaction Rolled back by async with block exit
-                print(f"Error: {e}")
-                import traceback
-                traceback.print_exc()
-                # Security: Hide details in Production
-                env_type = os.getenv('ENV_TYPE', 'prod')
-                error_msg = str(e) if env_type == 'dev' else "Internal Server Error"
-                return JSONResponse(status_code=500, content={"error": error_msg})
+            # Request body first: readonly routes may decide from it (e.g. call_kw method)
+            params = request.path_params
+            nx_req = NexusRequest(request, session, params)
+            await nx_req.load_body()
+            try:
+                readonly = info_readonly(nx_req) if callable(info_readonly) else bool(info_readonly)
+            except Exception:
+                readonly = False # Malformed body: let the controller report it
+
+            # Sampling profiler (PROFILE_RATE / PROFILE_ROUTES / PROFILE_UIDS or X-Nexo-Profile)
+            with profiler.profiling(request.url.path, session.uid, request.headers.get(profiler.HEADER), rpc_method(nx_req)):
+                # Async DB Connection (Transaction Managed by the cursor context)
+                try:
+                    try:
+                        nx_resp, stats = await run(nx_req, readonly)
+                    except AsyncDatabase.READONLY_ERRORS:
+                        if not readonly: raise
+                        # Route marked readonly but wrote: replay read-write on the primary
+                        _logger.warning(f"WARNING: Readonly route {request.url.path} attempted a write, retrying on primary")
+                        nx_resp, stats = await run(nx_req, False)
+
+                    # Connection already back in the pool
+                    await session.save_if_dirty()
+                    final_response = convert(nx_resp)
+
+                    # SQL instrumentation: header in dev, structured log (N+1, heavy requests)
+                    if stats is not None and stats.count:
+                        if os.getenv('ENV_TYPE', 'prod') == 'dev':
+                            final_response.headers['X-SQL-Stats'] = stats.header()
+                        sql_stats.report(request.url.path, stats, method=rpc_method(nx_req))
+                    return final_response
+
+                except PoolTimeout as e:
+                    # Overloaded: fail fast, the client retries
+                    _logger.warning(f"Pool Timeout: {request.url.path}: {e}")
+                    return pool_timeout_response()
+
+                except Exception as e:
+                    # Transaction Rolled back by async with block exit
+                    _logger.error(f"Error: {e}", exc_info=True)
+                    # Security: Hide details in Production
+                    env_type = os.getenv('ENV_TYPE', 'prod')
+                    error_msg = str(e) if env_type == 'dev' else "Internal Server Error"
+                    return JSONResponse(status_code=500, content={"error": error_msg})
         return handler
 
     # Register with supporting methods (GET/POST)
     # Original framework didn't distinguish, so allow all
-    app.add_api_route(fastapi_path, make_handler(nx_func, auth_mode), methods=["GET", "POST", "PUT", "DELETE"])
+    app.add_api_route(fastapi_path, make_handler(nx_func, auth_mode, info.get('readonly')), methods=["GET", "POST", "PUT", "DELETE"])
 
 # Static Files Middleware
 # Pattern: /<module>/static/<file_path>
@@ -1,16 +1,39 @@
 import logging
+import logging.handlers
+import atexit
 import json
+import queue
+import random
 import sys
 import os
+import time
 from datetime import datetime
 
+# Records waiting for the writer thread; beyond this they are dropped (counted)
+QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# Fraction of records kept per category: "cache=0.1,queue=0.5" (default 1)
+SAMPLE = os.getenv('LOG_SAMPLE', '')
+# Records per second per category: "audit=5,cache=20"; '*' sets the default
+RATE_LIMIT = os.getenv('LOG_RATE_LIMIT', '*=100')
+# Never limited by the '*' default (only by an explicit limit of their own)
+DEFAULT_EXEMPT = ('audit',)
+
+def _parse_categories(value):
+    res = {}
+    for item in value.split(','):
+        if '=' in item:
+            key, _, num = item.partition('=')
+            res[key.strip()] = float(num)
+    return res
+
 class JsonFormatter(logging.Formatter):
     """
     Format logs as JSON objects for structured logging (Datadog/ELK ready).
     """
     def format(self, record):
         log_record = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # Creation time: the record may be written a little later
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -20,43 +43,155 @@ class JsonFormatter(logging.Formatter):
             "process": record.process,
             "thread": record.threadName
         }
-        
-        # Add exception info if present
+        if getattr(record, 'category', None):
+            log_record["category"] = record.category
+        if getattr(record, 'suppressed', 0):
+            log_record["suppressed"] = record.suppressed
+
+        # Add exception info if present (already rendered when queued)
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
-            
+        elif record.exc_text:
+            log_record["exception"] = record.exc_text
+
         # Add extra fields (context)
         if hasattr(record, 'context'):
             log_record.update(record.context)
-            
-        return json.dumps(log_record)
 
-def get_logger(name, level=logging.INFO):
+        return json.dumps(log_record, default=str)
+
+class CategoryFilter(logging.Filter):
     """
-    Factory to return a configured logger instance.
+    Per-category sampling and rate limiting, applied before a record is
+    queued so a noisy category costs at most its budget.
+    The category is `extra={'category': ...}` or the logger name below
+    'nexo_erp.' (see category_logger). Records over the rate limit are
+    counted; the next record let through reports them as `suppressed`.
+    The '*' default only applies below WARNING and outside DEFAULT_EXEMPT:
+    a burst of errors or audit records is never dropped by it.
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
-    # Avoid adding multiple handlers if get_logger is called repeatedly
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        
+    def __init__(self, sample=None, rate_limit=None):
+        super().__init__()
+        self.sample = _parse_categories(SAMPLE) if sample is None else sample
+        limits = _parse_categories(RATE_LIMIT) if rate_limit is None else rate_limit
+        self.default_rate = limits.pop('*', 0)
+        self.rate_limit = limits
+        self._buckets = {} # category -> [tokens, last refill, suppressed]
+
+    def filter(self, record):
+        category = getattr(record, 'category', None)
+        if category is None:
+            name = record.name
+            category = name[9:] if name.startswith('nexo_erp.') else 'app'
+            record.category = category
+
+        rate = self.sample.get(category)
+        if rate is not None and random.random() >= rate:
+            return False
+
+        limit = self.rate_limit.get(category)
+        if limit is None:
+            if record.levelno >= logging.WARNING or category in DEFAULT_EXEMPT:
+                return True
+            limit = self.default_rate
+        if limit <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = self._buckets[category] = [limit, now, 0]
+        bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without blocking: the caller only
+    renders the message (and traceback); JSON encoding and the write
+    happen in the writer. A full queue drops the record.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    """
+    Process-wide pipeline: loggers -> CategoryFilter -> bounded queue ->
+    writer thread (QueueListener) -> stdout, JSON or plain text (LOG_FORMAT).
+    """
+    def __init__(self, stream=None, queue_size=None, category_filter=None):
+        self.queue = queue.Queue(maxsize=queue_size or QUEUE_SIZE)
+        self.handler = AsyncQueueHandler(self.queue)
+        self.handler.addFilter(category_filter or CategoryFilter())
+        output = logging.StreamHandler(stream or sys.stdout)
+
         # Check env for format preference
         log_format = os.getenv('LOG_FORMAT', 'json')
-        
+
         if log_format.lower() == 'json':
-            handler.setFormatter(JsonFormatter())
+            output.setFormatter(JsonFormatter())
         else:
             # Human readable fallback
             formatter = logging.Formatter(
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
-            handler.setFormatter(formatter)
-            
-        logger.addHandler(handler)
-        
+            output.setFormatter(formatter)
+        self.listener = logging.handlers.QueueListener(self.queue, output)
+        self.listener.start()
+
+    def stop(self):
+        # Flushes what is queued
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+_pipeline = None
+
+def pipeline():
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline()
+        atexit.register(_pipeline.stop)
+    return _pipeline
+
+def get_logger(name, level=logging.INFO):
+    """
+    Factory to return a configured logger instance.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(os.getenv('LOG_LEVEL', '').upper() or level)
+
+    # Avoid adding multiple handlers if get_logger is called repeatedly
+    if not logger.handlers:
+        logger.addHandler(pipeline().handler)
+
     return logger
 
+def category_logger(category):
+    """
+    Child of the default logger for one category ('audit', 'cache', 'queue'...):
+    sampled and rate limited on its own (LOG_SAMPLE, LOG_RATE_LIMIT).
+    """
+    return logging.getLogger(f"nexo_erp.{category}")
+
 # Default instance
 logger = get_logger("nexo_erp")
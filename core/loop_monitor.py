@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+# A callback blocking the loop longer than this is reported (<= 0 disables)
+THRESHOLD_MS = float(os.getenv('LOOP_LAG_MS', 200))
+INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL_MS', 50)) / 1000
+
+
+class LoopMonitor:
+    """
+    Event loop stall detector.
+
+    The loop beats every LOOP_LAG_INTERVAL_MS; the delay of each beat is the
+    loop lag (nexo_event_loop_lag_seconds). A watchdog thread watches the
+    beats: once the loop has been silent for LOOP_LAG_MS it captures the
+    loop thread's stack, i.e. the code blocking it (password hashing, PDF
+    rendering, XML parsing, a large json.dumps...). When the loop comes back
+    one warning is logged with the stall duration and that stack.
+    """
+    _thread = None
+    _loop_thread_id = None
+    _last_beat = None
+    _stall_stack = None
+    _stalls = 0
+
+    @classmethod
+    async def run(cls):
+        """
+        Background task (lifespan).
+        """
+        if THRESHOLD_MS <= 0: return
+        from core.metrics import Metrics, LOOP_LAG
+        cls._loop_thread_id = threading.get_ident()
+        cls._last_beat = time.monotonic()
+        if cls._thread is None or not cls._thread.is_alive():
+            cls._thread = threading.Thread(target=cls._watchdog, name='nexo-loop-monitor', daemon=True)
+            cls._thread.start()
+        while True:
+            expected = time.monotonic() + INTERVAL
+            await asyncio.sleep(INTERVAL)
+            now = time.monotonic()
+            cls._last_beat = now
+            lag = max(0.0, now - expected)
+            Metrics.observe(LOOP_LAG, (), lag)
+            stack, cls._stall_stack = cls._stall_stack, None
+            if stack is not None:
+                cls._report(lag, stack)
+
+    @classmethod
+    def _report(cls, lag, stack):
+        cls._stalls += 1
+        from core.logger import logger
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f}ms",
+            extra={'context': {'event': 'loop_stall', 'blocked_ms': round(lag * 1000, 1), 'stack': stack}}
+        )
+
+    @classmethod
+    def _watchdog(cls):
+        threshold = THRESHOLD_MS / 1000
+        reported = None # Beat of the stall already captured
+        while True:
+            time.sleep(min(INTERVAL, threshold / 2))
+            beat = cls._last_beat
+            if beat is None or beat == reported: continue
+            if time.monotonic() - beat > threshold:
+                frame = sys._current_frames().get(cls._loop_thread_id)
+                if frame is None: continue
+                cls._stall_stack = ''.join(traceback.format_stack(frame))
+                reported = beat
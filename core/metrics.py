@@ -0,0 +1,368 @@
+import asyncio
+import bisect
+import json
+import os
+import time
+from core.logger import category_logger
+
+_logger = category_logger('metrics')
+
+# Every worker pushes its snapshot this often; /metrics merges all of them
+PUSH_INTERVAL = float(os.getenv('METRICS_PUSH_INTERVAL', 5))
+# Optional bearer token required by /metrics
+TOKEN = os.getenv('METRICS_TOKEN')
+
+WORKERS_KEY = 'metrics:workers'
+WORKER_KEY = 'metrics:worker:'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request / RPC / task latency (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+    """
+    Per-process counters, gauges and histograms, exported in the Prometheus
+    text format by /metrics.
+
+    Updates are plain dict operations on the event loop thread: no locks, a
+    few hundred nanoseconds on the hot path. Values derived from state that
+    already exists (pool, L1/L2 cache, websockets) are only read by
+    collectors, at snapshot time.
+
+    Each uvicorn worker pushes its snapshot to Redis every PUSH_INTERVAL
+    (expiring after three missed pushes). The worker answering /metrics
+    merges its own live snapshot with the others': counters and histograms
+    are summed, gauges summed or maxed per metric.
+    """
+    # name -> (kind, help, labelnames, buckets | gauge aggregation)
+    _defs = {}
+    # name -> {labels tuple: value}; histogram value = [per bucket..., +Inf, sum]
+    _values = {}
+    # fn(put): per worker values read at snapshot time
+    _collectors = []
+    # async fn(put): cluster-wide values read once per scrape (e.g. queue depth)
+    _scrape_collectors = []
+
+    @classmethod
+    def _define(cls, name, kind, help, labels, extra):
+        cls._defs[name] = (kind, help, tuple(labels), extra)
+        cls._values.setdefault(name, {})
+
+    @classmethod
+    def counter(cls, name, help, labels=()):
+        cls._define(name, 'counter', help, labels, None)
+
+    @classmethod
+    def gauge(cls, name, help, labels=(), agg='sum'):
+        # agg: how workers combine ('sum' or 'max')
+        cls._define(name, 'gauge', help, labels, agg)
+
+    @classmethod
+    def histogram(cls, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        cls._define(name, 'histogram', help, labels, tuple(buckets))
+
+    @classmethod
+    def collector(cls, fn):
+        cls._collectors.append(fn)
+        return fn
+
+    @classmethod
+    def scrape_collector(cls, fn):
+        cls._scrape_collectors.append(fn)
+        return fn
+
+    # --- Hot path ---
+
+    @classmethod
+    def inc(cls, name, labels=(), value=1):
+        series = cls._values[name]
+        series[labels] = series.get(labels, 0) + value
+
+    @classmethod
+    def set(cls, name, labels, value):
+        cls._values[name][labels] = value
+
+    @classmethod
+    def observe(cls, name, labels, value):
+        series = cls._values[name]
+        h = series.get(labels)
+        buckets = cls._defs[name][3]
+        if h is None:
+            h = series[labels] = [0] * (len(buckets) + 2)
+        h[bisect.bisect_left(buckets, value)] += 1
+        h[-1] += value
+
+    # --- Export ---
+
+    @classmethod
+    def snapshot(cls):
+        """
+        This worker's values: {name: [[labels], value]...}, collectors included.
+        """
+        values = {name: dict(series) for name, series in cls._values.items()}
+
+        def put(name, labels, value):
+            values[name][tuple(labels)] = value
+
+        for fn in cls._collectors:
+            try:
+                fn(put)
+            except Exception as e:
+                _logger.error(f"Metrics collector {fn.__name__} failed: {e}")
+        return {name: [[list(k), v] for k, v in series.items()] for name, series in values.items()}
+
+    @classmethod
+    def merge(cls, snapshots):
+        """
+        {name: {labels tuple: value}} combining several worker snapshots.
+        """
+        merged = {name: {} for name in cls._defs}
+        for snap in snapshots:
+            for name, series in snap.items():
+                d = cls._defs.get(name)
+                if d is None: continue
+                target = merged[name]
+                for labels, value in series:
+                    key = tuple(labels)
+                    prev = target.get(key)
+                    if prev is None:
+                        target[key] = list(value) if isinstance(value, list) else value
+                    elif d[0] == 'histogram':
+                        if len(prev) == len(value):
+                            target[key] = [a + b for a, b in zip(prev, value)]
+                    elif d[0] == 'gauge' and d[3] == 'max':
+                        target[key] = max(prev, value)
+                    else:
+                        target[key] = prev + value
+        return merged
+
+    @classmethod
+    def render(cls, merged):
+        lines = []
+        for name, (kind, help, labelnames, extra) in cls._defs.items():
+            series = merged.get(name)
+            if not series: continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series.items()):
+                pairs = list(zip(labelnames, labels))
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(extra + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    # --- Cross-worker aggregation ---
+
+    @classmethod
+    async def publish(cls):
+        from core.cache import Cache
+        if not Cache.use_redis: return
+        key = WORKER_KEY + Cache.node_id
+        async with Cache.redis.pipeline() as pipe:
+            await pipe.set(key, json.dumps(cls.snapshot()), ex=max(1, int(PUSH_INTERVAL * 3)))
+            await pipe.sadd(WORKERS_KEY, Cache.node_id)
+            await pipe.execute()
+
+    @classmethod
+    async def publisher(cls):
+        """
+        Background task (lifespan): push this worker's snapshot periodically.
+        """
+        from core.cache import Cache
+        if not Cache.initialized: await Cache.initialize()
+        while True:
+            try:
+                await cls.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _logger.error(f"Metrics publish failed: {e}")
+            await asyncio.sleep(PUSH_INTERVAL)
+
+    @classmethod
+    async def _worker_snapshots(cls):
+        from core.cache import Cache
+        if not Cache.use_redis: return []
+        node_ids = [n for n in await Cache.redis.smembers(WORKERS_KEY) if n != Cache.node_id]
+        if not node_ids: return []
+        blobs = await Cache.redis.mget([WORKER_KEY + n for n in node_ids])
+        gone = [n for n, blob in zip(node_ids, blobs) if blob is None]
+        if gone:
+            await Cache.redis.srem(WORKERS_KEY, *gone) # Worker stopped: snapshot expired
+        return [json.loads(blob) for blob in blobs if blob is not None]
+
+    @classmethod
+    async def scrape(cls):
+        """
+        Prometheus text for the whole deployment (this worker's live values
+        plus the last snapshot of every other worker).
+        """
+        snapshots = [cls.snapshot()]
+        try:
+            snapshots.extend(await cls._worker_snapshots())
+        except Exception as e:
+            _logger.warning(f"Metrics: other workers unavailable ({e}), exporting this worker only")
+        merged = cls.merge(snapshots)
+
+        def put(name, labels, value):
+            merged[name][tuple(labels)] = value
+
+        for fn in cls._scrape_collectors:
+            try:
+                await fn(put)
+            except Exception as e:
+                _logger.error(f"Metrics collector {fn.__name__} failed: {e}")
+        _cache_ratios(merged)
+        return cls.render(merged)
+
+    @classmethod
+    def authorized(cls, authorization):
+        if not TOKEN: return True
+        import secrets
+        return secrets.compare_digest(authorization or '', f"Bearer {TOKEN}")
+
+    @classmethod
+    def reset(cls):
+        # Tests
+        for series in cls._values.values():
+            series.clear()
+
+
+def _labels(pairs):
+    if not pairs: return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float('inf'): return '+Inf'
+        return repr(round(value, 6))
+    return str(value)
+
+
+# --- Metric definitions ---
+
+HTTP_DURATION = 'nexo_http_request_duration_seconds'
+RPC_DURATION = 'nexo_rpc_duration_seconds'
+ORM_OPS = 'nexo_orm_operations_total'
+ORM_ROWS = 'nexo_orm_rows_total'
+TASK_DURATION = 'nexo_task_duration_seconds'
+TASK_WAIT = 'nexo_task_wait_seconds'
+CRON_LAG = 'nexo_cron_lag_seconds'
+LOOP_LAG = 'nexo_event_loop_lag_seconds'
+
+Metrics.histogram(HTTP_DURATION, 'HTTP request latency per route template.', ('route', 'method', 'status'))
+Metrics.histogram(RPC_DURATION, 'call_kw latency per model.method.', ('model', 'method', 'status'))
+Metrics.counter(ORM_OPS, 'ORM operations (search, read, search_read, create, write, unlink).', ('model', 'op'))
+Metrics.counter(ORM_ROWS, 'Rows returned or touched by ORM operations.', ('model', 'op'))
+Metrics.counter('nexo_cache_requests_total', 'RedisCache lookups per level and result.', ('level', 'result'))
+Metrics.gauge('nexo_cache_hit_ratio', 'RedisCache hit ratio per level (all workers, since start).', ('level',))
+Metrics.gauge('nexo_db_pool_connections', 'asyncpg pool connections by state.', ('role', 'state'))
+Metrics.gauge('nexo_db_pool_waiters', 'Requests waiting for a pooled connection.', ('role', 'class'))
+Metrics.counter('nexo_db_pool_timeouts_total', 'Pool acquisitions that timed out (503).', ('role', 'class'))
+Metrics.histogram('nexo_db_pool_wait_seconds', 'Time waited for a pooled connection.', ('role', 'class'),
+                  buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+Metrics.gauge('nexo_queue_depth', 'Tasks waiting in the TaskQueue.', ('queue',))
+Metrics.histogram(TASK_DURATION, 'TaskQueue task processing time.', ('task', 'status'))
+Metrics.histogram(TASK_WAIT, 'Time tasks spent queued before a worker picked them.', ('task',))
+Metrics.gauge(CRON_LAG, 'Delay of the most overdue cron job at the last cron pass.', agg='max')
+Metrics.histogram(LOOP_LAG, 'Event loop scheduling delay (see LoopMonitor).', buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+Metrics.gauge('nexo_websocket_connections', 'Open notification websockets.')
+Metrics.counter('nexo_websocket_dropped_total', 'Notifications dropped for slow websocket clients.')
+
+
+def orm_op(model, op, rows):
+    key = (model, op)
+    ops = Metrics._values[ORM_OPS]
+    ops[key] = ops.get(key, 0) + 1
+    touched = Metrics._values[ORM_ROWS]
+    touched[key] = touched.get(key, 0) + rows
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request. Labelled by route template
+    ('/api/{model}/{id}'), never the raw path, so cardinality stays bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', None) or 'other'
+            Metrics.observe(HTTP_DURATION, (route, scope['method'], str(status[0])), time.perf_counter() - start)
+
+
+@Metrics.collector
+def _collect_cache(put):
+    from core.cache import Cache
+    stats = Cache.stats()
+    if not stats: return
+    put('nexo_cache_requests_total', ('l1', 'hit'), stats.get('hits', 0))
+    put('nexo_cache_requests_total', ('l1', 'miss'), stats.get('misses', 0))
+    put('nexo_cache_requests_total', ('l2', 'hit'), stats.get('l2_hits', 0))
+    put('nexo_cache_requests_total', ('l2', 'miss'), stats.get('l2_misses', 0))
+
+
+def _cache_ratios(merged):
+    requests = merged.get('nexo_cache_requests_total') or {}
+    for level in ('l1', 'l2'):
+        hits = requests.get((level, 'hit'), 0)
+        total = hits + requests.get((level, 'miss'), 0)
+        if total:
+            merged['nexo_cache_hit_ratio'][(level,)] = hits / total
+
+
+@Metrics.collector
+def _collect_pool(put):
+    from core.db_async import AsyncDatabase
+    for role, stats in AsyncDatabase.pool_stats().items():
+        put('nexo_db_pool_connections', (role, 'in_use'), stats['in_use'])
+        put('nexo_db_pool_connections', (role, 'open'), stats['open'])
+        put('nexo_db_pool_connections', (role, 'idle'), stats['idle'])
+        put('nexo_db_pool_connections', (role, 'max'), stats['size'])
+        for cls_name, waiting in stats['waiters'].items():
+            put('nexo_db_pool_waiters', (role, cls_name), waiting)
+        for cls_name, m in stats['classes'].items():
+            put('nexo_db_pool_timeouts_total', (role, cls_name), m['timeouts'])
+            # PoolGate keeps the same layout: per bucket counts, +Inf, then the sum
+            put('nexo_db_pool_wait_seconds', (role, cls_name), m['wait_buckets'] + [m['wait_sum']])
+
+
+@Metrics.collector
+def _collect_websockets(put):
+    from core.bus import bus
+    put('nexo_websocket_connections', (), len(bus.connections))
+    put('nexo_websocket_dropped_total', (), sum(c.dropped for c in bus.connections.values()) + bus.dropped)
+
+
+@Metrics.scrape_collector
+async def _collect_queue(put):
+    from core.cache import Cache
+    from core.queue import TaskQueue
+    if not Cache.use_redis: return
+    put('nexo_queue_depth', (TaskQueue.QUEUE_KEY,), await Cache.redis.llen(TaskQueue.QUEUE_KEY))
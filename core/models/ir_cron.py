@@ -22,14 +22,17 @@ class IrCron(Model):
         Main loop entry point. 
         """
         from core.db_async import AsyncDatabase
+        from core.pool import PoolGate
         from core.env import Environment
         from core.registry import Registry
         from core.logger import logger
+        from core.metrics import Metrics, CRON_LAG
         
         # 1. Fetch Jobs (Short Transaction)
         jobs_data = [] # (id, name, nextcall, interval...)
+        lag = 0.0 # Most overdue job (seconds)
         try:
-            async with AsyncDatabase.acquire() as cr:
+            async with AsyncDatabase.acquire(priority=PoolGate.QUEUE) as cr:
                 env = Environment(cr, uid=1, context={})
                 Cron = env['ir.cron']
                 
@@ -54,11 +57,14 @@ class IrCron(Model):
                     
                     if nxt and nxt <= now:
                          jobs_data.append(candidate.id)
+                         lag = max(lag, (now - nxt).total_seconds())
                          
         except Exception as e:
             logger.error(f"Cron Fetch Error: {e}")
             return
 
+        Metrics.set(CRON_LAG, (), lag)
+
         if not jobs_data:
              return
 
@@ -69,13 +75,14 @@ class IrCron(Model):
     @classmethod
     async def _run_job_isolated(cls, job_id):
         from core.db_async import AsyncDatabase
+        from core.pool import PoolGate
         from core.env import Environment
         from core.logger import logger
         import inspect
         from datetime import datetime, timedelta
         
         try:
-            async with AsyncDatabase.acquire() as cr:
+            async with AsyncDatabase.acquire(priority=PoolGate.QUEUE) as cr:
                 env = Environment(cr, uid=1, context={})
                 job = await env['ir.cron'].browse([job_id]).read()
                 if not job: return # Deleted?
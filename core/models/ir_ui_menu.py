@@ -1,9 +1,17 @@
 from core.orm import Model
 from core.fields import Char, Integer, Many2one
+from core.logger import category_logger
+
+_logger = category_logger('menus')
+
+# The per-user tree also depends on record rules, ACLs and the user's groups
+MENU_DEPENDS = ['ir.ui.menu', 'ir.rule', 'ir.model.access', 'res.groups', 'res.users']
 
 class IrUiMenu(Model):
     _name = 'ir.ui.menu'
     _description = 'UI Menus'
+    _cache_records = True
+    _cache_search = True
 
     name = Char(string='Menu Name', required=True)
     parent_id = Many2one('ir.ui.menu', string='Parent Menu')
@@ -13,10 +21,20 @@ class IrUiMenu(Model):
     async def load_menus(self, user_id=None):
         """
         Returns the full menu tree.
+        Shared across requests; the key embeds the generations of MENU_DEPENDS.
         """
+        if any(self.env.notifications.touches(m) for m in MENU_DEPENDS):
+            return await self._load_menus()
+        
+        from core.cache import Cache
+        from core.generations import ModelGenerations
+        key = await ModelGenerations.key(self.env.cr, f"menus:{self.env.uid}", MENU_DEPENDS)
+        return await Cache.get_or_compute(key, self._load_menus, ttl=3600)
+
+    async def _load_menus(self):
         # Fetch all menus
         menus = await self.search([])
-        print(f"DEBUG: load_menus found {len(menus)} raw menus. User={self.env.uid}", flush=True)
+        _logger.debug("load_menus found %s raw menus. User=%s", len(menus), self.env.uid)
         
         if not menus:
             return []
@@ -1,5 +1,8 @@
 from core.orm import Model
 from core.fields import Char, Integer, Many2one
+from core.logger import category_logger
+
+_logger = category_logger('views')
 
 class IrUiView(Model):
     _name = 'ir.ui.view'
@@ -60,7 +63,7 @@ class IrUiView(Model):
             
             if node is None:
                 # Fail silent or warn?
-                print(f"View Inheritance Warning: Node not found for spec {spec.tag} {spec.attrib}")
+                _logger.warning(f"View Inheritance Warning: Node not found for spec {spec.tag} {spec.attrib}")
                 continue
             
             # 2. Apply Operation
@@ -74,7 +77,7 @@ class IrUiView(Model):
             elif position == 'replace':
                 if node == source_root:
                     # Replacing root?
-                    print("Cannot replace root node via simple inheritance currently.")
+                    _logger.warning("Cannot replace root node via simple inheritance currently.")
                     continue
                 
                 parent = parent_map[node]
@@ -0,0 +1,138 @@
+import json
+from .generations import ModelGenerations
+
+class ChangeBuffer:
+    """
+    Transaction-scoped buffer of record change notifications.
+    ORM writes are coalesced per (model, operation, uid) and sent with a single
+    pg_notify round trip just before COMMIT (see AsyncDatabase.acquire).
+
+    Payload: {"model", "type", "uid", "ids": [singles], "ranges": [[start, end], ...]}
+    "ids": null means a model-wide change (consumers must drop everything for the model).
+    """
+    CHANNEL = 'record_change'
+    # Postgres rejects NOTIFY payloads of 8000 bytes or more (keep a margin)
+    MAX_PAYLOAD = 7900
+    # Beyond this many messages per key, a single model-wide event is cheaper
+    MAX_MESSAGES = 16
+    # Consecutive ids shorter than this stay as singles
+    MIN_RANGE = 3
+
+    def __init__(self):
+        self._changes = {} # {(model, operation, uid): set(ids)}
+
+    def __bool__(self):
+        return bool(self._changes)
+
+    def add(self, model, operation, ids, uid=None):
+        key = (model, operation, uid)
+        if key not in self._changes:
+            self._changes[key] = set()
+        self._changes[key].update(ids)
+
+    def clear(self):
+        self._changes.clear()
+
+    def snapshot(self):
+        """
+        Copy of the buffered changes, to restore() when a savepoint rolls back.
+        """
+        return {key: set(ids) for key, ids in self._changes.items()}
+
+    def restore(self, snapshot):
+        # Changes queued since snapshot() were rolled back: never announce them
+        self._changes = snapshot
+
+    def touches(self, model):
+        """
+        True if this transaction changed records of model (its cached copies may be stale).
+        """
+        return any(key[0] == model for key in self._changes)
+
+    @classmethod
+    def compact(cls, ids):
+        """
+        Split ids into (singles, ranges). Runs of consecutive ids become [start, end].
+        """
+        singles, ranges = [], []
+        sorted_ids = sorted(ids)
+        i = 0
+        while i < len(sorted_ids):
+            j = i
+            while j + 1 < len(sorted_ids) and sorted_ids[j + 1] == sorted_ids[j] + 1:
+                j += 1
+            if j - i + 1 >= cls.MIN_RANGE:
+                ranges.append([sorted_ids[i], sorted_ids[j]])
+            else:
+                singles.extend(sorted_ids[i:j + 1])
+            i = j + 1
+        return singles, ranges
+
+    @staticmethod
+    def expand_ids(data):
+        """
+        Inverse of compact() for consumers. Returns list of ids, or None (model-wide).
+        """
+        if data.get('ids') is None:
+            return None
+        ids = list(data['ids'])
+        for start, end in data.get('ranges', ()):
+            ids.extend(range(start, end + 1))
+        return ids
+
+    def payloads(self):
+        """
+        Build the JSON payloads, splitting oversized id sets into several messages.
+        """
+        messages = []
+        for (model, operation, uid), ids in self._changes.items():
+            base = {"model": model, "type": operation, "uid": uid}
+            singles, ranges = self.compact(ids)
+            chunks = self._split(base, singles, ranges)
+
+            if len(chunks) > self.MAX_MESSAGES:
+                # Overflow: reduce to a model-wide event
+                chunks = [dict(base, ids=None, ranges=[])]
+            messages.extend(json.dumps(c, separators=(',', ':')) for c in chunks)
+        return messages
+
+    def _split(self, base, singles, ranges):
+        budget = self.MAX_PAYLOAD - len(json.dumps(dict(base, ids=[], ranges=[]), separators=(',', ':')))
+        chunks = []
+        current = dict(base, ids=[], ranges=[])
+        size = 0
+
+        items = [('ids', s) for s in singles] + [('ranges', r) for r in ranges]
+        for bucket, item in items:
+            item_size = len(json.dumps(item, separators=(',', ':'))) + 1
+            if size + item_size > budget and size:
+                chunks.append(current)
+                current = dict(base, ids=[], ranges=[])
+                size = 0
+            current[bucket].append(item)
+            size += item_size
+
+        if size or not chunks:
+            chunks.append(current)
+        return chunks
+
+    async def flush(self, cr):
+        """
+        Send all buffered notifications and bump the generation of every changed
+        model (ModelGenerations) in one statement, then reset the buffer.
+        Returns the bumped {model: generation}, to apply once COMMIT succeeds
+        (NOTIFY only reaches LISTEN connections, not this process's mirror).
+        """
+        if not self._changes: return {}
+        messages = self.payloads()
+        models = sorted({key[0] for key in self._changes})
+        self.clear()
+        # pg_notify is volatile: the count() below runs it for every message
+        await cr.execute(
+            ModelGenerations.BUMP_CTE + """, notified AS (
+                SELECT pg_notify($1, x) FROM generations, unnest($2::text[]) AS x
+            )
+            SELECT model, gen FROM bumped, (SELECT count(*) FROM notified) AS n""",
+            (self.CHANNEL, messages, models, ModelGenerations.CHANNEL)
+        )
+        return {r['model']: r['gen'] for r in cr.fetchall()}
@@ -4,9 +4,15 @@ from typing import List, Dict, Any, Tuple
 from .registry import Registry
 from .fields import Field, Integer, Datetime, Many2one, One2many, Many2many, Binary, Char, Text
 from .db_async import AsyncDatabase
+from .slow_query import searching
+from .metrics import orm_op
+from .logger import category_logger
 import json
 from pypika import Query, Table, Field as PypikaField, Order, Parameter
 
+_logger = category_logger('orm')
+_audit = category_logger('audit') # Sampled / rate limited on its own
+
 class MetaModel(type):
     def __new__(mcs, name, bases, attrs):
         inherit = attrs.get('_inherit')
@@ -23,6 +29,7 @@ class MetaModel(type):
                 elif hasattr(val, '_depends'):
                     setattr(cls, key, val)
             mcs._register_triggers(cls)
+            Registry._related_index = None # New fields may add related dependencies
             return cls
         
         cls = super().__new__(mcs, name, bases, attrs)
@@ -91,6 +98,14 @@ class Model(metaclass=MetaModel):
     _name = None
     _description = None
     _rec_name = 'name' # Default record name field
+    # Shared record value cache (L2) consulted by read(): opt-in for small, read-mostly models
+    _cache_records = False
+    _cache_records_ttl = 600
+    _cache_records_exclude = () # Stored fields that must never leave the database (e.g. password)
+    # Shared search result cache (id lists) validated by the model generation: opt-in as well
+    _cache_search = False
+    _cache_search_ttl = 3600
+    _cache_search_max = 1000 # Longer results are not cached
 
     def __init__(self, env, ids=(), prefetch_ids=None):
         self.env = env
@@ -264,7 +279,8 @@ class Model(metaclass=MetaModel):
         if self.env.uid == 1: 
             # Security Audit: Log superuser bypass
             if operation in ('write', 'unlink'):
-                print(f"AUDIT WARN: UID 1 bypassing rules for {operation} on {self._name}")
+                _audit.warning("Superuser bypassing rules for %s on %s", operation, self._name,
+                               extra={'context': {'event': 'superuser_bypass', 'operation': operation, 'model': self._name}})
             return True
         
         # Cache Check
@@ -296,7 +312,7 @@ class Model(metaclass=MetaModel):
                     user_groups = await user.get_group_ids()
         except Exception as e:
             # Fallback if something breaks during boot or early init
-            print(f"Access Check Warning: Could not fetch groups: {e}")
+            _logger.warning(f"Access Check Warning: Could not fetch groups: {e}")
             pass
             
         # Global Cache Check
@@ -307,43 +323,39 @@ class Model(metaclass=MetaModel):
         groups_key = tuple(sorted(safe_groups)) if safe_groups else ()
         global_key = (groups_key, self._name, operation)
         
-        cached_result = await AccessCache.get(global_key)
-        if cached_result is not None:
-             self.env.permission_cache[cache_key] = cached_result
-             if cached_result:
-                 return True
-             else:
-                 raise Exception(f"Access Denied: You cannot {operation} document {self._name}")
-
         cr = self.env.cr
         from .tools.sql import SQLParams
-        sql = SQLParams()
-        
-        if user_groups:
-            # Native SQL Params ($n)
-            placeholders = sql.add_many(user_groups)
-            group_clause = f"(a.group_id IS NULL OR a.group_id IN ({placeholders}))"
-        else:
-            group_clause = "a.group_id IS NULL"
-
-        # Model Param
-        p_model = sql.add(self._name)
         
-        query = f"""
-            SELECT 1 FROM ir_model_access a 
-            JOIN ir_model m ON a.model_id = m.id
-            WHERE m.model = {p_model} AND a.{col} = TRUE
-            AND {group_clause}
-            LIMIT 1
-        """
-        await cr.execute(query, sql.get_params())
-        if cr.fetchone():
-            self.env.permission_cache[cache_key] = True
-            await AccessCache.set(global_key, True)
+        async def compute():
+            sql = SQLParams()
+            
+            if user_groups:
+                # Native SQL Params ($n)
+                placeholders = sql.add_many(user_groups)
+                group_clause = f"(a.group_id IS NULL OR a.group_id IN ({placeholders}))"
+            else:
+                group_clause = "a.group_id IS NULL"
+
+            # Model Param
+            p_model = sql.add(self._name)
+            
+            query = f"""
+                SELECT 1 FROM ir_model_access a 
+                JOIN ir_model m ON a.model_id = m.id
+                WHERE m.model = {p_model} AND a.{col} = TRUE
+                AND {group_clause}
+                LIMIT 1
+            """
+            await cr.execute(query, sql.get_params())
+            return bool(cr.fetchone())
+            
+        # Single-flight: a cold key costs one query however many requests race for it
+        # (negative results are cached too)
+        allowed = await AccessCache.get_or_compute(global_key, compute)
+        self.env.permission_cache[cache_key] = allowed
+        if allowed:
             return True
             
-        # Cache Negative Result too
-        await AccessCache.set(global_key, False)
         raise Exception(f"Access Denied: You cannot {operation} document {self._name}")
 
     def name_get(self):
@@ -406,8 +418,18 @@ class Model(metaclass=MetaModel):
             JOIN ir_model m ON r.model_id = m.id
             WHERE m.model = {p_model} AND r.active = True AND r.{col} = True
         """
-        await self.env.cr.execute(query, sql.get_params())
-        rows = self.env.cr.fetchall()
+        async def fetch_rules():
+            await self.env.cr.execute(query, sql.get_params())
+            return [r[0] for r in self.env.cr.fetchall()]
+            
+        if self._cache_search and not self.env.notifications.touches('ir.rule'):
+            # Cached search results must not cost a rule query either
+            from .cache import Cache
+            from .generations import ModelGenerations
+            rules_key = await ModelGenerations.key(self.env.cr, f"rules:{self._name}:{col}", ['ir.rule'])
+            rows = await Cache.get_or_compute(rules_key, fetch_rules, ttl=self._cache_search_ttl)
+        else:
+            rows = await fetch_rules()
         
         if not rows:
             return None
@@ -429,14 +451,13 @@ class Model(metaclass=MetaModel):
         
         from .tools.safe_eval import safe_eval
 
-        for r in rows:
-            domain_str = r[0]
+        for domain_str in rows:
             if not domain_str: continue
             try:
                 d = safe_eval(domain_str, eval_context)
                 global_domains.append(d)
             except Exception as e:
-                print(f"Rule Eval Error on {self._name}: {e}")
+                _logger.error(f"Rule Eval Error on {self._name}: {e}")
                 
         if not global_domains:
             return None
@@ -467,8 +488,13 @@ class Model(metaclass=MetaModel):
                 
         return full_criterion
 
-    def _validate_order(self, order):
+    def _validate_order(self, order, table=None):
+        """
+        Safe ORDER BY clause; columns are qualified with `table` when given
+        (queries that join other tables).
+        """
         if not order: return None
+        prefix = f'"{table}".' if table else ''
         
         safe_parts = []
         parts = order.split(',')
@@ -499,7 +525,7 @@ class Model(metaclass=MetaModel):
             if direction not in ('ASC', 'DESC'):
                  raise ValueError(f"Security Error: Invalid Order Direction '{direction}'")
                  
-            safe_parts.append(f'"{field_name}" {direction}')
+            safe_parts.append(f'{prefix}"{field_name}" {direction}')
             
         return ", ".join(safe_parts)
 
@@ -627,25 +653,70 @@ class Model(metaclass=MetaModel):
         # get_sql generates the SQL string. We have params in `sql`.
         query_str = q.get_sql()
         
-        await self.env.cr.execute(query_str, sql.get_params())
-        res = self.env.cr.fetchall()
-        
-        res_ids = []
-        for r in res:
-            # Pypika / DB returns tuple or Record. Access by index 0.
-            if isinstance(r, (tuple, list)):
-                res_ids.append(r[0])
-            else:
-                # AsyncPG Record?
-                res_ids.append(r['id'])
+        # Search Cache: the final SQL + params is the normalized (domain, order, limit,
+        # offset, evaluated rules) key; skipped once this transaction changed the model
+        search_key = None
+        res_ids = None
+        search_models = self._domain_models(search_domain) if self._cache_search else ()
+        if search_models and not any(self.env.notifications.touches(m) for m in search_models):
+            search_key = await self._search_cache_key(query_str, sql.get_params(), search_models)
+            from .cache import Cache
+            res_ids = await Cache.get(search_key)
+        
+        if res_ids is None:
+            with searching(self._name, search_domain): # Slow query log: which domain
+                await self.env.cr.execute(query_str, sql.get_params())
+            res = self.env.cr.fetchall()
+            
+            res_ids = []
+            for r in res:
+                # Pypika / DB returns tuple or Record. Access by index 0.
+                if isinstance(r, (tuple, list)):
+                    res_ids.append(r[0])
+                else:
+                    # AsyncPG Record?
+                    res_ids.append(r['id'])
+                    
+            if search_key and len(res_ids) <= self._cache_search_max:
+                from .cache import Cache
+                await Cache.set(search_key, res_ids, ttl=self._cache_search_ttl)
 
         records = self.browse(res_ids)
+        orm_op(self._name, 'search', len(res_ids))
         
         if include and res_ids:
             await records.read(include)
             
         return records
 
+    async def _search_cache_key(self, query, params, models=None):
+        """
+        Key of a search result: digest of the final statement, inside the
+        generations of `models` (default: this model; see _domain_models).
+        Any committed change to one of them makes it unreachable.
+        """
+        import hashlib
+        from .generations import ModelGenerations
+        digest = hashlib.sha1(f"{query}|{json.dumps(list(params), default=str)}".encode()).hexdigest()
+        return await ModelGenerations.key(self.env.cr, f"search:{self._name}:{digest}", models or [self._name])
+
+    def _domain_models(self, domain):
+        """
+        Models whose rows decide the result of `domain`: this model plus every
+        comodel a dotted path ('partner_id.country_id.code') goes through.
+        """
+        models = {self._name}
+        for leaf in domain or ():
+            if not isinstance(leaf, (list, tuple)) or not isinstance(leaf[0], str) or '.' not in leaf[0]:
+                continue
+            model = self.__class__
+            for step in leaf[0].split('.')[:-1]:
+                comodel_name = getattr(model._fields.get(step), 'comodel_name', None)
+                model = Registry.get(comodel_name) if comodel_name else None
+                if model is None: break
+                models.add(comodel_name)
+        return sorted(models)
+
     async def check_access_rule(self, operation):
         """
         Verifies that the current records satisfy the Record Rules.
@@ -740,7 +811,19 @@ class Model(metaclass=MetaModel):
         
         
         rows = []
-        if sql_fields:
+        cached_rows = {}
+        ids_input = list(self.ids)
+        
+        # Shared record cache: skipped once this transaction changed the model
+        use_record_cache = (
+            self._cache_records and sql_fields
+            and not any(f in self._cache_records_exclude for f in sql_fields)
+            and not self.env.notifications.touches(self._name)
+        )
+        if use_record_cache:
+            cached_rows, ids_input, record_gen = await self._read_record_cache(sql_fields, rule_criterion, rule_builder)
+        
+        if sql_fields and ids_input:
              if 'id' not in sql_fields: sql_fields.insert(0, 'id')
              
              # Use Pypika Select
@@ -749,7 +832,6 @@ class Model(metaclass=MetaModel):
              main_builder = SQLParams(start_index=rule_builder.index)
              main_builder.params = list(rule_builder.params)
              
-             ids_input = list(self.ids)
              id_params = []
              for id_val in ids_input:
                   id_params.append(Parameter(main_builder.add(id_val)))
@@ -760,9 +842,13 @@ class Model(metaclass=MetaModel):
                   
              await self.env.cr.execute(q.get_sql(), main_builder.get_params())
              rows = self.env.cr.fetchall() 
+             
+             if use_record_cache and rows:
+                  await self._store_record_cache(rows, sql_fields, record_gen)
         
         # Map by ID
         rows_map = {r['id']: r for r in rows}
+        rows_map.update(cached_rows)
         
         for id_val in self.ids:
             if id_val in rows_map:
@@ -876,13 +962,71 @@ class Model(metaclass=MetaModel):
                     name = resolved_names.get(mmodel, {}).get(mid, 'Unknown')
                     res[k] = (mid, name)
                     
+        orm_op(self._name, 'read', len(results))
         return results
 
+    async def _read_record_cache(self, fields, rule_criterion, rule_builder):
+        """
+        Serve stored fields of self from the shared record cache (_cache_records).
+        Returns ({id: row}, ids still to fetch from SQL, model generation).
+        Cached values are raw column values, so record rules are enforced first
+        with an id-only query; ids a rule hides are neither served nor fetched.
+        Keys embed the model generation (read before any data), so model-wide
+        changes and fills racing a commit can never be served.
+        """
+        from .cache import Cache
+        from .generations import ModelGenerations
+        from .tools.sql import SQLParams
+        
+        gen = (await ModelGenerations.get(self.env.cr, [self._name]))[self._name]
+        ids = list(self.ids)
+        if rule_criterion:
+            t = Table(self._table)
+            builder = SQLParams(start_index=rule_builder.index)
+            builder.params = list(rule_builder.params)
+            id_params = [Parameter(builder.add(i)) for i in ids]
+            q = Query.from_(t).select(t.id).where(t.id.isin(id_params)).where(rule_criterion)
+            await self.env.cr.execute(q.get_sql(), builder.get_params())
+            allowed = {r['id'] for r in self.env.cr.fetchall()}
+            ids = [i for i in ids if i in allowed]
+            
+        cacheable = [f for f in fields if f != 'id']
+        found = await Cache.get_many([(self._name, rid, f, gen) for rid in ids for f in cacheable])
+        
+        rows, missing = {}, []
+        for rid in ids:
+            keys = [(self._name, rid, f, gen) for f in cacheable]
+            if all(k in found for k in keys):
+                row = {'id': rid}
+                for f, k in zip(cacheable, keys):
+                    row[f] = found[k]
+                rows[rid] = row
+            else:
+                missing.append(rid)
+        return rows, missing, gen
+
+    async def _store_record_cache(self, rows, fields, gen):
+        """
+        Publish freshly read rows to the shared record cache, keyed
+        (model, id, field, generation) so the deps:{model}:{id} sets drop them
+        on 'record_change'.
+        """
+        from .cache import Cache
+        mapping = {}
+        for r in rows:
+            for f in fields:
+                if f != 'id':
+                    mapping[(self._name, r['id'], f, gen)] = r[f]
+        await Cache.set_many(mapping, ttl=self._cache_records_ttl)
+
     async def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None, cursor=None):
         """
         Hyper-Optimized: Single Query with Automatic Joins for Names.
         Returns: [{'id': 1, 'partner_id': (5, 'Agrolait')}, ...]
         """
+        if self._cache_search:
+            return await self._search_read_cached(domain, fields, offset, limit, order, cursor)
+            
         await self.check_access_rights('read')
         
         # 1. Definir campos a leer
@@ -910,7 +1054,7 @@ class Model(metaclass=MetaModel):
             if field._type == 'many2one':
                 # AUTOMATIC JOIN: Traemos el ID y el Name de la tabla relacionada
                 comodel_name = field.comodel_name
-                if comodel_name in self.env.registry:
+                if self.env.registry.get(comodel_name):
                     comodel = self.env[comodel_name]
                     join_table = comodel._table
                     alias = f"{fname}_rel"
@@ -935,13 +1079,15 @@ class Model(metaclass=MetaModel):
                 col_map[fname] = {'type': 'raw', 'col': fname}
 
         # 4. Aplicar Domain (WHERE)
+        # Columns qualified with the table: the m2o joins bring their own "name", "id"...
         parser = DomainParser()
-        where_clause, _ = parser.parse(domain or [], param_builder=sql)
+        criterion = parser.parse_pypika(domain or [], Table(self._table), param_builder=sql)
         
         # Aplicar Reglas de Seguridad
-        rule_clause, _ = await self._apply_ir_rules('read', param_builder=sql)
-        final_where = f"({where_clause})"
-        if rule_clause: final_where += f" AND ({rule_clause})"
+        # Pypika criterion (or None); its placeholders come from the same builder
+        rule_criterion = await self._apply_ir_rules('read', param_builder=sql)
+        conditions = [c.get_sql(quote_char='"', with_namespace=True) for c in (criterion, rule_criterion) if c is not None]
+        final_where = " AND ".join(f"({c})" for c in conditions) or "TRUE"
 
         # Construct Query
         select_sql = ", ".join(select_parts)
@@ -950,13 +1096,14 @@ class Model(metaclass=MetaModel):
         
         # Order / Limit / Offset
         if order: 
-            safe_order = self._validate_order(order)
+            safe_order = self._validate_order(order, self._table)
             if safe_order: query += f" ORDER BY {safe_order}"
         if limit: query += f" LIMIT {limit}"
         if offset: query += f" OFFSET {offset}"
 
         # 5. Ejecutar
-        await self.env.cr.execute(query, sql.get_params())
+        with searching(self._name, domain):
+            await self.env.cr.execute(query, sql.get_params())
         rows = self.env.cr.fetchall()
 
         # 6. Formatear Respuesta (Tuple Construction)
@@ -972,10 +1119,62 @@ class Model(metaclass=MetaModel):
                     res[fname] = (rid, rname) if rid else False
             results.append(res)
             
+        orm_op(self._name, 'search_read', len(results))
         return results
 
 
 
+    async def _search_read_cached(self, domain, fields, offset, limit, order, cursor):
+        """
+        search_read of _cache_search models, same output as the SQL path:
+        ids from the search cache, stored values from read() (record cache),
+        no x2many values, many2one as (id, name) or False from a join on the
+        ids (like the SQL path, the comodel name is not access checked).
+        No SQL at all in steady state when no many2one is requested.
+        """
+        records = await self.search(domain or [], offset=offset, limit=limit, order=order, cursor=cursor)
+        if fields:
+            fields = await self._filter_authorized_fields('read', fields)
+        else:
+            fields = [f for f in self._fields if self._fields[f]._sql_type]
+        fields = [f for f in fields if f == 'id' or (f in self._fields and self._fields[f]._sql_type)]
+        if 'id' not in fields: fields.insert(0, 'id')
+        if not records:
+            return []
+
+        m2o_fields = [f for f in fields if self._fields.get(f) is not None and self._fields[f]._type == 'many2one'
+                      and self.env.registry.get(self._fields[f].comodel_name)]
+        plain = [f for f in fields if f != 'id' and f not in m2o_fields]
+        rows = {r['id']: r for r in await records.read(plain)} if plain else {}
+
+        m2o_values = {}
+        if m2o_fields:
+            from .tools.sql import SQLParams
+            sql = SQLParams()
+            select_parts, joins_parts = [f'"{self._table}".id AS id'], []
+            for fname in m2o_fields:
+                alias = f"{fname}_rel"
+                joins_parts.append(f'LEFT JOIN "{self.env[self._fields[fname].comodel_name]._table}" AS "{alias}" '
+                                   f'ON "{self._table}"."{fname}" = "{alias}".id')
+                select_parts.append(f'"{alias}".id AS "{fname}_vals_id", "{alias}".name AS "{fname}_vals_name"')
+            query = (f'SELECT {", ".join(select_parts)} FROM "{self._table}" {" ".join(joins_parts)} '
+                     f'WHERE "{self._table}".id = ANY({sql.add(list(records.ids))})')
+            await self.env.cr.execute(query, sql.get_params())
+            for row in self.env.cr.fetchall():
+                m2o_values[row['id']] = {
+                    f: (row[f"{f}_vals_id"], row[f"{f}_vals_name"]) if row[f"{f}_vals_id"] else False
+                    for f in m2o_fields
+                }
+
+        results = []
+        for rid in records.ids:
+            row, m2o = rows.get(rid, {}), m2o_values.get(rid, {})
+            results.append({
+                f: rid if f == 'id' else (m2o.get(f, False) if f in m2o_fields else row.get(f))
+                for f in fields
+            })
+        return results
+
     async def _search_read_optimized(self, domain, fields, offset, limit, order, join_fields):
         from .tools.domain_parser import DomainParser
         from .tools.sql import SQLParams
@@ -1166,20 +1365,11 @@ class Model(metaclass=MetaModel):
 
     async def _notify_change(self, operation):
         """
-        Send Real-Time Notification via Postgres Channel.
+        Queue a Real-Time Notification. Sent coalesced via the Postgres channel
+        once per transaction (see ChangeBuffer / AsyncDatabase.acquire).
         """
         if not self.ids: return
-        try:
-            payload = json.dumps({
-                "model": self._name,
-                "ids": list(self.ids),
-                "type": operation,
-                "uid": self.env.uid
-            })
-            # Use param to prevent syntax issues/injection
-            await self.env.cr.execute("SELECT pg_notify('record_change', $1)", (payload,))
-        except Exception as e:
-            print(f"Notification Error: {e}")
+        self.env.notifications.add(self._name, operation, self.ids, self.env.uid)
 
     async def create(self, vals_list):
         """
@@ -1274,13 +1464,13 @@ class Model(metaclass=MetaModel):
                  res = self.env.cr.fetchone()
                  created_ids.append(res['id'])
         else:
-            # Pypika Insert
-            from pypika import Table, Parameter
+            # Pypika Insert (PostgreSQL dialect for RETURNING support)
+            from pypika import Table, Parameter, PostgreSQLQuery
             t = Table(self._table)
             
             # Columns
             # Pypika .columns('a', 'b') works with strings
-            q = Query.into(t).columns(*valid_cols)
+            q = PostgreSQLQuery.into(t).columns(*valid_cols)
             
             from .tools.sql import SQLParams
             sql = SQLParams()
@@ -1375,10 +1565,11 @@ class Model(metaclass=MetaModel):
         for v in processed_vals_list:
             all_keys.update(v.keys())
         
-        records._modified(list(all_keys))
+        records._modified(list(all_keys), created=True)
         await records.recompute()
                      
         await records._notify_change('create')
+        orm_op(self._name, 'create', len(records))
         return records
 
     async def __write_db_internal(self, vals):
@@ -1527,6 +1718,7 @@ class Model(metaclass=MetaModel):
         self._modified(list(vals.keys()))
         await self.recompute()
         await self._notify_change('write')
+        orm_op(self._name, 'write', len(self.ids))
 
         return True
 
@@ -1587,11 +1779,16 @@ class Model(metaclass=MetaModel):
             self.env.cache[(record._name, record.id, fname)] = datas
 
 
-    def _modified(self, fields_modified):
+    def _modified(self, fields_modified, created=False):
         """
         Mark fields dependent on 'fields_modified' as dirty.
         Propagates invalidation recursively.
+        Stored related fields (possibly on other models) are queued in
+        env.to_relate and flushed set-based by recompute().
+        created: records are new, so nothing can point at them yet (skip hop > 0).
         """
+        self._modified_related(fields_modified, created)
+        
         if not self._triggers: return
         
         # 1. Identify direct triggers
@@ -1617,7 +1814,17 @@ class Model(metaclass=MetaModel):
                      key = (self._name, rid, fname)
                      if key in self.env.cache:
                          del self.env.cache[key]
-                         
+
+    def _modified_related(self, fields_modified, created=False):
+        if not self.ids: return
+        for f in fields_modified:
+            for dep_model, dep_field, hop in Registry.related_dependents(self._name, f):
+                if created and hop > 0: continue
+                key = (dep_model, dep_field, hop)
+                if key not in self.env.to_relate:
+                    self.env.to_relate[key] = set()
+                self.env.to_relate[key].update(self.ids)
+
     async def recompute(self):
         """
         Process the recompute queue and flush pending writes.
@@ -1683,6 +1890,75 @@ class Model(metaclass=MetaModel):
                 for key_items, rids in vals_to_ids.items():
                     await Model.browse(rids).__write_db_internal(dict(key_items))
 
+        # Flush Related Fields (may cascade into further computes)
+        if self.env.to_relate:
+            await self._flush_related()
+            if self.env.to_compute or self.env.to_relate:
+                await self.recompute()
+
+    async def _flush_related(self):
+        """
+        Propagate queued source changes to stored related fields.
+        One UPDATE ... FROM per (dependent field, hop), whatever the number of rows.
+        """
+        pending = self.env.to_relate
+        self.env.to_relate = {}
+        
+        for (mname, fname, hop), source_ids in pending.items():
+            Model = self.env[mname]
+            changed = await Model._update_related(fname, hop, list(source_ids))
+            if changed:
+                Model.browse(changed)._modified([fname])
+
+    async def _update_related(self, fname, hop, source_ids):
+        """
+        Recompute stored related field 'fname' for every row reached from
+        source_ids (ids of the model at position 'hop' of the related path).
+        source_ids=None recomputes every row (backfill of a new column).
+        Returns the ids whose value actually changed.
+        """
+        field = self._fields[fname]
+        path = field.related.split('.')
+        
+        # LEFT JOIN chain so a broken link (NULL m2o) resets the value to NULL
+        joins = []
+        prev = 't0'
+        model = self.__class__
+        for i, step in enumerate(path[:-1], start=1):
+            comodel = Registry.get(model._fields[step].comodel_name)
+            joins.append(f'LEFT JOIN "{comodel._table}" AS h{i} ON h{i}.id = {prev}."{step}"')
+            prev = f'h{i}'
+            model = comodel
+        
+        source_alias = 't0' if hop == 0 else f'h{hop}'
+        
+        from .tools.sql import SQLParams
+        sql = SQLParams()
+        source_filter = "TRUE"
+        if source_ids is not None:
+            source_filter = f"{source_alias}.id = ANY({sql.add(source_ids)})"
+        
+        query = f'''
+            UPDATE "{self._table}" AS t SET "{fname}" = sub.val
+            FROM (
+                SELECT t0.id AS id, {prev}."{path[-1]}" AS val
+                FROM "{self._table}" AS t0 {" ".join(joins)}
+                WHERE {source_filter}
+            ) AS sub
+            WHERE t.id = sub.id AND t."{fname}" IS DISTINCT FROM sub.val
+            RETURNING t.id, sub.val
+        '''
+        await self.env.cr.execute(query, sql.get_params())
+        rows = self.env.cr.fetchall()
+        
+        changed = []
+        for r in rows:
+            self.env.cache[(self._name, r[0], fname)] = r[1]
+            changed.append(r[0])
+        # Like any write: generation bump (record/search caches) and WS notification
+        await self.browse(changed)._notify_change('write')
+        return changed
+
     async def unlink(self):
         await self.check_access_rights('unlink')
         await self.check_access_rule('unlink')
@@ -1696,6 +1972,7 @@ class Model(metaclass=MetaModel):
         query = f'DELETE FROM "{self._table}" WHERE id IN ({placeholders})'
         await self.env.cr.execute(query, sql.get_params())
         await self._notify_change('unlink')
+        orm_op(self._name, 'unlink', len(ids_list))
         return True
 
     async def _process_one2many(self, record, field_name, commands):
@@ -1759,6 +2036,8 @@ class Model(metaclass=MetaModel):
             }
             if hasattr(field, 'comodel_name'):
                 info['relation'] = field.comodel_name
+            if field.related:
+                info['related'] = field.related
             
             res[name] = info
         return res
@@ -1877,13 +2156,13 @@ class Model(metaclass=MetaModel):
                 try:
                     arch_xml = view.apply_inheritance(arch_xml, ext.arch)
                 except Exception as e:
-                    print(f"Failed to apply extension view {ext.id}: {e}")
+                    _logger.error(f"Failed to apply extension view {ext.id}: {e}")
 
         # 2. Parse XML
         try:
             root = ET.fromstring(arch_xml)
         except Exception as e:
-            print(f"XML Parsing Error: {e}")
+            _logger.error(f"XML Parsing Error: {e}")
             return {'error': str(e)}
             
         field_nodes = []
@@ -2058,7 +2337,7 @@ class TransientModel(Model):
         
         query = f'DELETE FROM "{self._table}" WHERE create_date < %s'
         self.env.cr.execute(query, (cutoff,))
-        print(f"Vacuum cleaned {self._name}")
+        _logger.info(f"Vacuum cleaned {self._name}")
 
 
 class Snapshot:
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from core.cache import Cache
+from core.db_async import AsyncDatabase
+from core.generations import ModelGenerations
+from core.logger import category_logger
+from core.notify import ChangeBuffer
+
+_logger = category_logger('db')
+
+
+class PgListener:
+    """
+    LISTEN on Postgres notifications, in every process holding an L1 cache
+    (web workers and core/worker.py):
+
+    - 'record_change': drop the changed records from the L1 cache and hand
+      the event to `broadcast` (WebSockets, web workers only).
+    - 'model_generation': keep the ModelGenerations mirror current.
+
+    Postgres delivers each NOTIFY to every listening process, so nothing is
+    re-published on the Redis 'cache:invalidate' channel.
+    """
+
+    @classmethod
+    def on_record_change(cls, payload, broadcast=None):
+        # asyncpg callback: must not block
+        try:
+            data = json.loads(payload)
+            # Payload ids are compacted (singles + ranges); None = model-wide
+            ids = ChangeBuffer.expand_ids(data)
+            asyncio.create_task(Cache.invalidate_model(data.get('model'), ids, publish=False))
+            if broadcast:
+                asyncio.create_task(broadcast(data))
+        except Exception as e:
+            _logger.error(f"PG Notify Error: {e}")
+
+    @classmethod
+    async def run(cls, broadcast=None):
+        """
+        Background task: dedicated connection (outside the request pool),
+        reconnected on failure.
+        """
+        _logger.info("PG Listener: Starting...")
+        while True:
+            try:
+                if not AsyncDatabase.get_pool():
+                    await asyncio.sleep(1)
+                    continue
+
+                conn = await AsyncDatabase.connect()
+                try:
+                    _logger.info(f"PG Listener: Connected to DB. Listening on '{ChangeBuffer.CHANNEL}'...")
+                    await conn.add_listener(ChangeBuffer.CHANNEL, lambda conn, pid, channel, payload: cls.on_record_change(payload, broadcast))
+                    # Generations committed with record changes (derived cache keys);
+                    # bumps missed while disconnected are re-read from the table
+                    ModelGenerations.clear()
+                    await conn.add_listener(ModelGenerations.CHANNEL, lambda conn, pid, channel, payload: ModelGenerations.on_notify(payload))
+
+                    # Halt loop to keep connection open
+                    while True:
+                        await asyncio.sleep(60)
+                        if conn.is_closed():
+                            raise ConnectionError("listener connection closed")
+                finally:
+                    if not conn.is_closed():
+                        await conn.close()
+            except asyncio.CancelledError:
+                _logger.info("PG Listener: Cancelled")
+                break
+            except Exception as e:
+                _logger.error(f"PG Listener Crash: {e}. Retrying in 5s...")
+                await asyncio.sleep(5)
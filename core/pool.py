@@ -0,0 +1,142 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class PoolTimeout(Exception):
+    """
+    No connection within the priority class timeout: the request should be
+    answered 503 (retry later) instead of queueing indefinitely.
+    """
+    pass
+
+
+class PoolGate:
+    """
+    Admission control in front of an asyncpg pool.
+
+    asyncpg hands out connections first come first served, with no timeout.
+    The gate admits at most `size` holders (the pool max_size) and orders
+    waiters by priority class, then arrival:
+
+        UI (0)    interactive /web requests
+        API (1)   /api clients, bulk imports
+        QUEUE (2) TaskQueue workers and cron
+
+    `reserved` slots are only granted to UI, so bulk traffic can never take
+    the whole pool. Waiting longer than the class timeout raises PoolTimeout.
+    """
+    UI = 0
+    API = 1
+    QUEUE = 2
+    NAMES = {UI: 'ui', API: 'api', QUEUE: 'queue'}
+
+    # Wait time histogram bucket upper bounds (seconds); last bucket is +Inf
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, size, reserved=0, timeouts=None):
+        self.name = name
+        self.size = size
+        self.reserved = max(0, min(reserved, size - 1))
+        self.timeouts = timeouts or {}
+        self.in_use = 0
+        self._waiters = [] # heap of [priority, seq, future]; future None = abandoned
+        self._seq = itertools.count()
+        self._metrics = {p: self._new_metrics() for p in self.NAMES}
+
+    def _new_metrics(self):
+        return {'acquired': 0, 'timeouts': 0, 'wait_sum': 0.0, 'wait_buckets': [0] * (len(self.BUCKETS) + 1)}
+
+    def _limit(self, priority):
+        return self.size if priority == self.UI else self.size - self.reserved
+
+    def _queued_ahead(self, priority):
+        return any(w[2] is not None and w[0] <= priority for w in self._waiters)
+
+    def _observe(self, priority, waited):
+        m = self._metrics[priority]
+        m['acquired'] += 1
+        m['wait_sum'] += waited
+        for i, bound in enumerate(self.BUCKETS):
+            if waited <= bound:
+                m['wait_buckets'][i] += 1
+                break
+        else:
+            m['wait_buckets'][-1] += 1
+
+    async def acquire(self, priority=UI, timeout=None):
+        """
+        Wait for a slot. timeout None: the class default (None = no limit).
+        """
+        if not self._queued_ahead(priority) and self.in_use < self._limit(priority):
+            self.in_use += 1
+            self._observe(priority, 0.0)
+            return
+
+        if timeout is None:
+            timeout = self.timeouts.get(priority)
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except BaseException as e:
+            entry[2] = None
+            if future.done() and not future.cancelled():
+                self.release() # Granted while timing out: give it back
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self._metrics[priority]['timeouts'] += 1
+                raise PoolTimeout(
+                    f"No database connection within {timeout}s ({self.name} pool, {self.NAMES[priority]} class)"
+                ) from None
+            raise
+        self._observe(priority, time.monotonic() - start)
+
+    def release(self):
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future is None or future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use >= self._limit(priority):
+                break
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            future.set_result(None)
+
+    def waiting(self):
+        res = {name: 0 for name in self.NAMES.values()}
+        for priority, _, future in self._waiters:
+            if future is not None and not future.done():
+                res[self.NAMES[priority]] += 1
+        return res
+
+    def stats(self):
+        """
+        Snapshot for metrics: in-use, waiters per class and, per class,
+        acquisitions, timeouts and the wait time histogram.
+        """
+        return {
+            'size': self.size,
+            'reserved_ui': self.reserved,
+            'in_use': self.in_use,
+            'waiters': self.waiting(),
+            'buckets': list(self.BUCKETS),
+            'classes': {
+                self.NAMES[p]: {
+                    'acquired': m['acquired'],
+                    'timeouts': m['timeouts'],
+                    'wait_sum': round(m['wait_sum'], 6),
+                    'wait_buckets': list(m['wait_buckets']),
+                }
+                for p, m in self._metrics.items()
+            },
+        }
@@ -0,0 +1,269 @@
+import asyncio
+import itertools
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Fraction of eligible requests profiled. Eligible: every request, or only
+# those matching PROFILE_ROUTES / PROFILE_UIDS when either is set.
+RATE = float(os.getenv('PROFILE_RATE', 0))
+ROUTES = tuple(p for p in os.getenv('PROFILE_ROUTES', '').split(',') if p) # Path prefixes
+UIDS = frozenset(int(u) for u in os.getenv('PROFILE_UIDS', '').split(',') if u.strip())
+# Header forcing a profile: honoured for the admin, or when it carries PROFILE_TOKEN
+HEADER = 'x-nexo-profile'
+TOKEN = os.getenv('PROFILE_TOKEN')
+INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+MAX_DEPTH = 128
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Where the time went: first match from the innermost frame outwards.
+# (label, file suffix, function name or None for any)
+CATEGORIES = (
+    ('sql_wait', os.path.join('core', 'db_async.py'), None),
+    ('sql_wait', os.path.join('asyncpg', ''), None),
+    ('DomainParser', os.path.join('core', 'tools', 'domain_parser.py'), None),
+    ('safe_eval', os.path.join('core', 'tools', 'safe_eval.py'), None),
+    ('json', os.path.join('json', 'encoder.py'), None),
+    ('json', os.path.join('core', 'routing.py'), 'render'),
+    ('orm.read', os.path.join('core', 'orm.py'), 'read'),
+    ('orm.search', os.path.join('core', 'orm.py'), 'search'),
+    ('orm', os.path.join('core', 'orm.py'), None),
+)
+
+try:
+    from asyncio.tasks import _current_tasks
+except ImportError: # Pure Python asyncio without the C accelerator
+    _current_tasks = None
+
+
+class Profile:
+    """
+    Samples of one request: collapsed stacks ('a;b;c' -> count) and the
+    number of samples per category. A running task is sampled from the
+    event loop thread stack ('cpu;...'); a suspended one from its chain of
+    awaited coroutines ('await;...'), which is how SQL wait shows up.
+    """
+    def __init__(self, task, loop, path, uid, method=None):
+        self.id = next(Profiler._ids)
+        self.task = task
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.path = path
+        self.uid = uid
+        self.method = method
+        self.started = time.time()
+        self.duration = 0.0
+        self.samples = 0
+        self.stacks = {}
+        self.categories = {}
+
+    def sample(self, thread_frames):
+        running = _current_tasks is not None and _current_tasks.get(self.loop) is self.task
+        if running:
+            frame = thread_frames.get(self.thread_id)
+            frames = []
+            while frame is not None and len(frames) < MAX_DEPTH:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            names = ['cpu'] + [_frame_name(f) for f in frames]
+        else:
+            frames, leaf = _await_chain(self.task.get_coro())
+            names = ['await'] + [_frame_name(f) for f in frames]
+            if leaf: names.append(leaf)
+        key = ';'.join(names)
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        category = _category(frames) or ('cpu' if running else 'await')
+        self.categories[category] = self.categories.get(category, 0) + 1
+        self.samples += 1
+
+    def collapsed(self):
+        """
+        Brendan Gregg's collapsed format, one stack per line: flamegraph.pl,
+        speedscope and inferno read it as-is.
+        """
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'path': self.path,
+            'method': self.method,
+            'uid': self.uid,
+            'started': self.started,
+            'duration_ms': round(self.duration * 1000, 2),
+            'samples': self.samples,
+            'interval_ms': INTERVAL * 1000,
+            'categories': dict(sorted(self.categories.items(), key=lambda c: -c[1])),
+        }
+
+
+class Profiler:
+    """
+    Statistical profiler for individual requests.
+
+    One daemon thread wakes every PROFILE_INTERVAL_MS while a profile is
+    active and samples the profiled tasks (sys._current_frames, no tracing
+    hooks): requests that are not profiled pay one random() call. Finished
+    profiles are kept in a bounded ring buffer (admin endpoint
+    /web/debug/profiles).
+    """
+    profiles = deque(maxlen=int(os.getenv('PROFILE_KEEP', 50)))
+    _active = {}
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+    _ids = itertools.count(1)
+
+    @classmethod
+    def configure(cls, rate=None, routes=None, uids=None):
+        # Runtime toggle (admin endpoint); None keeps the current value
+        global RATE, ROUTES, UIDS
+        if rate is not None: RATE = max(0.0, min(1.0, float(rate)))
+        if routes is not None: ROUTES = tuple(r for r in routes if r)
+        if uids is not None: UIDS = frozenset(int(u) for u in uids)
+        return cls.config()
+
+    @classmethod
+    def config(cls):
+        return {'rate': RATE, 'routes': list(ROUTES), 'uids': sorted(UIDS), 'interval_ms': INTERVAL * 1000}
+
+    @classmethod
+    def wanted(cls, path, uid, header=None):
+        """
+        Should this request be profiled?
+        """
+        if header and ((TOKEN and secrets.compare_digest(header, TOKEN)) or uid == 1):
+            return True
+        if RATE <= 0:
+            return False
+        if (ROUTES or UIDS) and not (path.startswith(ROUTES) or uid in UIDS):
+            return False
+        return random.random() < RATE
+
+    @classmethod
+    def start(cls, path, uid, method=None):
+        """
+        Profile the current task until stop().
+        """
+        profile = Profile(asyncio.current_task(), asyncio.get_running_loop(), path, uid, method)
+        with cls._lock:
+            cls._active[profile.id] = profile
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._sampler, name='nexo-profiler', daemon=True)
+                cls._thread.start()
+        cls._wakeup.set()
+        return profile
+
+    @classmethod
+    def stop(cls, profile, method=None):
+        with cls._lock:
+            cls._active.pop(profile.id, None)
+        profile.duration = time.time() - profile.started
+        if method: profile.method = method
+        profile.task = None
+        cls.profiles.append(profile)
+        return profile
+
+    @classmethod
+    def _sampler(cls):
+        while True:
+            cls._wakeup.wait()
+            with cls._lock:
+                active = list(cls._active.values())
+                if not active:
+                    cls._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            for profile in active:
+                try:
+                    if profile.task is not None:
+                        profile.sample(frames)
+                except Exception:
+                    pass # Frames changed under us: skip this sample
+            del frames
+            time.sleep(INTERVAL)
+
+    @classmethod
+    def recent(cls, limit=10):
+        # Newest first
+        return list(reversed(cls.profiles))[:limit]
+
+    @classmethod
+    def get(cls, profile_id):
+        for profile in cls.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    @classmethod
+    def collapsed(cls, limit=10):
+        """
+        Last `limit` profiles merged into one collapsed-stack document.
+        """
+        merged = {}
+        for profile in cls.recent(limit):
+            for stack, count in profile.stacks.items():
+                merged[stack] = merged.get(stack, 0) + count
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(merged.items()))
+
+    @classmethod
+    def clear(cls):
+        cls.profiles.clear()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:]) if os.sep in filename else filename
+    return f"{filename}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _await_chain(coro):
+    """
+    Frames of a suspended task, outermost first, and a label for what the
+    innermost coroutine is awaiting (usually a Future).
+    """
+    frames = []
+    while coro is not None and len(frames) < MAX_DEPTH:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            return frames, None
+        frames.append(frame)
+        awaited = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+        if awaited is None or not (hasattr(awaited, 'cr_frame') or hasattr(awaited, 'gi_frame')):
+            return frames, f"<{type(awaited).__name__}>" if awaited is not None else None
+        coro = awaited
+    return frames, None
+
+
+def _category(frames):
+    for frame in reversed(frames):
+        filename = frame.f_code.co_filename
+        name = frame.f_code.co_name
+        for label, suffix, func in CATEGORIES:
+            if suffix in filename and (func is None or func == name):
+                return label
+    return None
+
+
+@contextmanager
+def profiling(path, uid, header=None, method=None):
+    """
+    Profile the enclosed block when Profiler.wanted() says so.
+    """
+    profile = Profiler.start(path, uid, method) if Profiler.wanted(path, uid, header) else None
+    try:
+        yield profile
+    finally:
+        if profile is not None:
+            Profiler.stop(profile)
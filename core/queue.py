@@ -1,11 +1,17 @@
 
 import json
+import time
 import asyncio
 from core.cache import Cache
 from core.registry import Registry
 from core.db_async import AsyncDatabase
+from core.pool import PoolGate
 from core.env import Environment
+from core.metrics import Metrics, TASK_DURATION, TASK_WAIT
 import inspect
+from core.logger import category_logger
+
+_logger = category_logger('queue')
 
 class TaskQueue:
     QUEUE_KEY = "erp:queue:default"
@@ -21,7 +27,8 @@ class TaskQueue:
         payload = {
             'task': task_name,
             'args': args,
-            'kwargs': kwargs
+            'kwargs': kwargs,
+            'enqueued_at': time.time()
         }
         data = json.dumps(payload)
         
@@ -30,11 +37,11 @@ class TaskQueue:
             try:
                 # Direct await on async client
                 await Cache.redis.lpush(cls.QUEUE_KEY, data)
-                print(f"Task Enqueued: {task_name}")
+                _logger.info(f"Task Enqueued: {task_name}")
             except Exception as e:
-                print(f"Enqueue Error: {e}")
+                _logger.error(f"Enqueue Error: {e}")
         else:
-            print("Redis unavailable. Skipping Async Task.")
+            _logger.warning("Redis unavailable. Skipping Async Task.")
             # Optional: Fallback to sync execution?
             # await cls.execute_task(payload)
 
@@ -43,11 +50,11 @@ class TaskQueue:
         """
         Async Worker Loop.
         """
-        print("Queue Worker Started...")
+        _logger.info("Queue Worker Started...")
         if not Cache.initialized: await Cache.initialize()
         
         if not Cache.use_redis:
-            print("Queue Worker: Redis not available. Worker stopping.")
+            _logger.warning("Queue Worker: Redis not available. Worker stopping.")
             return
 
         while True:
@@ -66,16 +73,26 @@ class TaskQueue:
                     pass
                     
             except Exception as e:
-                print(f"Queue Worker Error: {e}")
+                _logger.error(f"Queue Worker Error: {e}")
                 await asyncio.sleep(5)
                 
     @classmethod
     async def execute_task(cls, payload):
+        task_name = payload['task']
+        if payload.get('enqueued_at'):
+            Metrics.observe(TASK_WAIT, (task_name,), max(0.0, time.time() - payload['enqueued_at']))
+        start = time.perf_counter()
+        ok = await cls._execute_task(payload)
+        Metrics.observe(TASK_DURATION, (task_name, 'ok' if ok else 'error'), time.perf_counter() - start)
+
+    @classmethod
+    async def _execute_task(cls, payload):
+        # True when the task ran to completion
         task_name = payload['task']
         args = payload.get('args', [])
         kwargs = payload.get('kwargs', {})
         
-        print(f"Processing Task: {task_name}")
+        _logger.info(f"Processing Task: {task_name}", extra={'context': {'task': task_name}})
         
         try:
             # Parse 'model.name.method'
@@ -87,15 +104,15 @@ class TaskQueue:
                 # Check Registry
                 Model = Registry.get(model_name)
                 if Model:
-                    async with AsyncDatabase.acquire() as cr:
+                    async with AsyncDatabase.acquire(priority=PoolGate.QUEUE) as cr:
                         uid = kwargs.pop('uid', 1) 
                         env = Environment(cr, uid=uid, context={})
                         model = Model(env)
                         
                         # Call method
                         if not hasattr(model, method_name):
-                             print(f"Error: Method {method_name} not found on {model_name}")
-                             return
+                             _logger.error(f"Error: Method {method_name} not found on {model_name}")
+                             return False
 
                         method = getattr(model, method_name)
                         
@@ -103,11 +120,11 @@ class TaskQueue:
                         if inspect.isawaitable(res):
                             await res
                             
-                        print(f"Task {task_name} Completed.")
-                        return
+                        _logger.info(f"Task {task_name} Completed.")
+                        return True
 
-            print(f"Task Execution Failed: {task_name} not found or invalid format.")
+            _logger.error(f"Task Execution Failed: {task_name} not found or invalid format.")
             
         except Exception as e:
-            print(f"Task Execution Exception: {e}")
+            _logger.error(f"Task Execution Exception: {e}")
             # TODO: Retry logic?
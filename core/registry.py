@@ -5,10 +5,12 @@ class Registry:
     The Model Registry (Singleton).
     """
     _models = {}
+    _related_index = None # {(model, field): [(dep_model, dep_field, hop), ...]}
 
     @classmethod
     def register(cls, name, model_cls):
         cls._models[name] = model_cls
+        cls._related_index = None
 
     @classmethod
     def get(cls, name):
@@ -22,6 +24,52 @@ class Registry:
     def __contains__(cls, item):
         return item in cls._models
 
+    @classmethod
+    def related_dependents(cls, model_name, field_name):
+        """
+        Return the stored related fields that depend on (model_name, field_name).
+        Each entry is (dep_model, dep_field, hop) where hop is the position of
+        model_name along the related path (0 = the owning model itself).
+        The index is built lazily because comodels may register after dependents.
+        """
+        if cls._related_index is None:
+            cls._related_index = cls._build_related_index()
+        return cls._related_index.get((model_name, field_name), ())
+
+    @classmethod
+    def _build_related_index(cls):
+        index = {}
+        for owner_name, model_cls in cls._models.items():
+            for fname, field in model_cls._fields.items():
+                if not getattr(field, 'related', None): continue
+                path = field.related.split('.')
+                steps = cls._resolve_related_path(model_cls, path)
+                if steps is None:
+                    print(f"Related Warning: Invalid path '{field.related}' on {owner_name}.{fname}")
+                    continue
+                for hop, step_key in enumerate(steps):
+                    index.setdefault(step_key, []).append((owner_name, fname, hop))
+        return index
+
+    @classmethod
+    def _resolve_related_path(cls, model_cls, path):
+        """
+        Walk a related path. Returns [(model_name, field_name), ...] per hop,
+        or None if a step is missing or an intermediate step is not a Many2one.
+        """
+        steps = []
+        model = model_cls
+        for hop, step in enumerate(path):
+            if model is None or step not in model._fields:
+                return None
+            steps.append((model._name, step))
+            if hop < len(path) - 1:
+                step_field = model._fields[step]
+                if step_field._type != 'many2one':
+                    return None
+                model = cls._models.get(step_field.comodel_name)
+        return steps
+
     @property
     @classmethod
     def models(cls):
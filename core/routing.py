@@ -14,10 +14,12 @@ def json_default(obj):
 # Path -> {handler, auth, regex, variables}
 ROUTES = {}
 
-def route(route_path, auth='user'):
+def route(route_path, auth='user', readonly=False):
     """
     Decorator to register a route.
     Supports variables like /path/<model>/<int:id>
+    readonly: True, or a callable(req) -> bool deciding per request, to run the
+    handler in a READ ONLY transaction (replica when configured).
     """
     def decorator(func):
         # Parse route_path to regex
@@ -39,6 +41,7 @@ def route(route_path, auth='user'):
         ROUTES[route_path] = {
             'func': func,
             'auth': auth,
+            'readonly': readonly,
             'regex': regex,
             'is_dynamic': '<' in route_path
         }
@@ -0,0 +1,180 @@
+import inspect
+import os
+import time
+import traceback
+from core.db_async import AsyncDatabase
+from core.pool import PoolTimeout
+from core.metrics import Metrics, RPC_DURATION
+
+# Errors about the request, not the call: never reported per call.
+# Writes attempted in a READ ONLY transaction propagate so the request is
+# replayed read-write on the primary; PoolTimeout becomes a 503.
+READONLY_ERRORS = AsyncDatabase.READONLY_ERRORS
+UNHANDLED_ERRORS = READONLY_ERRORS + (PoolTimeout,)
+
+# Methods bound to a recordset built from args[0] (list of ids)
+INSTANCE_METHODS = ('read', 'write', 'unlink', 'check_access_rights', 'name_get')
+# Methods called on the empty recordset even when args[0] is a list
+MODEL_METHODS = ('search', 'search_count', 'create', 'search_read', 'name_search')
+
+# Pure reads: run in a READ ONLY transaction (replica when configured)
+READONLY_METHODS = ('search', 'read', 'search_read', 'search_count', 'name_search', 'name_get',
+                    'fields_get', 'get_view_info', 'load_menus')
+
+# Upper bound of calls accepted in one batch request
+BATCH_MAX = int(os.getenv('RPC_BATCH_MAX', 50))
+
+
+class RpcError(Exception):
+    """
+    Invalid call (unknown model, malformed batch...). Reported to the client as-is.
+    """
+    pass
+
+
+def validate_call(env, model_name, method_name, args):
+    """
+    Schema validation of create/write payloads (Phase 6).
+    Raises pydantic ValidationError.
+    """
+    if method_name not in ('create', 'write'):
+        return
+    from core.api.schema import SchemaFactory
+    if method_name == 'create':
+        schema = SchemaFactory.get_create_schema(env, model_name)
+        # create args: [vals] or [vals_list]
+        vals_arg = args[0]
+        vals_list = vals_arg if isinstance(vals_arg, list) else [vals_arg]
+        for v in vals_list:
+            schema(**v) # Validates and raises ValidationError
+    elif len(args) > 1:
+        # write args: [ids, vals]
+        schema = SchemaFactory.get_write_schema(env, model_name)
+        schema(**args[1])
+
+
+async def call_kw(env, model_name, method_name, args=None, kwargs=None):
+    """
+    Execute model.method(*args, **kwargs) the way Odoo's call_kw does:
+    instance methods get a recordset browsed from args[0].
+    Recordset results are returned as their ids.
+    """
+    args = args or []
+    kwargs = kwargs or {}
+    if not env.registry.get(model_name):
+        raise RpcError(f"Model {model_name} not found")
+
+    model = env[model_name]
+    is_instance_call = method_name in INSTANCE_METHODS or (args and isinstance(args[0], list) and method_name not in MODEL_METHODS)
+
+    if is_instance_call and args and isinstance(args[0], list):
+        record = model.browse(args[0])
+        method = getattr(record, method_name)
+        args = args[1:]
+    else:
+        # Static methods or methods called on empty recordset (search, create, etc.)
+        method = getattr(model, method_name)
+
+    # Timed once the method exists: labels stay bounded by the registry
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        result = method(*args, **kwargs)
+        if inspect.iscoroutine(result):
+            result = await result
+        status = 'ok'
+    finally:
+        Metrics.observe(RPC_DURATION, (model_name, method_name, status), time.perf_counter() - start)
+    if hasattr(result, 'ids'):
+        result = result.ids
+    return result
+
+
+def is_readonly_call(method_name):
+    return method_name in READONLY_METHODS
+
+
+def readonly_call_kw(req):
+    # route(readonly=...) predicate for /web/dataset/call_kw
+    params = req.json.get('params', req.json)
+    return is_readonly_call(params.get('method'))
+
+
+def readonly_call_kw_batch(req):
+    # route(readonly=...) predicate for /web/dataset/call_kw_batch
+    calls = req.json.get('params', req.json).get('calls')
+    return bool(calls) and isinstance(calls, list) and all(
+        isinstance(c, dict) and is_readonly_call(c.get('method')) for c in calls
+    )
+
+
+def error_data(e):
+    return {
+        "name": str(type(e).__name__),
+        "debug": traceback.format_exc(),
+        "message": str(e),
+        "arguments": e.args
+    }
+
+
+def _parse_call(call):
+    if not isinstance(call, dict) or not call.get('model') or not call.get('method'):
+        raise RpcError("Each call needs 'model' and 'method'")
+    return call['model'], call['method'], call.get('args') or [], call.get('kwargs') or {}
+
+
+async def call_kw_batch(env, calls, savepoints=False):
+    """
+    Run an ordered list of calls ({model, method, args, kwargs}) in one
+    Environment, so they share the transaction, env.cache and the bootstrap.
+
+    savepoints=False: all-or-nothing. The batch runs in one savepoint and stops
+    at the first error; earlier calls are rolled back with it.
+    Returns ([{'result': ...}, ...], None) or (results so far, (index, error)).
+
+    savepoints=True: every call runs in its own savepoint. A failing call is
+    rolled back alone and reported as {'error': ...}; the others are kept.
+    Returns ([{'result': ...} | {'error': ...}, ...], None).
+    """
+    if not isinstance(calls, list) or not calls:
+        raise RpcError("'calls' must be a non-empty list")
+    if len(calls) > BATCH_MAX:
+        raise RpcError(f"Too many calls in batch ({len(calls)} > {BATCH_MAX})")
+    parsed = [_parse_call(c) for c in calls]
+
+    async def run(model_name, method_name, args, kwargs):
+        validate_call(env, model_name, method_name, args)
+        result = await call_kw(env, model_name, method_name, args, kwargs)
+        # Queued computes/writes must land inside the call's savepoint
+        if env.to_compute or env.pending_writes or env.to_relate:
+            await env[model_name].recompute()
+        return {'result': result}
+
+    results = []
+    if savepoints:
+        for model_name, method_name, args, kwargs in parsed:
+            notifications = env.notifications.snapshot()
+            try:
+                async with env.cr.savepoint():
+                    results.append(await run(model_name, method_name, args, kwargs))
+            except UNHANDLED_ERRORS:
+                raise # Retried read-write / 503 by the handler
+            except Exception as e:
+                env.discard_pending()
+                env.notifications.restore(notifications)
+                results.append({'error': error_data(e)})
+        return results, None
+
+    index = 0
+    notifications = env.notifications.snapshot()
+    try:
+        async with env.cr.savepoint():
+            for index, call in enumerate(parsed):
+                results.append(await run(*call))
+    except UNHANDLED_ERRORS:
+        raise
+    except Exception as e:
+        env.discard_pending()
+        env.notifications.restore(notifications)
+        return results, (index, error_data(e))
+    return results, None
@@ -76,6 +76,15 @@ class SchemaManager:
                      # We can skip explicit name and let PG handle or use convention.
                      await self.cr.execute(f'ALTER TABLE "{table}" ADD FOREIGN KEY ("{name}") REFERENCES "{ref_table}" (id) ON DELETE {field.ondelete.upper()}')
 
+                if field.related:
+                     # Backfill denormalized value for existing rows
+                     from core.env import Environment
+                     env = Environment(self.cr, uid=1)
+                     await env[model_cls._name]._update_related(name, 0, None)
+                if field.index:
+                     method = field.index if isinstance(field.index, str) else 'btree'
+                     await AsyncDatabase.create_index(self.cr, table, name, method=method)
+
             else:
                 # Column exists. Check Type?
                 # db_type = existing_cols[name]['udt_name'] # e.g. varchar, int4
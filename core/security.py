@@ -16,47 +16,34 @@ class AccessCache:
     Shared across workers.
     """
     
-    @staticmethod
-    def _make_key(key: Tuple) -> str:
+    NAMESPACE = 'acl'
+
+    @classmethod
+    async def _make_key(cls, key: Tuple) -> str:
         # Key is ((groups...), model, operation)
         # We need a deterministic string.
         # groups is a tuple of ints (sorted in orm.py).
+        # Keys live in the versioned 'acl' namespace: 'acl:{generation}:{model}:{op}:{groups}'
         groups, model, op = key
         groups_str = ",".join(map(str, groups)) if groups else "public"
-        return f"acl:{model}:{op}:{groups_str}"
+        return await Cache.namespaced(cls.NAMESPACE, f"{model}:{op}:{groups_str}")
 
     @classmethod
-    async def get(cls, key: Tuple) -> Optional[bool]:
-        # Async Read from Redis L1
+    async def get_or_compute(cls, key: Tuple, coro_factory) -> bool:
+        """
+        Cached ACL decision; concurrent misses for the same key share one query.
+        """
         if not Cache.initialized: await Cache.initialize()
         
-        redis_key = cls._make_key(key)
-        val = await Cache.get(redis_key)
-        
-        if val is None: return None
-        # Cache stores strings/bytes. Convert back to bool.
-        # Cache.get usually returns json parsed if we put json? 
-        # But Cache.set uses json.dumps? Let's check Cache implementation.
-        # Assuming Cache.get returns deserialized object if it was JSON?
-        # If Cache.get returns string "true"/"false" or boolean from json load.
-        return val
+        redis_key = await cls._make_key(key)
+        return await Cache.get_or_compute(redis_key, coro_factory, ttl=600)
 
-    @classmethod
-    async def set(cls, key: Tuple, value: bool):
-        # Async Write to Redis L1
-        if not Cache.initialized: await Cache.initialize()
-        
-        redis_key = cls._make_key(key)
-        # TTL 10 minutes for permissions? 
-        # Permissions rarely change but we want some freshness.
-        await Cache.set(redis_key, value, timeout=600)
-        
     @classmethod
     async def invalidate(cls):
         """
         Clears ACL cache.
-        Removes all 'acl:*' keys from Redis.
+        Bumps the 'acl' namespace generation (O(1), no SCAN): old keys age out.
         """
         if not Cache.initialized: await Cache.initialize()
         
-        await Cache.delete_pattern("acl:*")
+        await Cache.bump_namespace(cls.NAMESPACE)
@@ -1,83 +1,188 @@
 import uuid
 import secrets
 import os
+from datetime import timedelta
 from fastapi import Request
 from core.cache import Cache
 
-# Async Session Logic
 # Async Session Logic
 class Session:
+    """
+    Lazy session: created in memory, written to the store only when mutated
+    (uid, login, context, or a CSRF token handed to the client).
+    Anonymous requests that never touch their session cost no cache write.
+    """
+    TTL = 86400 # Store lifetime (1 day)
+    # Sessions held by a worker's L1 are re-read after this many seconds;
+    # rotate/destroy reach other workers earlier through cache pub/sub
+    L1_TTL = int(os.getenv('SESSION_L1_TTL', 30))
+    TOKEN_TTL = int(os.getenv('SESSION_TOKEN_TTL', 1800))
+    _PERSISTED = ('uid', 'login', 'context', '_csrf_token')
+
     def __init__(self, sid):
+        self._stored = False # Exists in the store (loaded or saved)
+        self.stateless = False # Built from a signed token: never stored
         self.sid = sid
         self.uid = None
         self.login = None
         self.context = {}
-        self._dirty = False 
-        
+        self._csrf_token = None
+        self._dirty = False # The assignments above went through __setattr__
+
+    def __setattr__(self, name, value):
+        if name in self._PERSISTED and self.__dict__.get(name, None) != value:
+            self.__dict__['_dirty'] = True
+        object.__setattr__(self, name, value)
+
+    @property
+    def csrf_token(self):
+        # Created on first use: a token given to the client must be persisted
+        if not self._csrf_token:
+            self._csrf_token = secrets.token_urlsafe(32) # Secure CSRF Token
+        return self._csrf_token
+
+    @csrf_token.setter
+    def csrf_token(self, value):
+        self._csrf_token = value
+
+    def check_csrf(self, token):
+        """
+        Validate a submitted CSRF token without minting one.
+        """
+        if not token or not self._csrf_token: return False
+        return secrets.compare_digest(token, self._csrf_token)
+
+    def mark_dirty(self):
+        # For in-place changes (e.g. session.context['lang'] = ...)
+        self._dirty = True
+
+    @property
+    def is_dirty(self):
+        return self._dirty
+
+    @property
+    def is_stored(self):
+        return self._stored
+
     @classmethod
     async def new(cls):
-        # High Entropy Session ID
-        sid = secrets.token_urlsafe(32)
-        sess = cls(sid)
-        sess.csrf_token = secrets.token_urlsafe(32) # Secure CSRF Token
-        await sess.save()
-        return sess
+        # High Entropy Session ID. Not persisted until something is stored in it.
+        return cls(secrets.token_urlsafe(32))
 
     @classmethod
     async def load(cls, sid):
-        # print(f"DEBUG_SESSION: Loading {sid}")
-        data = await Cache.get(f"session:{sid}")
-        # print(f"DEBUG_SESSION: Data for {sid}: {data}")
+        data = await Cache.get(f"session:{sid}", l1_ttl=cls.L1_TTL)
         if data:
             sess = cls(sid)
             sess.uid = data.get('uid')
             sess.login = data.get('login')
             sess.context = data.get('context', {})
-            # Auto-heal if missing
-            sess.csrf_token = data.get('csrf_token') or secrets.token_urlsafe(32) 
+            sess._csrf_token = data.get('csrf_token')
+            sess._dirty = False
+            sess._stored = True
             return sess
         return None
 
+    @classmethod
+    def from_token(cls, token):
+        """
+        Stateless session from a signed token (see issue_token). None if invalid/expired.
+        """
+        from core.auth import verify_token
+        payload = verify_token(token)
+        if not payload or payload.get('typ') != 'session' or not payload.get('uid'):
+            return None
+        sess = cls(None)
+        sess.uid = payload['uid']
+        sess.login = payload.get('login')
+        sess.context = payload.get('ctx') or {}
+        sess.stateless = True
+        sess._dirty = False
+        return sess
+
+    def issue_token(self, ttl=None):
+        """
+        Signed stateless token for API clients (Authorization: Bearer ...).
+        Valid until it expires: it cannot be revoked, keep ttl short.
+        """
+        from core.auth import create_access_token
+        return create_access_token(
+            {'typ': 'session', 'uid': self.uid, 'login': self.login, 'ctx': self.context},
+            expires_delta=timedelta(seconds=ttl or self.TOKEN_TTL)
+        )
+
     async def rotate(self):
         """
         Regenerate Session ID to prevent Fixation Attacks.
         """
         old_sid = self.sid
+        was_stored = self._stored
         # Create new ID
         self.sid = secrets.token_urlsafe(32)
-        self.csrf_token = secrets.token_urlsafe(32) # Rotate CSRF
+        self._csrf_token = secrets.token_urlsafe(32) # Rotate CSRF
         # Save new
         await self.save()
-        # Delete old
-        await Cache.delete(f"session:{old_sid}")
-        # print(f"DEBUG_SESSION: Rotated {old_sid} -> {self.sid}")
+        # Delete old (publishes the eviction to every worker's L1)
+        if was_stored:
+            await Cache.delete(f"session:{old_sid}")
+
+    async def destroy(self):
+        """
+        Logout: drop the stored session everywhere (Cache.delete publishes the
+        eviction to every worker's L1).
+        """
+        if self._stored:
+            await Cache.delete(f"session:{self.sid}")
+        self.uid = None
+        self.login = None
+        self.context = {}
+        self._csrf_token = None
+        self._dirty = False
+        self._stored = False
 
     async def save(self):
+        if self.stateless: return
         data = {
             'uid': self.uid,
             'login': self.login,
             'context': self.context,
-            'csrf_token': getattr(self, 'csrf_token', None)
+            'csrf_token': self._csrf_token
         }
-        # TTL 1 day
-        await Cache.set(f"session:{self.sid}", data, ttl=86400)
+        await Cache.set(f"session:{self.sid}", data, ttl=self.TTL, l1_ttl=self.L1_TTL)
+        self._dirty = False
+        self._stored = True
+
+    async def save_if_dirty(self):
+        """
+        End of request: persist only if something changed.
+        """
+        if self._dirty and not self.stateless:
+            await self.save()
+            return True
+        return False
 
 
 # Dependency for Session
 async def get_session(request: Request):
+    # Signed stateless token: no store access at all
+    auth = request.headers.get('authorization', '')
+    if auth[:7].lower() == 'bearer ':
+        session = Session.from_token(auth[7:].strip())
+        if session:
+            return session
+
     sid = request.cookies.get('session_id')
-    # print(f"DEBUG_SESSION: Middleware Cookie SID: {sid}")
     session = None
     if sid:
         session = await Session.load(sid)
-    
+
     if not session:
-        # print("DEBUG_SESSION: Creating NEW Session")
+        # Lazy: nothing is written unless the request stores something in it
         session = await Session.new()
-    
+
     # Check Lang from Cookie if not in context
     if 'lang' not in session.context:
         # TODO: Get from browser Accept-Language or Cookie
         pass
-        
+
     return session
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .sql_stats import fingerprint, call_site
+
+# search()/search_read() being executed: (model, domain). Lets a slow entry say
+# which domain produced the statement (i.e. which domain needs an index).
+search_context = ContextVar('nexo_search_context', default=None)
+
+@contextmanager
+def searching(model, domain):
+    token = search_context.set((model, domain))
+    try:
+        yield
+    finally:
+        search_context.reset(token)
+
+
+_RE_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|nextval|setval|pg_notify|set_config)\b", re.IGNORECASE)
+
+def is_write(query):
+    """
+    True unless the statement is a plain read. Writes (and reads with side
+    effects such as nextval) are only EXPLAINed, never re-executed.
+    """
+    head = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+    return head not in ('SELECT', 'WITH', 'VALUES', 'TABLE') or bool(_RE_WRITE.search(query))
+
+
+class SlowQueryLog:
+    """
+    Statements slower than SLOW_QUERY_MS (see AsyncCursor.execute), kept in a
+    bounded ring buffer (admin endpoint /web/debug/slow_queries) and logged.
+
+    Each entry has the normalized SQL, parameter types (never values), the ORM
+    call site and, for search()/search_read(), the model and domain.
+    A sample (SLOW_QUERY_EXPLAIN_RATE) is re-run on a separate connection
+    under EXPLAIN (ANALYZE, BUFFERS) in a rolled back transaction, or plain
+    EXPLAIN for writes; the plan is attached to the entry when it arrives.
+    """
+    THRESHOLD_MS = float(os.getenv('SLOW_QUERY_MS', 500)) # <= 0 disables
+    EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+    EXPLAIN_TIMEOUT_MS = int(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', 5000))
+    # One EXPLAIN at a time: sampling must never add load to a slow database
+    MAX_EXPLAINS = 1
+
+    entries = deque(maxlen=int(os.getenv('SLOW_QUERY_BUFFER', 200)))
+    _explaining = 0
+    _tasks = set()
+    _conn = None
+
+    @classmethod
+    def threshold(cls):
+        # Seconds, or None when disabled
+        return cls.THRESHOLD_MS / 1000 if cls.THRESHOLD_MS > 0 else None
+
+    @classmethod
+    def record(cls, query, args, duration, uid=None):
+        search = search_context.get()
+        entry = {
+            'at': time.time(),
+            'duration_ms': round(duration * 1000, 2),
+            'sql': fingerprint(query),
+            'param_types': [type(a).__name__ for a in (args or ())],
+            'call_site': call_site(3),
+            'uid': uid,
+            'write': is_write(query),
+            'search': {'model': search[0], 'domain': repr(search[1])} if search else None,
+            'plan': None,
+        }
+        cls.entries.append(entry)
+
+        from core.logger import logger
+        context = {'event': 'slow_query'}
+        context.update({k: v for k, v in entry.items() if k != 'plan'})
+        logger.warning(f"Slow query {entry['duration_ms']}ms: {entry['sql'][:200]}", extra={'context': context})
+
+        if cls.EXPLAIN_RATE > 0 and cls._explaining < cls.MAX_EXPLAINS and random.random() < cls.EXPLAIN_RATE:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return entry
+            cls._explaining += 1
+            task = loop.create_task(cls._explain(entry, query, tuple(args or ()), uid))
+            cls._tasks.add(task)
+            task.add_done_callback(cls._tasks.discard)
+        return entry
+
+    @classmethod
+    async def _connection(cls):
+        if cls._conn is None or cls._conn.is_closed():
+            from .db_async import AsyncDatabase
+            cls._conn = await AsyncDatabase.connect()
+        return cls._conn
+
+    @classmethod
+    async def _explain(cls, entry, query, args, uid):
+        try:
+            conn = await cls._connection()
+            if entry['write']:
+                explain = 'EXPLAIN (FORMAT JSON) '
+            else:
+                explain = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) '
+            tr = conn.transaction()
+            await tr.start()
+            try:
+                await conn.execute(f"SET LOCAL statement_timeout = {int(cls.EXPLAIN_TIMEOUT_MS)}")
+                if uid:
+                    # Same RLS view as the original statement
+                    await conn.execute("SELECT set_config('app.current_uid', $1::text, true)", str(uid))
+                plan = await conn.fetchval(explain + query, *args)
+            finally:
+                await tr.rollback() # ANALYZE executed it: nothing may persist
+            entry['plan'] = json.loads(plan) if isinstance(plan, str) else plan
+        except Exception as e:
+            entry['plan_error'] = str(e)
+        finally:
+            cls._explaining -= 1
+
+    @classmethod
+    def recent(cls, limit=50):
+        # Newest first
+        return list(reversed(cls.entries))[:limit]
+
+    @classmethod
+    def clear(cls):
+        cls.entries.clear()
@@ -0,0 +1,146 @@
+import os
+import re
+import sys
+from functools import lru_cache
+
+# Per-request SQL instrumentation (see AsyncCursor.execute).
+ENABLED = os.getenv('SQL_STATS', '1') != '0'
+# Same fingerprint more than this many times in one request = N+1 suspect
+NPLUSONE_THRESHOLD = int(os.getenv('SQL_NPLUSONE_THRESHOLD', 10))
+# Production: a structured log line only for requests above these (or with N+1)
+LOG_MIN_COUNT = int(os.getenv('SQL_STATS_LOG_COUNT', 50))
+LOG_MIN_MS = float(os.getenv('SQL_STATS_LOG_MS', 200))
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames skipped when looking for the call site
+_INTERNAL = tuple(os.path.join('core', f) for f in ('db_async.py', 'sql_stats.py', 'slow_query.py'))
+# ORM layer: the call site is the first frame outside it
+_ORM = tuple(os.path.join('core', *f.split('/')) for f in
+             ('orm.py', 'fields.py', 'env.py', 'generations.py', 'security.py', 'rpc.py', 'tools/domain_parser.py'))
+# Interpreter and third-party frames (asyncio, starlette...) are never the call site
+_LIBS = (os.path.dirname(os.__file__), 'site-packages')
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAM = re.compile(r"\$\d+|%s")
+_RE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query):
+    """
+    Normalized statement: literals and placeholders become '?', IN lists
+    collapse to (?+), whitespace is squashed. Queries differing only by
+    values share a fingerprint.
+    """
+    fp = _RE_STRING.sub('?', query)
+    fp = _RE_PARAM.sub('?', fp)
+    fp = _RE_NUMBER.sub('?', fp)
+    fp = _RE_LIST.sub('(?+)', fp)
+    return _RE_SPACE.sub(' ', fp).strip()
+
+
+def call_site(depth=2):
+    """
+    'path.py:line in function' of the code that called into the ORM, plus the
+    outermost ORM method it entered ('-> read'). Walks the (coroutine) frame
+    chain, so only call it off the hot path.
+    """
+    frame = sys._getframe(depth)
+    orm_entry = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.endswith(_INTERNAL) or filename.startswith(_LIBS[0]) or _LIBS[1] in filename:
+            pass
+        elif filename.endswith(_ORM):
+            orm_entry = frame.f_code.co_name
+        else:
+            site = f"{os.path.relpath(filename, _ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            return f"{site} -> {orm_entry}" if orm_entry else site
+        frame = frame.f_back
+    return f"orm -> {orm_entry}" if orm_entry else None
+
+
+class QueryStats:
+    """
+    Statements executed by one request / Environment: count, total time,
+    the slowest one and per-fingerprint counts. A fingerprint repeated more
+    than NPLUSONE_THRESHOLD times is an N+1 suspect; its call site is
+    captured once, when it crosses the threshold.
+    """
+    __slots__ = ('count', 'total', 'slowest', 'slowest_time', 'fingerprints', 'sites', 'threshold')
+
+    def __init__(self, threshold=None):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = None
+        self.slowest_time = 0.0
+        self.fingerprints = {} # {fingerprint: [count, total_time]}
+        self.sites = {} # {fingerprint: call site} for N+1 suspects
+        self.threshold = NPLUSONE_THRESHOLD if threshold is None else threshold
+
+    def record(self, query, duration):
+        self.count += 1
+        self.total += duration
+        fp = fingerprint(query)
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest = fp
+        entry = self.fingerprints.get(fp)
+        if entry is None:
+            self.fingerprints[fp] = [1, duration]
+            return
+        entry[0] += 1
+        entry[1] += duration
+        if entry[0] == self.threshold + 1:
+            self.sites[fp] = call_site(3)
+
+    def n_plus_one(self):
+        """
+        [{fingerprint, count, time_ms, site}] for fingerprints above the threshold.
+        """
+        res = []
+        for fp, site in self.sites.items():
+            count, total = self.fingerprints[fp]
+            res.append({'fingerprint': fp, 'count': count, 'time_ms': round(total * 1000, 2), 'site': site})
+        res.sort(key=lambda r: -r['count'])
+        return res
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'time_ms': round(self.total * 1000, 2),
+            'distinct': len(self.fingerprints),
+            'slowest_ms': round(self.slowest_time * 1000, 2),
+            'slowest': self.slowest,
+            'n_plus_one': self.n_plus_one(),
+        }
+
+    def header(self):
+        """
+        Compact X-SQL-Stats value (dev mode).
+        """
+        value = f"count={self.count}; time={self.total * 1000:.1f}ms; slowest={self.slowest_time * 1000:.1f}ms"
+        if self.sites:
+            worst = self.n_plus_one()[0]
+            value += f"; n+1={len(self.sites)}; worst={worst['count']}x {worst['site']}"
+        return value
+
+    def should_log(self):
+        return bool(self.sites) or self.count >= LOG_MIN_COUNT or self.total * 1000 >= LOG_MIN_MS
+
+
+def report(path, stats, method=None):
+    """
+    Production: one structured log line for requests with N+1 suspects or
+    many / slow statements.
+    """
+    if stats is None or not stats.count or not stats.should_log():
+        return
+    from core.logger import logger
+    context = {'event': 'sql_stats', 'path': path}
+    if method: context['method'] = method
+    context.update(stats.summary())
+    level = logger.warning if stats.sites else logger.info
+    level(f"SQL stats {path}: {stats.count} queries, {stats.total * 1000:.1f}ms", extra={'context': context})
@@ -0,0 +1,276 @@
+"""
+asyncpg connection stand-ins for measuring ORM overhead without a database.
+
+Wrapped in a real AsyncCursor they exercise the same code path as
+production (parameter conversion, SQL stats), only the network round trip
+and Postgres are gone:
+
+    cr = AsyncCursor(ReplayConnection(dataset))
+    env = Environment(cr, uid=1, context={})
+
+RecordingConnection wraps a live asyncpg connection and captures every
+statement with its result; ReplayConnection answers from such a recording
+and, for statements it has not seen, synthesizes rows from an in-memory
+dataset ({table: {id: {column: value}}}). Like Postgres, it rejects bare
+column names that are ambiguous in a join (see ReplayConnection.check).
+"""
+import json
+import re
+import asyncpg
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class FakeRecord:
+    """
+    asyncpg.Record look-alike: positional and key access, iterates values.
+    """
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, keys, values):
+        self._keys = keys # {column: index}, shared by the rows of one result
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._keys[key]]
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, value):
+        return value in self._values
+
+    def get(self, key, default=None):
+        index = self._keys.get(key)
+        return default if index is None else self._values[index]
+
+    def keys(self):
+        return iter(self._keys)
+
+    def values(self):
+        return iter(self._values)
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+    def __repr__(self):
+        return f"<FakeRecord {' '.join(f'{k}={v!r}' for k, v in self.items())}>"
+
+
+def make_records(columns, rows):
+    keys = {c: i for i, c in enumerate(columns)}
+    return [FakeRecord(keys, tuple(row)) for row in rows]
+
+
+class FakeTransaction:
+    async def __aenter__(self): pass
+    async def __aexit__(self, *args): return False
+    async def start(self): pass
+    async def commit(self): pass
+    async def rollback(self): pass
+
+
+_RE_SELECT = re.compile(r'^\s*SELECT\s+(.*?)\s+FROM\s+"(\w+)"', re.IGNORECASE | re.DOTALL)
+_RE_ALIAS = re.compile(r'\bAS\s+"?(\w+)"?\s*$', re.IGNORECASE)
+_RE_IDENT = re.compile(r'"?(\w+)"?\s*$')
+_RE_ID_IN = re.compile(r'"id"\s*(?:IN\s*\(([^)]*)\)|=\s*ANY\s*\((\$\d+)\)|=\s*(\$\d+))', re.IGNORECASE)
+_RE_LIMIT = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+_RE_INSERT = re.compile(r'^\s*INSERT\s+INTO\s+"(\w+)".*?\bVALUES\s*(.*?)\s*RETURNING', re.IGNORECASE | re.DOTALL)
+_RE_JOIN = re.compile(r'\bJOIN\b', re.IGNORECASE)
+_RE_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+"(\w+)"', re.IGNORECASE)
+# "col" neither qualified ("t"."col"), a qualifier ("t".), a table after FROM/JOIN nor an alias after AS
+_RE_BARE_COLUMN = re.compile(r'(?<![.\w"])(?<!FROM )(?<!JOIN )(?<!AS )"(\w+)"(?!\s*\.)', re.IGNORECASE)
+# Columns every ORM table has
+_MAGIC_COLUMNS = ('id', 'create_date', 'write_date')
+
+
+def _split_columns(select):
+    # Top-level commas only (function calls may contain commas)
+    parts, depth, current = [], 0, ''
+    for ch in select:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    parts.append(current)
+    names = []
+    for part in parts:
+        part = part.strip()
+        m = _RE_ALIAS.search(part) or _RE_IDENT.search(part)
+        names.append(m.group(1) if m else part)
+    return names
+
+
+class ReplayConnection:
+    """
+    Answers fetch/execute/executemany without a database. Every call is
+    counted in `calls`; `log` keeps the statements when log=True.
+    """
+    def __init__(self, dataset=None, recording=None, next_id=None, log=False):
+        self.dataset = dataset or {}
+        self.recorded = {}
+        for entry in (recording or []):
+            self.recorded[(entry['query'], _args_key(entry['args']))] = entry
+            self.recorded.setdefault((entry['query'], None), entry)
+        self.next_id = next_id or (max((max(rows) for rows in self.dataset.values() if rows), default=0) + 1)
+        self.calls = 0
+        self.log = [] if log else None
+        self._columns = {} # cached {column: index} per (query) for synthesized results
+
+    def transaction(self, readonly=False):
+        return FakeTransaction()
+
+    async def fetch(self, query, *args):
+        self.calls += 1
+        if self.log is not None: self.log.append((query, args))
+        self.check(query)
+        entry = self.recorded.get((query, _args_key(args))) or self.recorded.get((query, None))
+        if entry is not None:
+            return make_records(entry['columns'], entry['rows'])
+        return self.synthesize(query, args)
+
+    async def fetchval(self, query, *args):
+        rows = await self.fetch(query, *args)
+        return rows[0][0] if rows else None
+
+    async def execute(self, query, *args):
+        self.calls += 1
+        if self.log is not None: self.log.append((query, args))
+        self.check(query)
+        return 'OK'
+
+    async def executemany(self, query, args_list):
+        self.calls += 1
+        if self.log is not None: self.log.append((query, args_list))
+
+    def check(self, query):
+        """
+        Reject what Postgres would: in a SELECT joining several tables, a bare
+        column that more than one of them has (dataset columns, plus id and
+        create/write dates for every table) is ambiguous.
+        """
+        if not query.lstrip()[:6].upper() == 'SELECT' or not _RE_JOIN.search(query):
+            return
+        tables = _RE_TABLE_REF.findall(query)
+        for column in _RE_BARE_COLUMN.findall(query):
+            owners = sum(1 for t in tables if column in _MAGIC_COLUMNS or column in self._table_columns(t))
+            if owners > 1:
+                raise asyncpg.exceptions.AmbiguousColumnError(f'column reference "{column}" is ambiguous')
+
+    def _table_columns(self, table):
+        rows = self.dataset.get(table)
+        return next(iter(rows.values())).keys() if rows else ()
+
+    def synthesize(self, query, args):
+        """
+        INSERT ... RETURNING "id": fresh ids, one per VALUES tuple.
+        SELECT ... FROM "table": the requested ids ("id" IN / = ANY / =),
+        else the first LIMIT rows of the table. Columns missing from the
+        dataset are None. Anything else returns no rows.
+        """
+        m = _RE_INSERT.match(query)
+        if m:
+            count = max(1, m.group(2).count('),(') + 1)
+            ids = list(range(self.next_id, self.next_id + count))
+            self.next_id += count
+            return make_records(['id'], [(i,) for i in ids])
+
+        m = _RE_SELECT.match(query)
+        if not m:
+            return []
+        table = self.dataset.get(m.group(2))
+        if table is None:
+            return []
+        keys = self._columns.get(query)
+        if keys is None:
+            keys = self._columns[query] = {c: i for i, c in enumerate(_split_columns(m.group(1)))}
+
+        ids = self._requested_ids(query, args)
+        if ids is None:
+            limit = _RE_LIMIT.search(query)
+            ids = list(table)[:int(limit.group(1))] if limit else list(table)
+        res = []
+        for rid in ids:
+            row = table.get(rid)
+            if row is None: continue
+            res.append(FakeRecord(keys, tuple(rid if c == 'id' else row.get(c) for c in keys)))
+        return res
+
+    @staticmethod
+    def _requested_ids(query, args):
+        m = _RE_ID_IN.search(query)
+        if not m:
+            return None
+        if m.group(1):
+            ids = []
+            for p in m.group(1).split(','):
+                p = p.strip()
+                if p.startswith('$'):
+                    ids.append(args[int(p[1:]) - 1])
+                elif p.isdigit():
+                    ids.append(int(p))
+            return ids
+        value = args[int((m.group(2) or m.group(3))[1:]) - 1]
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+class RecordingConnection:
+    """
+    Proxy over a live asyncpg connection capturing each statement, its
+    arguments and result rows (see save / ReplayConnection(recording=...)).
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.entries = []
+
+    def transaction(self, **kwargs):
+        return self.conn.transaction(**kwargs)
+
+    async def fetch(self, query, *args):
+        rows = await self.conn.fetch(query, *args)
+        self.entries.append({
+            'query': query,
+            'args': list(args),
+            'columns': list(rows[0].keys()) if rows else [],
+            'rows': [list(r.values()) for r in rows],
+        })
+        return rows
+
+    async def fetchval(self, query, *args):
+        return await self.conn.fetchval(query, *args)
+
+    async def execute(self, query, *args):
+        return await self.conn.execute(query, *args)
+
+    async def executemany(self, query, args_list):
+        return await self.conn.executemany(query, args_list)
+
+    def save(self, path):
+        # JSON: dates and decimals are stored as strings (types are not replayed)
+        with open(path, 'w') as f:
+            json.dump(self.entries, f, default=_json_default)
+
+
+def load_recording(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _json_default(obj):
+    if isinstance(obj, (date, datetime)): return obj.isoformat()
+    if isinstance(obj, Decimal): return str(obj)
+    return str(obj)
+
+
+def _args_key(args):
+    return json.dumps(list(args), default=_json_default)
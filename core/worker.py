@@ -9,6 +9,9 @@ from core.logger import logger
 from core.db_async import AsyncDatabase
 from core.models.ir_cron import IrCron
 from core.queue import TaskQueue
+from core.cache import Cache
+from core.metrics import Metrics
+from core.pg_listener import PgListener
 
 async def main():
     logger.info("👷 Worker Starting (Async)...")
@@ -22,10 +25,15 @@ async def main():
 
     # Run Loops
     try:
-        # Run both Cron and Queue in parallel
+        # Run Cron and Queue in parallel (plus L1 invalidations from web workers)
+        # Record changes and generations committed elsewhere arrive by NOTIFY
+        # Cron lag and task metrics are only recorded here: push them for /metrics
         await asyncio.gather(
             IrCron.runner_loop(),
-            TaskQueue.worker()
+            TaskQueue.worker(),
+            Cache.invalidation_listener(),
+            PgListener.run(),
+            Metrics.publisher()
         )
     except KeyboardInterrupt:
         logger.info("Worker Stopping...")
@@ -0,0 +1,61 @@
+import json
+import time
+import random
+import datetime
+from decimal import Decimal
+from core.codec import CacheCodec, get_codec
+
+def make_search_read(rows):
+    """
+    Rows shaped like sale.order search_read results.
+    """
+    states = ['draft', 'sent', 'sale', 'done', 'cancel']
+    base = datetime.datetime(2024, 1, 1, 9, 0)
+    res = []
+    for i in range(1, rows + 1):
+        res.append({
+            'id': i,
+            'name': f'S{i:05d}',
+            'partner_id': (random.randint(1, 500), f'Customer {random.randint(1, 500)}'),
+            'user_id': (2, 'Mitchell Admin'),
+            'date_order': base + datetime.timedelta(minutes=i * 17),
+            'state': random.choice(states),
+            'amount_total': round(random.uniform(10, 10000), 2),
+            'order_line': list(range(i * 10, i * 10 + random.randint(1, 8))),
+            'note': None if i % 3 else 'Deliver before noon, call the customer first.',
+        })
+    return res
+
+def json_default(obj):
+    # What a JSON cache has to do to store these rows at all (types are lost)
+    if isinstance(obj, (datetime.date, datetime.datetime)): return obj.isoformat()
+    if isinstance(obj, Decimal): return str(obj)
+    raise TypeError(type(obj).__name__)
+
+def bench(label, encode, decode, payload, rounds):
+    blob = encode(payload)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(payload)
+    enc = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode(blob)
+    dec = (time.perf_counter() - start) / rounds * 1e6
+    print(f"  {label:<16} {len(blob):>9} B  encode {enc:>9.1f} us  decode {dec:>9.1f} us")
+
+def run_benchmark():
+    random.seed(42)
+    binary = get_codec('binary')
+    raw_binary = get_codec('binary', compress_min=0)
+
+    for rows in (1, 80, 1000):
+        payload = make_search_read(rows)
+        rounds = max(20, 20000 // rows)
+        print(f"search_read: {rows} rows ({rounds} rounds)")
+        bench('json', lambda v: json.dumps(v, default=json_default), json.loads, payload, rounds)
+        bench('binary', lambda v: raw_binary.encode(v)[0], CacheCodec.decode, payload, rounds)
+        bench('binary+zlib', lambda v: binary.encode(v)[0], CacheCodec.decode, payload, rounds)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,356 @@
+"""
+End-to-end throughput benchmark: the FastAPI app in-process (ASGI
+transport, no network) against a local Postgres, replaying the calls the
+web client makes. Measures the whole stack (routing, session, CSRF,
+transaction, ORM, SQL); see perf_orm_overhead.py for the ORM alone.
+
+Needs the database of the running configuration (DB_* env vars) with the
+schema and a user able to read/write sales (reset_admin.py: admin/admin),
+and httpx (pip install httpx). Synthetic partners, orders and lines are
+seeded once per --scale (tagged 'BENCH', reused by later runs).
+
+    python perf_e2e_throughput.py --scale 10 --concurrency 20 --duration 30
+    python perf_e2e_throughput.py --requests 2000 --json results.json
+    python perf_e2e_throughput.py --baseline results.json --tolerance 0.15
+        # exit 1 when p95 latency or throughput is >15% worse than the baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+
+# Per scale unit
+PARTNERS = 100
+ORDERS = 200
+LINES_PER_ORDER = 5
+SEED_CHUNK = 500
+
+# Relative weight of each scenario in the replayed mix
+MIX = {
+    'login': 1,
+    'load_menus': 4,
+    'view_info': 8,
+    'list': 40,
+    'form': 30,
+    'create_confirm': 17,
+}
+
+LIST_FIELDS = ['name', 'partner_id', 'date_order', 'state', 'amount_total']
+FORM_FIELDS = LIST_FIELDS + ['lines']
+LINE_FIELDS = ['name', 'product_uom_qty', 'price_unit', 'price_subtotal']
+
+_RE_SQL_COUNT = re.compile(r'count=(\d+)')
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of `values` (p in 0..100), None when empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100)) # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples, elapsed):
+    """
+    samples: [(scenario, seconds, queries or None, ok)].
+    Returns {'overall': {...}, 'scenarios': {name: {...}}} with latencies in ms.
+    """
+    def stats(rows):
+        times = [r[1] for r in rows if r[3]]
+        queries = [r[2] for r in rows if r[3] and r[2] is not None]
+        res = {
+            'requests': len(rows),
+            'errors': sum(1 for r in rows if not r[3]),
+            'throughput': round(len(rows) / elapsed, 1) if elapsed else 0.0,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+        for p in (50, 95, 99):
+            value = percentile(times, p)
+            res[f'p{p}_ms'] = round(value * 1000, 2) if value is not None else None
+        return res
+
+    by_scenario = {}
+    for row in samples:
+        by_scenario.setdefault(row[0], []).append(row)
+    return {
+        'overall': stats(samples),
+        'scenarios': {name: stats(rows) for name, rows in sorted(by_scenario.items())},
+    }
+
+
+def compare(summary, baseline, tolerance):
+    """
+    [(metric, baseline, current, change)] where p95 latency grew or
+    throughput dropped by more than `tolerance` (fraction).
+    """
+    regressions = []
+    base = baseline.get('summary', {}).get('overall', {})
+    res = summary['overall']
+    if base.get('p95_ms') and res.get('p95_ms') is not None:
+        change = res['p95_ms'] / base['p95_ms'] - 1
+        if change > tolerance:
+            regressions.append(('p95_ms', base['p95_ms'], res['p95_ms'], change))
+    if base.get('throughput'):
+        change = 1 - res['throughput'] / base['throughput']
+        if change > tolerance:
+            regressions.append(('throughput', base['throughput'], res['throughput'], change))
+    return regressions
+
+
+# --- Seeding ---
+
+async def seed(scale):
+    """
+    Ensure scale * (PARTNERS, ORDERS, LINES_PER_ORDER) synthetic records,
+    created through the ORM in chunks. Returns (partner_ids, order_ids).
+    """
+    from core.db_async import AsyncDatabase
+    from core.env import Environment
+
+    partners_wanted = PARTNERS * scale
+    orders_wanted = ORDERS * scale
+
+    async with AsyncDatabase.acquire() as cr:
+        env = Environment(cr, uid=1, context={})
+        partner_ids = list((await env['res.partner'].search([('email', 'like', '%@bench.example')])).ids)
+    while len(partner_ids) < partners_wanted:
+        start = len(partner_ids)
+        count = min(SEED_CHUNK, partners_wanted - start)
+        async with AsyncDatabase.acquire() as cr:
+            env = Environment(cr, uid=1, context={})
+            created = await env['res.partner'].create([
+                {'name': f'BENCH Partner {i}', 'email': f'partner{i}@bench.example'}
+                for i in range(start, start + count)
+            ])
+        partner_ids.extend(created.ids)
+
+    async with AsyncDatabase.acquire() as cr:
+        env = Environment(cr, uid=1, context={})
+        order_ids = list((await env['sale.order'].search([('name', 'like', 'BENCH/%')])).ids)
+    rng = random.Random(len(order_ids))
+    while len(order_ids) < orders_wanted:
+        start = len(order_ids)
+        count = min(SEED_CHUNK // LINES_PER_ORDER, orders_wanted - start)
+        async with AsyncDatabase.acquire() as cr:
+            env = Environment(cr, uid=1, context={})
+            orders = await env['sale.order'].create([
+                {'name': f'BENCH/{i:07d}', 'partner_id': rng.choice(partner_ids),
+                 'state': 'confirm' if i % 3 else 'draft'}
+                for i in range(start, start + count)
+            ])
+            lines, totals = [], {}
+            for oid in orders.ids:
+                for n in range(LINES_PER_ORDER):
+                    qty, price = float(rng.randint(1, 20)), round(rng.uniform(1, 500), 2)
+                    lines.append({'order_id': oid, 'name': f'BENCH line {n}', 'product_uom_qty': qty,
+                                  'price_unit': price, 'price_subtotal': round(qty * price, 2)})
+                    totals[oid] = totals.get(oid, 0.0) + qty * price
+            await env['sale.order.line'].create(lines)
+            for oid, total in totals.items():
+                await env['sale.order'].browse([oid]).write({'amount_total': round(total, 2)})
+        order_ids.extend(orders.ids)
+
+    return partner_ids[:partners_wanted], order_ids[:orders_wanted]
+
+
+# --- Replay ---
+
+class VirtualUser:
+    """
+    One web client session: logs in, then replays scenarios from MIX.
+    Each HTTP request is one sample (a scenario may send several).
+    """
+    def __init__(self, client, login, password, partner_ids, order_ids, rng):
+        self.client = client
+        self.login_name = login
+        self.password = password
+        self.partner_ids = partner_ids
+        self.order_ids = order_ids
+        self.rng = rng
+        self.csrf_token = None
+        self.samples = []
+
+    async def request(self, scenario, path, payload):
+        headers = {'X-CSRF-Token': self.csrf_token} if self.csrf_token else {}
+        start = time.perf_counter()
+        try:
+            resp = await self.client.post(path, json=payload, headers=headers)
+            elapsed = time.perf_counter() - start
+            body = resp.json()
+        except Exception:
+            self.samples.append((scenario, time.perf_counter() - start, None, False))
+            return None
+        match = _RE_SQL_COUNT.search(resp.headers.get('x-sql-stats', ''))
+        # Handlers answer call errors with HTTP 200 and an "error" key
+        ok = resp.status_code == 200 and isinstance(body, dict) and 'error' not in body
+        self.samples.append((scenario, elapsed, int(match.group(1)) if match else 0, ok))
+        return body.get('result') if ok else None
+
+    async def call(self, scenario, model, method, args=None, kwargs=None):
+        return await self.request(scenario, '/web/dataset/call_kw', {'params': {
+            'model': model, 'method': method, 'args': args or [], 'kwargs': kwargs or {},
+        }})
+
+    async def do_login(self):
+        self.client.cookies.clear()
+        self.csrf_token = None
+        result = await self.request('login', '/web/login', {'params': {'login': self.login_name, 'password': self.password}})
+        if not result:
+            raise RuntimeError(f"Login failed for {self.login_name!r}")
+        self.csrf_token = result.get('csrf_token')
+
+    async def do_load_menus(self):
+        await self.call('load_menus', 'ir.ui.menu', 'load_menus')
+
+    async def do_view_info(self):
+        view_type = self.rng.choice(('list', 'form'))
+        await self.call('view_info', 'sale.order', 'get_view_info', kwargs={'view_type': view_type})
+
+    async def do_list(self):
+        page = self.rng.randrange(max(1, len(self.order_ids) // 80))
+        domain = [] if self.rng.random() < 0.5 else [('state', '=', self.rng.choice(('draft', 'confirm')))]
+        await self.call('list', 'sale.order', 'search_read', [domain, LIST_FIELDS],
+                        {'offset': page * 80, 'limit': 80, 'order': 'id desc'})
+
+    async def do_form(self):
+        rows = await self.call('form', 'sale.order', 'read', [[self.rng.choice(self.order_ids)], FORM_FIELDS])
+        if rows and rows[0].get('lines'):
+            await self.call('form', 'sale.order.line', 'read', [rows[0]['lines'], LINE_FIELDS])
+
+    async def do_create_confirm(self):
+        order_id = await self.call('create_confirm', 'sale.order', 'create', [{
+            'partner_id': self.rng.choice(self.partner_ids),
+            'amount_total': round(self.rng.uniform(10, 5000), 2),
+        }])
+        if isinstance(order_id, list): order_id = order_id[0]
+        if order_id:
+            await self.call('create_confirm', 'sale.order', 'action_confirm', [[order_id]])
+
+
+async def worker(user, deadline, budget):
+    """
+    Replays until `deadline` (monotonic) or until the shared `budget`
+    ([requests left]) is spent.
+    """
+    scenarios = list(MIX)
+    weights = [MIX[s] for s in scenarios]
+    await user.do_login()
+    while time.monotonic() < deadline and budget[0] > 0:
+        budget[0] -= 1
+        scenario = user.rng.choices(scenarios, weights)[0]
+        await getattr(user, f'do_{scenario}')()
+
+
+async def run_benchmark(args):
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("httpx is required: pip install httpx")
+    from core.http_fastapi import app
+
+    async with app.router.lifespan_context(app):
+        print(f"Seeding scale {args.scale}...")
+        partner_ids, order_ids = await seed(args.scale)
+        print(f"{len(partner_ids)} partners, {len(order_ids)} orders ({len(order_ids) * LINES_PER_ORDER} lines)")
+
+        transport = httpx.ASGITransport(app=app)
+        clients = [httpx.AsyncClient(transport=transport, base_url='http://bench') for _ in range(args.concurrency)]
+        try:
+            def make_users(offset):
+                return [VirtualUser(c, args.login, args.password, partner_ids, order_ids, random.Random(args.seed + offset + i))
+                        for i, c in enumerate(clients)]
+
+            if args.warmup:
+                print(f"Warming up {args.warmup}s...")
+                users = make_users(10000)
+                await asyncio.gather(*(worker(u, time.monotonic() + args.warmup, [float('inf')]) for u in users))
+
+            print(f"Running {args.concurrency} virtual users...")
+            users = make_users(0)
+            deadline = time.monotonic() + (args.duration if not args.requests else float('inf'))
+            budget = [args.requests or float('inf')]
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(u, deadline, budget) for u in users))
+            elapsed = time.perf_counter() - start
+        finally:
+            for c in clients:
+                await c.aclose()
+
+    samples = [s for u in users for s in u.samples]
+    return summarize(samples, elapsed), elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1,
+                        help=f'Data scale: {PARTNERS} partners, {ORDERS} orders, {ORDERS * LINES_PER_ORDER} lines per unit (default 1)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Virtual users (default 10)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run (default 20)')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after this many scenarios instead of --duration')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Warm-up seconds, not measured (default 3)')
+    parser.add_argument('--login', default='admin', help='Benchmark user (default admin)')
+    parser.add_argument('--password', default='admin', help='Benchmark user password (default admin)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed of the replayed mix')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Compare against a previous --json output')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed degradation vs baseline (default 0.10)')
+    args = parser.parse_args(argv)
+
+    # Before the app is imported (core is only imported by run_benchmark)
+    os.environ.setdefault('SECRET_KEY', 'perf-e2e-throughput')
+    # Dev mode: X-SQL-Stats header on each response (queries per request)
+    os.environ.setdefault('ENV_TYPE', 'dev')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')
+    # uid 1 writes log a superuser audit line each: keep them out of the timings
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+    summary, elapsed = asyncio.run(run_benchmark(args))
+
+    def fmt(value, unit=''):
+        return '-' if value is None else f"{value}{unit}"
+
+    print(f"\n{args.concurrency} users, {elapsed:.1f}s")
+    print(f"{'scenario':<15} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>10} {'p95':>10} {'p99':>10} {'queries':>8}")
+    rows = list(summary['scenarios'].items()) + [('TOTAL', summary['overall'])]
+    for name, res in rows:
+        print(f"{name:<15} {res['requests']:>9} {res['errors']:>7} {res['throughput']:>8} "
+              f"{fmt(res['p50_ms'], 'ms'):>10} {fmt(res['p95_ms'], 'ms'):>10} {fmt(res['p99_ms'], 'ms'):>10} "
+              f"{fmt(res['queries_per_request']):>8}")
+
+    output = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'scale': args.scale,
+        'concurrency': args.concurrency,
+        'elapsed': round(elapsed, 2),
+        'summary': summary,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get('scale'), baseline.get('concurrency')) != (args.scale, args.concurrency):
+            print("WARNING: baseline ran with a different --scale/--concurrency")
+        regressions = compare(summary, baseline, args.tolerance)
+        for metric, before, after, change in regressions:
+            print(f"REGRESSION {metric}: {before} -> {after} ({change * 100:.0f}% worse)")
+        if regressions:
+            return 1
+        print(f"No regression above {args.tolerance * 100:.0f}% vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
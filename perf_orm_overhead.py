@@ -0,0 +1,217 @@
+"""
+ORM overhead benchmark: Python time spent in the ORM per operation and per
+record, with the database replaced by a replaying connection
+(core/tests/replay.py). No Postgres needed; DB time is excluded.
+
+    python perf_orm_overhead.py                       # table
+    python perf_orm_overhead.py --json results.json   # save results
+    python perf_orm_overhead.py --baseline results.json --tolerance 0.15
+        # exit 1 when a benchmark is >15% slower than the baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SECRET_KEY', 'perf-orm-overhead')
+os.environ.setdefault('SLOW_QUERY_MS', '0')
+# uid 1 writes log a superuser audit line each: keep them out of the timings
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from core.orm import Model
+from core.fields import Char, Float, Boolean, Many2one
+from core.api import depends
+from core.db_async import AsyncCursor
+from core.env import Environment
+from core.tests.replay import ReplayConnection
+from core.tools.domain_parser import DomainParser
+from core.tools.sql import SQLParams
+
+
+class BenchPartner(Model):
+    _name = 'bench.partner'
+    _description = 'ORM benchmark partner'
+
+    name = Char(string='Name')
+    ref = Char(string='Reference')
+    email = Char(string='Email')
+    active = Boolean(string='Active')
+    credit = Float(string='Credit')
+    parent_id = Many2one('bench.partner', string='Parent')
+    credit_limit = Float(string='Credit Limit', compute='_compute_credit_limit', store=True)
+
+    @depends('credit')
+    def _compute_credit_limit(self):
+        for rec in self:
+            rec.credit_limit = (rec.credit or 0.0) * 2
+
+
+FIELDS = ['name', 'ref', 'email', 'active', 'credit', 'parent_id']
+DOMAIN = ['|', ('name', 'ilike', 'acme'), '&', ('credit', '>', 100), ('active', '=', True),
+          ('ref', 'not in', ['X1', 'X2', 'X3']), ('parent_id', '!=', False)]
+
+
+def make_dataset(size):
+    table = {}
+    for i in range(1, size + 1):
+        table[i] = {
+            'name': f'Partner {i}', 'ref': f'P{i:06d}', 'email': f'p{i}@example.com',
+            'active': i % 7 != 0, 'credit': float(i * 3 % 1000), 'credit_limit': float(i * 6 % 2000),
+            'parent_id': (i // 10) or None, 'create_date': None, 'write_date': None,
+        }
+    return {'bench_partner': table}
+
+
+def make_env(conn):
+    return Environment(AsyncCursor(conn), uid=1, context={})
+
+
+async def bench_search(conn, n):
+    await make_env(conn)['bench.partner'].search(DOMAIN, limit=n)
+
+async def bench_read(conn, n):
+    env = make_env(conn) # Fresh env: no env.cache hits
+    await env['bench.partner'].browse(list(range(1, n + 1))).read(FIELDS)
+
+async def bench_search_read(conn, n):
+    await make_env(conn)['bench.partner'].search_read(DOMAIN, FIELDS, limit=n)
+
+async def bench_create(conn, n):
+    vals = [{'name': f'New {i}', 'ref': f'N{i}', 'credit': float(i), 'active': True} for i in range(n)]
+    await make_env(conn)['bench.partner'].create(vals)
+
+async def bench_write(conn, n):
+    await make_env(conn)['bench.partner'].browse(list(range(1, n + 1))).write({'ref': 'R', 'email': 'x@example.com'})
+
+async def bench_recompute(conn, n):
+    env = make_env(conn)
+    records = env['bench.partner'].browse(list(range(1, n + 1)))
+    for rid in records.ids:
+        env.cache[('bench.partner', rid, 'credit')] = float(rid) # As left by write()
+    records._modified(['credit'])
+    await records.recompute()
+
+async def bench_domain_parser(conn, n):
+    from pypika import Table
+    table = Table('bench_partner')
+    parser = DomainParser()
+    for _ in range(n):
+        parser.parse_pypika(DOMAIN, table, SQLParams()).get_sql(quote_char='"')
+
+
+BENCHMARKS = {
+    'search': bench_search,
+    'read': bench_read,
+    'search_read': bench_search_read,
+    'create': bench_create,
+    'write': bench_write,
+    'recompute': bench_recompute,
+    'domain_parser': bench_domain_parser,
+}
+
+
+async def measure(fn, conn, n, repeat, number):
+    """
+    `repeat` samples of `number` calls each (GC disabled while timing).
+    Returns per-call times in seconds.
+    """
+    for _ in range(max(1, number // 5)):
+        await fn(conn, n) # Warm up (imports, caches, code paths)
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await fn(conn, n)
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return samples
+
+
+async def run_benchmarks(names, records, repeat, number):
+    conn = ReplayConnection(make_dataset(max(records, 1000)))
+    results = {}
+    for name in names:
+        calls_before = conn.calls
+        samples = await measure(BENCHMARKS[name], conn, records, repeat, number)
+        # The median is stable against scheduler noise; the spread shows how noisy the run was
+        median = statistics.median(samples)
+        results[name] = {
+            'records': records,
+            'median_us': round(median * 1e6, 2),
+            'min_us': round(min(samples) * 1e6, 2),
+            'stdev_us': round(statistics.stdev(samples) * 1e6, 2) if len(samples) > 1 else 0.0,
+            'us_per_record': round(median * 1e6 / records, 3),
+            'queries': round((conn.calls - calls_before) / (repeat * number + max(1, number // 5)), 2),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    [(name, baseline us, current us, change)] for benchmarks slower than
+    baseline by more than `tolerance` (fraction).
+    """
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or base.get('records') != res['records']: continue
+        change = res['median_us'] / base['median_us'] - 1 if base['median_us'] else 0.0
+        if change > tolerance:
+            regressions.append((name, base['median_us'], res['median_us'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*', choices=[[]] + list(BENCHMARKS), default=[],
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--records', type=int, default=80, help='Records per operation (default 80)')
+    parser.add_argument('--repeat', type=int, default=7, help='Samples per benchmark (default 7)')
+    parser.add_argument('--number', type=int, default=20, help='Calls per sample (default 20)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Compare against a previous --json output')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed slowdown vs baseline (default 0.10)')
+    args = parser.parse_args(argv)
+
+    names = args.benchmarks or list(BENCHMARKS)
+    results = asyncio.run(run_benchmarks(names, args.records, args.repeat, args.number))
+
+    print(f"{'benchmark':<15} {'median':>11} {'min':>11} {'stdev':>9} {'per record':>12} {'queries':>8}")
+    for name, res in results.items():
+        print(f"{name:<15} {res['median_us']:>9.1f}us {res['min_us']:>9.1f}us {res['stdev_us']:>7.1f}us "
+              f"{res['us_per_record']:>10.3f}us {res['queries']:>8}")
+
+    output = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'records': args.records,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.1f}us -> {after:.1f}us (+{change * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regression above {args.tolerance * 100:.0f}% vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
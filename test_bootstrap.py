@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from core.env import Environment
+from core.generations import ModelGenerations
+from addons.base.models.res_users import ResUsers
+
+# Mock CR answering the bootstrap statement (generation lookups are not recorded)
+class MockCr:
+    def __init__(self):
+        self.queries = []
+        self._result = []
+
+    async def execute(self, query, params=None):
+        if query.startswith('SELECT model, gen FROM'):
+            self._result = []
+            return
+        self.queries.append((query, params))
+        if 'WITH RECURSIVE closure' in query:
+            self._result = [{
+                'id': 2, 'login': 'demo', 'company_id': 1,
+                'company_name': 'Nexo SA', 'company_currency_id': 3,
+                'group_ids': [10], 'all_group_ids': [10, 11, 12],
+            }]
+        else:
+            self._result = []
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        ModelGenerations.clear()
+        Environment._bootstrap_l1.clear()
+
+    def test_one_statement_then_memoized(self):
+        async def run():
+            cr = MockCr()
+            env = Environment(cr, uid=2)
+            await env.bootstrap()
+            self.assertEqual(len(cr.queries), 1)
+            query, params = cr.queries[0]
+            self.assertIn("set_config('app.current_uid'", query)
+            self.assertEqual(params, ('2', 2))
+            self.assertEqual(env.user.login, 'demo')
+            self.assertEqual(env.company.name, 'Nexo SA')
+            self.assertEqual(await env.user.get_group_ids(), [10, 11, 12])
+            self.assertEqual(len(cr.queries), 1) # Group closure came with the bootstrap
+
+            cr2 = MockCr()
+            env2 = Environment(cr2, uid=2)
+            await env2.bootstrap()
+            self.assertEqual(len(cr2.queries), 1)
+            self.assertNotIn('closure', cr2.queries[0][0]) # Memo hit: only the GUC
+            self.assertEqual(env2.company.id, 1)
+        asyncio.run(run())
+
+    def test_generation_change_reloads(self):
+        async def run():
+            await Environment(MockCr(), uid=2).bootstrap()
+            ModelGenerations.apply({'res.groups': 7}) # e.g. implied groups edited
+            cr = MockCr()
+            await Environment(cr, uid=2).bootstrap()
+            self.assertIn('closure', cr.queries[0][0])
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import unittest
+from core.bus import NotificationBus, ClientConnection
+
+class FakeWebSocket:
+    def __init__(self, delay=0):
+        self.sent = []
+        self.delay = delay
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+class TestNotificationBus(unittest.TestCase):
+    def test_subscriptions_filter_fanout(self):
+        async def run():
+            bus = NotificationBus()
+            partners, order_5, idle = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+            for ws in (partners, order_5, idle):
+                await bus.connect(ws)
+            bus.handle_message(partners, json.dumps({'action': 'subscribe', 'model': 'res.partner'}))
+            bus.handle_message(order_5, json.dumps({'action': 'subscribe', 'model': 'sale.order', 'ids': [5]}))
+
+            await bus.broadcast({'model': 'res.partner', 'type': 'write', 'ids': [1], 'ranges': []})
+            await bus.broadcast({'model': 'sale.order', 'type': 'write', 'ids': [7], 'ranges': []})
+            await bus.broadcast({'model': 'sale.order', 'type': 'write', 'ids': [], 'ranges': [[3, 9]]})
+            await asyncio.sleep(0.01)
+
+            self.assertEqual([m['model'] for m in partners.sent], ['res.partner'])
+            self.assertEqual(order_5.sent, [{'model': 'sale.order', 'type': 'write', 'ids': [], 'ranges': [[3, 9]]}])
+            # Never subscribed: everything, as before subscriptions existed
+            self.assertEqual(len(idle.sent), 3)
+
+            bus.handle_message(idle, json.dumps({'action': 'subscribe', 'model': 'res.partner', 'ids': [2]}))
+            await bus.broadcast({'model': 'sale.order', 'type': 'write', 'ids': [7], 'ranges': []})
+            await asyncio.sleep(0.01)
+            self.assertEqual(len(idle.sent), 3)
+
+            partners_client = bus.connections[partners]
+            bus.disconnect(partners)
+            self.assertNotIn(partners_client, bus._by_model['res.partner'])
+            self.assertEqual(len(bus.connections), 2)
+            for ws in (order_5, idle):
+                bus.disconnect(ws)
+            self.assertEqual(bus._by_model, {})
+        asyncio.run(run())
+
+    def test_malformed_messages_ignored(self):
+        async def run():
+            bus = NotificationBus()
+            ws = FakeWebSocket()
+            await bus.connect(ws)
+            for message in (
+                {'action': 'subscribe', 'model': 'x', 'ids': 5},
+                {'action': 'subscribe', 'model': ['res.partner']},
+                {'action': 'subscribe', 'model': 'res.partner', 'ids': ['7']},
+                {'action': 'subscribe', 'model': 'res.partner', 'ids': [True]},
+                {'action': 'subscribe', 'model': '*', 'ids': [1]},
+                {'action': 'unsubscribe', 'model': {'a': 1}},
+                {'action': 'subscribe'},
+                [1, 2],
+            ):
+                self.assertFalse(bus.handle_message(ws, json.dumps(message)))
+            self.assertFalse(bus.handle_message(ws, 'not json'))
+            # Nothing applied: still on the implicit '*'
+            self.assertEqual(bus.connections[ws].subscriptions, {'*': None})
+
+            self.assertTrue(bus.handle_message(ws, json.dumps({'action': 'subscribe', 'model': 'res.partner', 'ids': [7]})))
+            self.assertEqual(bus.connections[ws].subscriptions, {'res.partner': {7}})
+            bus.disconnect(ws)
+        asyncio.run(run())
+
+    def test_slow_client_does_not_stall_others(self):
+        async def run():
+            bus = NotificationBus()
+            slow, fast = FakeWebSocket(delay=5), FakeWebSocket()
+            for ws in (slow, fast):
+                await bus.connect(ws)
+                bus.subscribe(ws, '*')
+
+            await asyncio.wait_for(bus.broadcast({'model': 'res.partner', 'ids': None}), 0.1)
+            await asyncio.sleep(0.01)
+            self.assertEqual(len(fast.sent), 1)
+            self.assertEqual(slow.sent, [])
+            for ws in (slow, fast):
+                bus.disconnect(ws)
+        asyncio.run(run())
+
+    def test_overflow_merges_pending(self):
+        async def run():
+            client = ClientConnection(FakeWebSocket(), queue_size=2)
+            client.push({'model': 'a'}, '{}')
+            client.push({'model': 'b'}, '{}')
+            client.push({'model': 'c'}, '{}')
+            self.assertEqual(client.queue.qsize(), 1)
+            notice, payload = client.queue.get_nowait()
+            self.assertEqual(notice, {'type': 'overflow', 'models': ['a', 'b', 'c']})
+            self.assertEqual(client.dropped, 2)
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
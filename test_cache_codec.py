@@ -0,0 +1,77 @@
+import asyncio
+import datetime
+import json
+import unittest
+from decimal import Decimal
+from core.codec import CacheCodec, BinaryCodec, JsonCodec, get_codec, cache_key
+from core.cache import RedisCache
+from test_cache_coherence import FakeRedis, make_worker
+
+class TestCacheCodec(unittest.TestCase):
+    def test_binary_preserves_orm_types(self):
+        codec = BinaryCodec()
+        value = {
+            'id': 7,
+            'partner_id': (3, 'Azure Interior'),
+            'date_order': datetime.datetime(2024, 5, 1, 12, 30, 5, 123),
+            'validity_date': datetime.date(2024, 6, 1),
+            'amount_total': Decimal('1250.50'),
+            'tag_ids': [1, 2],
+            'note': None,
+            'active': True,
+        }
+        blob, size = codec.encode(value)
+        self.assertEqual(blob[:3], bytes((CacheCodec.MAGIC, CacheCodec.VERSION, BinaryCodec.codec_id)))
+        self.assertEqual(CacheCodec.decode(blob), value)
+        self.assertIsInstance(CacheCodec.decode(blob)['partner_id'], tuple)
+
+    def test_compression_above_threshold(self):
+        codec = get_codec('binary', compress_min=256)
+        rows = [{'id': i, 'name': 'Partner %d' % i, 'state': 'draft'} for i in range(200)]
+        blob, size = codec.encode(rows)
+        self.assertTrue(blob[3] & CacheCodec.FLAG_ZLIB)
+        self.assertLess(len(blob), size)
+        self.assertEqual(CacheCodec.decode(blob), rows)
+
+        small, _ = codec.encode({'id': 1})
+        self.assertFalse(small[3] & CacheCodec.FLAG_ZLIB)
+
+    def test_reads_json_and_legacy_values(self):
+        blob, _ = JsonCodec().encode({'uid': 2})
+        self.assertEqual(CacheCodec.decode(blob), {'uid': 2})
+        self.assertEqual(CacheCodec.decode('{"uid": 2}'), {'uid': 2})
+        self.assertEqual(CacheCodec.decode(b'[1, 2]'), [1, 2])
+        with self.assertRaises(ValueError):
+            CacheCodec.decode(bytes((0, 99, 2, 0)) + b'x')
+
+    def test_cache_key_format(self):
+        self.assertEqual(cache_key(('res.partner', 7, 'name')), 'c:res.partner:7:name')
+        self.assertEqual(cache_key('session:abc'), 'session:abc')
+        self.assertNotEqual(cache_key(('a:b',)), cache_key(('a', 'b')))
+
+    def test_cache_key_distinct_keys_never_collide(self):
+        keys = [
+            ('m', None), ('m', ''), ('m', '%00'),
+            ('m', 7), ('m', '7'), ('m', '%277'), ('m', -7), ('m', '-7'),
+            ('m', True), ('m', 'True'), ('m', 1), ('m', 1.0), ('m', '1.0'),
+            ('res.partner', 7, 'name'), 'c:res.partner:7:name', 's:c:res.partner:7:name',
+            7, '7', 'k:7',
+        ]
+        encoded = [cache_key(k) for k in keys]
+        self.assertEqual(len(set(encoded)), len(keys), encoded)
+        self.assertEqual(cache_key(('test.rc.lang', 1, 'name', 0)), 'c:test.rc.lang:1:name:0')
+
+class TestRedisCacheCodec(unittest.TestCase):
+    def test_l2_roundtrip_with_tuple_key(self):
+        async def run():
+            redis = FakeRedis()
+            w1, w2 = make_worker(redis), make_worker(redis)
+            w1.codec = w2.codec = BinaryCodec()
+            key = ('sale.order', 5, 'partner_id')
+            await w1.set(key, (3, 'Azure Interior'))
+            self.assertIn('c:sale.order:5:partner_id', redis.data)
+            self.assertEqual(await w2.get(key), (3, 'Azure Interior')) # L2 fill keeps the tuple
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
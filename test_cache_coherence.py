@@ -0,0 +1,238 @@
+import asyncio
+import json
+import unittest
+from core.cache import RedisCache
+from core.security import AccessCache
+
+# Minimal async Redis stand-in shared by two "workers"
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        async def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        res = []
+        for name, args, kwargs in self.ops:
+            res.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.ops = []
+        return res
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.published = []
+        self.round_trips = 0
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(k) for k in keys]
+
+    async def setex(self, key, ttl, val):
+        self.data[key] = val
+
+    async def set(self, key, val, nx=False, px=None, ex=None):
+        if nx and key in self.data: return None
+        self.data[key] = val
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        # Compare-and-delete (lease release)
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    async def expire(self, key, ttl):
+        pass
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        for k in keys:
+            self.data.pop(k, None)
+            self.sets.pop(k, None)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+
+def make_worker(redis):
+    cache = object.__new__(RedisCache)
+    cache._setup_l1()
+    cache.redis = redis
+    cache.use_redis = True
+    cache.initialized = True
+    return cache
+
+def deliver(redis, workers):
+    # Simulate the pub/sub subscriber of every process
+    for channel, data in redis.published:
+        for w in workers:
+            w._apply_invalidation(json.loads(data))
+    redis.published.clear()
+
+class TestCacheCoherence(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.w1 = make_worker(self.redis)
+        self.w2 = make_worker(self.redis)
+
+    def test_set_and_delete_drop_remote_l1(self):
+        async def run():
+            await self.w1.set('session:abc', {'uid': 2})
+            self.assertEqual(await self.w2.get('session:abc'), {'uid': 2}) # L2 fill
+
+            await self.w1.set('session:abc', {'uid': 3})
+            deliver(self.redis, [self.w1, self.w2])
+            self.assertIn('session:abc', self.w1.memory_store) # Own message ignored
+            self.assertNotIn('session:abc', self.w2.memory_store)
+            self.assertEqual(await self.w2.get('session:abc'), {'uid': 3})
+
+            await self.w1.delete('session:abc')
+            deliver(self.redis, [self.w1, self.w2])
+            self.assertIsNone(await self.w2.get('session:abc'))
+        asyncio.run(run())
+
+    def test_invalidate_model_propagates(self):
+        async def run():
+            self.w2.memory_store.set(('res.partner', 1, 'name'), 'A')
+            self.w2._index(('res.partner', 1, 'name'))
+            await self.w1.invalidate_model('res.partner', [1])
+            deliver(self.redis, [self.w1, self.w2])
+            self.assertNotIn(('res.partner', 1, 'name'), self.w2.memory_store)
+
+            await self.w1.invalidate_model('res.partner', [2], publish=False)
+            self.assertEqual(self.redis.published, [])
+        asyncio.run(run())
+
+    def test_worker_process_l1_follows_record_change(self):
+        # core/worker.py LISTENs too: a web commit drops the cron/queue L1 copy
+        from unittest.mock import patch
+        from core import worker
+
+        class FakeConn:
+            listeners = {}
+            async def add_listener(self, channel, callback):
+                self.listeners[channel] = callback
+            def is_closed(self):
+                return False
+            async def close(self):
+                pass
+
+        async def idle():
+            await asyncio.sleep(3600)
+
+        async def run():
+            key = ('res.partner', 7, 'name')
+            self.w2.memory_store.set(key, 'A')
+            self.w2._index(key)
+            conn = FakeConn()
+            with patch('core.pg_listener.Cache', self.w2), \
+                 patch.object(worker.AsyncDatabase, 'initialize', staticmethod(lambda: asyncio.sleep(0))), \
+                 patch.object(worker.AsyncDatabase, 'get_pool', staticmethod(lambda: object())), \
+                 patch.object(worker.AsyncDatabase, 'connect', staticmethod(lambda: asyncio.sleep(0, conn))), \
+                 patch.object(worker.IrCron, 'runner_loop', staticmethod(idle)), \
+                 patch.object(worker.TaskQueue, 'worker', staticmethod(idle)), \
+                 patch.object(worker.Metrics, 'publisher', staticmethod(idle)), \
+                 patch.object(worker, 'Cache') as cache:
+                cache.invalidation_listener = idle
+                task = asyncio.create_task(worker.main())
+                await asyncio.sleep(0.05)
+                conn.listeners['record_change'](conn, 1, 'record_change', json.dumps({'model': 'res.partner', 'ids': [7], 'type': 'write'}))
+                await asyncio.sleep(0.01)
+                task.cancel()
+            self.assertNotIn(key, self.w2.memory_store)
+            self.assertIn('model_generation', conn.listeners)
+            self.assertEqual(self.redis.published, []) # Every process got the NOTIFY
+        asyncio.run(run())
+
+    def test_batched_api_round_trips(self):
+        async def run():
+            keys = [('res.partner', i, 'name') for i in range(1, 101)]
+            await self.w1.set_many({k: f"P{k[1]}" for k in keys})
+            self.assertEqual(self.redis.round_trips, 1)
+            self.assertEqual(self.redis.sets['deps:res.partner:7'], {'c:res.partner:7:name'})
+            deliver(self.redis, [self.w1, self.w2])
+
+            self.redis.round_trips = 0
+            found = await self.w2.get_many(keys + [('res.partner', 999, 'name')])
+            self.assertEqual(len(found), 100)
+            self.assertEqual(found[('res.partner', 7, 'name')], 'P7')
+            self.assertEqual(self.redis.round_trips, 1) # One MGET
+            await self.w2.get_many(keys)
+            self.assertEqual(self.redis.round_trips, 1) # Served by L1
+
+            self.redis.round_trips = 0
+            await self.w1.invalidate_model('res.partner', list(range(1, 51)))
+            self.assertEqual(self.redis.round_trips, 2) # SMEMBERS pipeline + one DEL
+            self.assertNotIn('c:res.partner:7:name', self.redis.data)
+            self.assertIn('c:res.partner:70:name', self.redis.data)
+
+            await self.w1.delete_many(keys[50:])
+            deliver(self.redis, [self.w1, self.w2])
+            self.assertEqual(await self.w2.get_many(keys), {})
+        asyncio.run(run())
+
+    def test_namespace_bump_is_o1(self):
+        async def run():
+            key1 = await self.w1.namespaced('acl', 'res.partner:read:1')
+            key2 = await self.w2.namespaced('acl', 'res.partner:read:1')
+            self.assertEqual(key1, key2)
+
+            await self.w1.bump_namespace('acl')
+            deliver(self.redis, [self.w1, self.w2])
+            self.assertNotEqual(await self.w2.namespaced('acl', 'res.partner:read:1'), key2)
+            self.assertEqual(await self.w1.namespaced('acl', 'x'), await self.w2.namespaced('acl', 'x'))
+        asyncio.run(run())
+
+    def test_access_cache_invalidate_uses_generation(self):
+        async def run():
+            from core import security
+            original = security.Cache
+            security.Cache = self.w1
+            try:
+                calls = []
+                async def compute():
+                    calls.append(1)
+                    return True
+                key = ((1, 2), 'res.partner', 'read')
+                self.assertTrue(await AccessCache.get_or_compute(key, compute))
+                self.assertTrue(await AccessCache.get_or_compute(key, compute))
+                self.assertEqual(len(calls), 1)
+                await AccessCache.invalidate()
+                self.assertTrue(await AccessCache.get_or_compute(key, compute))
+                self.assertEqual(len(calls), 2)
+            finally:
+                security.Cache = original
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
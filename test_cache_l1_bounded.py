@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core.cache import Cache, MemoryStore
+
+class TestMemoryStore(unittest.TestCase):
+    def test_lru_by_entries(self):
+        store = MemoryStore(max_entries=2)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a') # 'a' becomes most recent
+        store.set('c', 3)
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertEqual(store.evictions, 1)
+
+    def test_bounded_by_bytes(self):
+        store = MemoryStore(max_bytes=100)
+        store.set('a', 'x', size=60)
+        store.set('b', 'y', size=60)
+        self.assertNotIn('a', store)
+        self.assertEqual(store.bytes, 60)
+        store.set('huge', 'z', size=1000)
+        self.assertNotIn('huge', store)
+
+    def test_ttl_expiry_and_counters(self):
+        store = MemoryStore()
+        with patch('core.cache.time.monotonic', return_value=1000.0):
+            store.set('k', 'v', ttl=10)
+            self.assertEqual(store.get('k'), 'v')
+        with patch('core.cache.time.monotonic', return_value=1011.0):
+            self.assertIsNone(store.get('k'))
+        stats = store.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 1, 1))
+        self.assertEqual(stats['entries'], 0)
+
+class TestCacheModelIndex(unittest.TestCase):
+    def setUp(self):
+        Cache._setup_l1()
+        Cache.use_redis = False
+        Cache.initialized = True
+
+    def test_invalidate_model_by_ids(self):
+        async def run():
+            await Cache.set(('res.partner', 1, 'name'), 'A')
+            await Cache.set(('res.partner', 1, 'email'), 'a@x')
+            await Cache.set(('res.partner', 2, 'name'), 'B')
+            await Cache.set(('res.users', 1, 'login'), 'admin')
+
+            await Cache.invalidate_model('res.partner', [1])
+            self.assertIsNone(await Cache.get(('res.partner', 1, 'name')))
+            self.assertEqual(await Cache.get(('res.partner', 2, 'name')), 'B')
+            self.assertEqual(set(Cache._model_index['res.partner']), {2})
+
+            await Cache.invalidate_model('res.partner')
+            self.assertIsNone(await Cache.get(('res.partner', 2, 'name')))
+            self.assertNotIn('res.partner', Cache._model_index)
+            self.assertEqual(await Cache.get(('res.users', 1, 'login')), 'admin')
+        asyncio.run(run())
+
+    def test_set_honours_ttl_without_redis(self):
+        async def run():
+            with patch('core.cache.time.monotonic', return_value=0.0):
+                await Cache.set('session:abc', {'uid': 2}, ttl=86400)
+            with patch('core.cache.time.monotonic', return_value=86401.0):
+                self.assertIsNone(await Cache.get('session:abc'))
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
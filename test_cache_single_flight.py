@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from test_cache_coherence import FakeRedis, make_worker
+
+class TestGetOrCompute(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache = make_worker(self.redis)
+        self.calls = 0
+
+    async def slow_factory(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {'arch': '<form/>', 'n': self.calls}
+
+    def test_concurrent_callers_share_one_computation(self):
+        async def run():
+            results = await asyncio.gather(*[
+                self.cache.get_or_compute('view:42', self.slow_factory, ttl=60) for _ in range(50)
+            ])
+            self.assertEqual(self.calls, 1)
+            self.assertTrue(all(r == results[0] for r in results))
+            self.assertEqual(self.cache.flight_stats['coalesced'], 49)
+            self.assertEqual(await self.cache.get_or_compute('view:42', self.slow_factory), results[0])
+            self.assertEqual(self.calls, 1)
+            self.assertNotIn('lock:view:42', self.redis.data) # Lease released
+        asyncio.run(run())
+
+    def test_errors_reach_every_caller_and_are_not_cached(self):
+        async def run():
+            async def boom():
+                self.calls += 1
+                await asyncio.sleep(0.01)
+                raise ValueError("db down")
+            results = await asyncio.gather(*[
+                self.cache.get_or_compute('menu:1', boom) for _ in range(3)
+            ], return_exceptions=True)
+            self.assertEqual(self.calls, 1)
+            self.assertTrue(all(isinstance(r, ValueError) for r in results))
+            self.assertEqual(await self.cache.get_or_compute('menu:1', self.slow_factory), {'arch': '<form/>', 'n': 2})
+        asyncio.run(run())
+
+    def test_stale_served_while_one_caller_refreshes(self):
+        async def run():
+            with patch('core.cache.time.time', return_value=1000.0):
+                await self.cache.get_or_compute('view:7', self.slow_factory, ttl=10, stale_ttl=60)
+            with patch('core.cache.time.time', return_value=1015.0): # Expired, inside stale window
+                results = await asyncio.gather(*[
+                    self.cache.get_or_compute('view:7', self.slow_factory, ttl=10, stale_ttl=60) for _ in range(5)
+                ])
+            self.assertEqual(self.calls, 2)
+            self.assertEqual(sorted(r['n'] for r in results), [1, 1, 1, 1, 2])
+            self.assertEqual(self.cache.flight_stats['stale_served'], 4)
+        asyncio.run(run())
+
+    def test_early_refresh_before_expiry(self):
+        async def run():
+            await self.cache.get_or_compute('acl:x', self.slow_factory, ttl=3600)
+            # Huge beta: the refresh is practically certain long before expiry
+            value = await self.cache.get_or_compute('acl:x', self.slow_factory, ttl=3600, beta=1e9)
+            self.assertEqual(value['n'], 2)
+            self.assertEqual(self.cache.flight_stats['early_refreshes'], 1)
+        asyncio.run(run())
+
+    def test_other_process_waits_for_lease_holder(self):
+        async def run():
+            other = make_worker(self.redis)
+            other.LOCK_POLL = 0.005
+            self.redis.data['lock:view:9'] = self.cache.node_id # Held by the first worker
+
+            async def compute_and_store():
+                await asyncio.sleep(0.02)
+                await self.cache.set('view:9', {'v': 'shared', 'd': 0.02, 'e': 1e12})
+
+            waiter = asyncio.create_task(other.get_or_compute('view:9', self.slow_factory))
+            await compute_and_store()
+            self.assertEqual(await waiter, 'shared')
+            self.assertEqual(self.calls, 0)
+            self.assertEqual(other.flight_stats['lock_waits'], 1)
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
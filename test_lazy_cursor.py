@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from core import db_async
+from core.db_async import AsyncDatabase, LazyCursor
+from core.env import Environment
+from core.generations import ModelGenerations
+from addons.base.models.res_users import ResUsers
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.log.append('BEGIN')
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.conn.log.append('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+class FakeConn:
+    def __init__(self):
+        self.log = []
+
+    def transaction(self, readonly=False):
+        return FakeTransaction(self)
+
+    async def fetch(self, query, *args):
+        self.log.append(query)
+        return []
+
+    async def execute(self, query, *args):
+        self.log.append(query)
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConn()
+        self.acquired = 0
+        self.in_use = 0
+
+    async def acquire(self, timeout=None):
+        self.acquired += 1
+        self.in_use += 1
+        return self.conn
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+class TestLazyCursor(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.patch = patch.object(db_async, '_pool', self.pool)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_no_query_no_connection(self):
+        async def run():
+            async with AsyncDatabase.cursor() as cr:
+                await cr.on_connect("SELECT set_config('app.current_uid', $1::text, true)", ('2',))
+                self.assertFalse(cr.connected)
+            self.assertEqual(self.pool.acquired, 0)
+        asyncio.run(run())
+
+    def test_first_query_acquires_and_runs_setup(self):
+        async def run():
+            async with AsyncDatabase.cursor() as cr:
+                await cr.on_connect("SELECT set_config('app.current_uid', $1::text, true)", ('2',))
+                await cr.execute("SELECT 1")
+                await cr.execute("SELECT 2")
+                self.assertEqual(self.pool.in_use, 1)
+            self.assertEqual(self.pool.acquired, 1)
+            self.assertEqual(self.pool.in_use, 0)
+            self.assertEqual(self.pool.conn.log, [
+                'BEGIN', "SELECT set_config('app.current_uid', $1::text, true)", 'SELECT 1', 'SELECT 2', 'COMMIT'
+            ])
+        asyncio.run(run())
+
+    def test_error_rolls_back_and_releases(self):
+        async def run():
+            with self.assertRaises(ValueError):
+                async with AsyncDatabase.cursor() as cr:
+                    await cr.execute("SELECT 1")
+                    raise ValueError("boom")
+            self.assertEqual(self.pool.conn.log[-1], 'ROLLBACK')
+            self.assertEqual(self.pool.in_use, 0)
+        asyncio.run(run())
+
+    def test_early_release(self):
+        async def run():
+            async with AsyncDatabase.cursor() as cr:
+                await cr.execute("SELECT 1")
+                await cr.release() # e.g. before rendering a large response
+                self.assertEqual(self.pool.in_use, 0)
+                with self.assertRaises(RuntimeError):
+                    await cr.execute("SELECT 2")
+            self.assertEqual(self.pool.conn.log.count('COMMIT'), 1)
+        asyncio.run(run())
+
+    def test_memoized_bootstrap_stays_lazy(self):
+        async def run():
+            ModelGenerations.clear()
+            ModelGenerations.apply({m: 0 for m in Environment.BOOTSTRAP_MODELS})
+            Environment._bootstrap_l1.clear()
+            key = await ModelGenerations.key(None, "bootstrap:2", Environment.BOOTSTRAP_MODELS)
+            Environment._bootstrap_l1.set(key, {
+                'login': 'demo', 'company_id': 1, 'company_name': 'Nexo SA', 'company_currency_id': 3,
+                'group_ids': [10], 'all_group_ids': [10, 11],
+            })
+            async with AsyncDatabase.cursor(uid=2) as cr:
+                env = Environment(cr, uid=2)
+                await env.bootstrap()
+                self.assertEqual(env.user.login, 'demo')
+            self.assertEqual(self.pool.acquired, 0)
+            Environment._bootstrap_l1.clear()
+            ModelGenerations.clear()
+        asyncio.run(run())
+
+    def test_route_without_queries_never_acquires(self):
+        from core.http_fastapi import app
+        class FakeCache:
+            async def set(self, *args, **kwargs): pass
+        with patch('core.session.Cache', FakeCache()):
+            response = TestClient(app).get('/web/session/check')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.pool.acquired, 0)
+
+if __name__ == "__main__":
+    unittest.main()
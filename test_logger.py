@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import unittest
+from unittest.mock import patch
+from core.logger import LogPipeline, CategoryFilter, category_logger, logger
+
+class TestLogPipeline(unittest.TestCase):
+    def make_logger(self, name, **kwargs):
+        stream = io.StringIO()
+        pipeline = LogPipeline(stream=stream, **kwargs)
+        log = logging.getLogger(name)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        log.handlers = [pipeline.handler]
+        self.addCleanup(setattr, log, 'handlers', [])
+        return log, pipeline, stream
+
+    def records(self, pipeline, stream):
+        pipeline.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_json_output_with_context_and_category(self):
+        log, pipeline, stream = self.make_logger('nexo_erp.audit_test', category_filter=CategoryFilter({}, {}))
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.warning("bypass %s on %s", 'write', 'res.partner', exc_info=True, extra={'context': {'model': 'res.partner'}})
+        [rec] = self.records(pipeline, stream)
+        self.assertEqual(rec['message'], 'bypass write on res.partner')
+        self.assertEqual(rec['category'], 'audit_test')
+        self.assertEqual(rec['model'], 'res.partner')
+        self.assertIn('ValueError: boom', rec['exception'])
+
+    def test_rate_limit_reports_suppressed(self):
+        log, pipeline, stream = self.make_logger('nexo_erp.cache_test', category_filter=CategoryFilter({}, {'cache_test': 2}))
+        with patch('core.logger.time.monotonic', return_value=100.0):
+            for i in range(10):
+                log.info("invalidated %s", i)
+        with patch('core.logger.time.monotonic', return_value=101.0):
+            log.info("later")
+        recs = self.records(pipeline, stream)
+        self.assertEqual([r['message'] for r in recs], ['invalidated 0', 'invalidated 1', 'later'])
+        self.assertEqual(recs[-1]['suppressed'], 8)
+
+    def test_default_limit_spares_warnings_and_audit(self):
+        log, pipeline, stream = self.make_logger('nexo_erp.db_test', category_filter=CategoryFilter({}, {'*': 2}))
+        audit, audit_pipeline, audit_stream = self.make_logger('nexo_erp.audit', category_filter=CategoryFilter({}, {'*': 2}))
+        with patch('core.logger.time.monotonic', return_value=100.0):
+            for i in range(5):
+                log.info("info %s", i)
+                log.error("error %s", i)
+                audit.info("bypass %s", i)
+        recs = self.records(pipeline, stream)
+        self.assertEqual([r['message'] for r in recs if r['level'] == 'INFO'], ['info 0', 'info 1'])
+        self.assertEqual(len([r for r in recs if r['level'] == 'ERROR']), 5)
+        self.assertEqual(len(self.records(audit_pipeline, audit_stream)), 5)
+
+    def test_sampling_and_full_queue(self):
+        log, pipeline, stream = self.make_logger('nexo_erp.queue_test', category_filter=CategoryFilter({'queue_test': 0.0}, {}))
+        log.info("never kept")
+        self.assertEqual(self.records(pipeline, stream), [])
+
+        log, pipeline, stream = self.make_logger('nexo_erp.full_test', queue_size=1, category_filter=CategoryFilter({}, {}))
+        pipeline.listener.stop() # Writer stalled: the queue fills up
+        log.info("one")
+        log.info("two") # Dropped, never blocks
+        self.assertEqual(pipeline.handler.dropped, 1)
+
+    def test_category_loggers_share_default_pipeline(self):
+        self.assertIs(category_logger('audit').parent, logger)
+
+if __name__ == '__main__':
+    unittest.main()
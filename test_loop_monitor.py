@@ -0,0 +1,56 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+from core import loop_monitor, auth
+from core.loop_monitor import LoopMonitor
+
+def blocking_render():
+    time.sleep(0.3) # e.g. a PDF rendered on the loop
+
+class TestLoopMonitor(unittest.TestCase):
+    def test_stall_reported_with_stack(self):
+        reports = []
+
+        async def main():
+            task = asyncio.create_task(LoopMonitor.run())
+            await asyncio.sleep(0.05)
+            blocking_render()
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        with patch.object(loop_monitor, 'THRESHOLD_MS', 100), patch.object(loop_monitor, 'INTERVAL', 0.01), \
+             patch.object(LoopMonitor, '_report', side_effect=lambda lag, stack: reports.append((lag, stack))):
+            asyncio.run(main())
+        self.assertEqual(len(reports), 1)
+        lag, stack = reports[0]
+        self.assertGreater(lag, 0.2)
+        self.assertIn('blocking_render', stack)
+
+class TestPasswordOffload(unittest.TestCase):
+    def test_hash_runs_off_loop(self):
+        threads = []
+
+        def fake_hash(password):
+            threads.append(threading.current_thread().name)
+            return f"hashed:{password}"
+
+        async def main():
+            with patch.object(auth.pwd_context, 'hash', side_effect=fake_hash), \
+                 patch.object(auth.pwd_context, 'verify', side_effect=lambda p, h: h == f"hashed:{p}"):
+                hashed = await auth.get_password_hash_async('secret')
+                ok = await auth.verify_password_async('secret', hashed)
+                bad = await auth.verify_password_async('wrong', hashed)
+            return hashed, ok, bad
+
+        hashed, ok, bad = asyncio.run(main())
+        self.assertEqual(hashed, 'hashed:secret')
+        self.assertTrue(ok)
+        self.assertFalse(bad)
+        self.assertTrue(threads[0].startswith('nexo-hash'))
+
+if __name__ == '__main__':
+    unittest.main()
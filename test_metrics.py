@@ -0,0 +1,98 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.metrics import Metrics, MetricsMiddleware, HTTP_DURATION, ORM_OPS, ORM_ROWS, CRON_LAG, TASK_DURATION, orm_op
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        Metrics.reset()
+
+    def test_histogram_render(self):
+        Metrics.observe(HTTP_DURATION, ('/web/x', 'GET', '200'), 0.003)
+        Metrics.observe(HTTP_DURATION, ('/web/x', 'GET', '200'), 0.2)
+        Metrics.observe(HTTP_DURATION, ('/web/x', 'GET', '200'), 60)
+        text = Metrics.render(Metrics.merge([{HTTP_DURATION: [[k, v] for k, v in Metrics._values[HTTP_DURATION].items()]}]))
+        self.assertIn('# TYPE nexo_http_request_duration_seconds histogram', text)
+        labels = 'route="/web/x",method="GET",status="200"'
+        self.assertIn(f'nexo_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1', text)
+        self.assertIn(f'nexo_http_request_duration_seconds_bucket{{{labels},le="0.25"}} 2', text)
+        self.assertIn(f'nexo_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f'nexo_http_request_duration_seconds_count{{{labels}}} 3', text)
+
+    def test_merge_workers(self):
+        orm_op('res.partner', 'read', 10)
+        Metrics.set(CRON_LAG, (), 5.0)
+        mine = Metrics.snapshot()
+        other = json.loads(json.dumps(mine)) # As stored in Redis
+        for series in other[CRON_LAG]:
+            series[1] = 30.0
+        merged = Metrics.merge([mine, other])
+        self.assertEqual(merged[ORM_OPS][('res.partner', 'read')], 2)
+        self.assertEqual(merged[ORM_ROWS][('res.partner', 'read')], 20)
+        self.assertEqual(merged[CRON_LAG][()], 30.0) # Gauge aggregated with max
+
+    def test_label_escaping(self):
+        Metrics.inc(ORM_OPS, ('we"ird\nmodel', 'search'))
+        text = Metrics.render(Metrics.merge([Metrics.snapshot()]))
+        self.assertIn('model="we\\"ird\\nmodel"', text)
+
+    def test_middleware_route_template(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get('/items/{item_id}')
+        async def item(item_id: int):
+            return {'id': item_id}
+
+        with patch('core.metrics.Metrics._collectors', []), patch('core.metrics.Metrics._scrape_collectors', []):
+            client = TestClient(app)
+            client.get('/items/1')
+            client.get('/items/2')
+            client.get('/missing')
+            series = Metrics._values[HTTP_DURATION]
+            self.assertEqual(sum(series[('/items/{item_id}', 'GET', '200')][:-1]), 2)
+            self.assertIn(('other', 'GET', '404'), series)
+
+            with patch('core.cache.Cache.use_redis', False, create=True):
+                text = asyncio.run(Metrics.scrape())
+            self.assertIn('route="/items/{item_id}"', text)
+
+    def test_worker_process_metrics_reach_scrape(self):
+        from core import worker
+        from test_cache_coherence import FakeRedis, make_worker
+        redis = FakeRedis()
+        worker_cache, web_cache = make_worker(redis), make_worker(redis)
+        worker_cache.node_id, web_cache.node_id = 'worker', 'web'
+
+        async def cron_loop():
+            Metrics.set(CRON_LAG, (), 12.0)
+
+        async def task_loop():
+            Metrics.observe(TASK_DURATION, ('send_mail', 'ok'), 0.3)
+
+        async def idle():
+            await asyncio.sleep(3600)
+
+        async def run_worker():
+            with patch('core.cache.Cache', worker_cache), \
+                 patch.object(worker.AsyncDatabase, 'initialize', staticmethod(lambda: asyncio.sleep(0))), \
+                 patch.object(worker.IrCron, 'runner_loop', staticmethod(cron_loop)), \
+                 patch.object(worker.TaskQueue, 'worker', staticmethod(task_loop)), \
+                 patch.object(worker, 'Cache') as cache:
+                cache.invalidation_listener = idle
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(worker.main(), 0.1) # Loops run forever
+        asyncio.run(run_worker())
+
+        Metrics.reset() # The web process has its own (empty) values
+        with patch('core.cache.Cache', web_cache), \
+             patch('core.metrics.Metrics._collectors', []), patch('core.metrics.Metrics._scrape_collectors', []):
+            text = asyncio.run(Metrics.scrape())
+        self.assertIn('nexo_cron_lag_seconds 12', text)
+        self.assertIn('nexo_task_duration_seconds_count{task="send_mail",status="ok"} 1', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from core.generations import ModelGenerations
+from core.notify import ChangeBuffer
+
+# Mock CR backed by a generation table
+class MockCr:
+    def __init__(self, table):
+        self.table = table
+        self.queries = []
+        self._result = []
+
+    async def execute(self, query, params=None):
+        self.queries.append((query, params))
+        self._result = [{'model': m, 'gen': self.table[m]} for m in params[0] if m in self.table]
+
+    def fetchall(self):
+        return self._result
+
+class TestModelGenerations(unittest.TestCase):
+    def setUp(self):
+        ModelGenerations.clear()
+
+    def test_key_embeds_generations_and_mirrors_them(self):
+        async def run():
+            cr = MockCr({'ir.ui.menu': 14})
+            key = await ModelGenerations.key(cr, 'menus:2', ['res.groups', 'ir.ui.menu'])
+            self.assertEqual(key, 'menus:2@ir.ui.menu=14,res.groups=0')
+            await ModelGenerations.key(cr, 'menus:2', ['ir.ui.menu'])
+            self.assertEqual(len(cr.queries), 1) # Served by the mirror
+
+            # A commit elsewhere, pushed on the 'model_generation' channel
+            ModelGenerations.on_notify(json.dumps({'ir.ui.menu': 15}))
+            self.assertEqual(await ModelGenerations.key(cr, 'menus:2', ['ir.ui.menu']), 'menus:2@ir.ui.menu=15')
+            ModelGenerations.apply({'ir.ui.menu': 13}) # Late/out-of-order message
+            self.assertEqual((await ModelGenerations.get(cr, ['ir.ui.menu']))['ir.ui.menu'], 15)
+        asyncio.run(run())
+
+    def test_unconfirmed_entries_are_reread(self):
+        async def run():
+            table = {'res.users': 3}
+            cr = MockCr(table)
+            with patch('core.generations.time.monotonic', return_value=0.0):
+                await ModelGenerations.get(cr, ['res.users'])
+            table['res.users'] = 4
+            with patch('core.generations.time.monotonic', return_value=ModelGenerations.REFRESH + 1):
+                self.assertEqual((await ModelGenerations.get(cr, ['res.users']))['res.users'], 4)
+            self.assertEqual(len(cr.queries), 2)
+        asyncio.run(run())
+
+    def test_flush_bumps_changed_models_in_notify_statement(self):
+        async def run():
+            cr = MockCr({})
+            buf = ChangeBuffer()
+            buf.add('sale.order', 'write', [1], 2)
+            buf.add('sale.order', 'create', [2], 2)
+            buf.add('res.partner', 'write', [9], 2)
+            await buf.flush(cr)
+            self.assertEqual(len(cr.queries), 1)
+            query, params = cr.queries[0]
+            self.assertIn('ON CONFLICT (model) DO UPDATE', query)
+            self.assertEqual(params[2], ['res.partner', 'sale.order'])
+            self.assertEqual(params[3], ModelGenerations.CHANNEL)
+            self.assertEqual(await ChangeBuffer().flush(cr), {}) # Nothing buffered
+        asyncio.run(run())
+
+    def test_committing_process_applies_its_own_generations(self):
+        # The NOTIFY only reaches LISTEN connections: the writer applies the
+        # generations returned by the flush once COMMIT succeeded
+        from core import db_async
+        from core.db_async import AsyncDatabase
+        from test_replica_routing import FakePool, FakeCache
+        async def run():
+            pool = FakePool('primary')
+            pool.conn.rows = [{'model': 'ir.ui.menu', 'gen': 8}]
+            with patch.object(db_async, '_pool', pool), patch.object(db_async, '_replica_pool', None), \
+                 patch('core.cache.Cache', FakeCache()):
+                with self.assertRaises(ValueError):
+                    async with AsyncDatabase.acquire(uid=2) as cr:
+                        cr.notifications.add('ir.ui.menu', 'write', [1], 2)
+                        raise ValueError("rolled back")
+                self.assertNotIn('ir.ui.menu', ModelGenerations._gens)
+
+                async with AsyncDatabase.acquire(uid=2) as cr:
+                    cr.notifications.add('ir.ui.menu', 'write', [1], 2)
+                    self.assertNotIn('ir.ui.menu', ModelGenerations._gens)
+                self.assertEqual(pool.conn.log[-2:], ['FETCH', 'COMMIT'])
+                cr = MockCr({})
+                self.assertEqual(await ModelGenerations.get(cr, ['ir.ui.menu']), {'ir.ui.menu': 8})
+                self.assertEqual(cr.queries, []) # No poll needed
+        AsyncDatabase._recent_writers.clear()
+        asyncio.run(run())
+
+    def test_menu_key_follows_groups_and_rules(self):
+        from core.env import Environment
+        import core.models.ir_ui_menu
+        async def run():
+            cr = MockCr({'ir.ui.menu': 3, 'res.groups': 1})
+            env = Environment(cr, uid=2)
+            keys = []
+            async def get_or_compute(key, factory, ttl=None):
+                keys.append(key)
+                return []
+            with patch('core.cache.Cache.get_or_compute', get_or_compute):
+                await env['ir.ui.menu'].load_menus()
+                ModelGenerations.apply({'res.groups': 2}) # Group membership changed
+                await env['ir.ui.menu'].load_menus()
+            self.assertIn('ir.rule=0', keys[0])
+            self.assertIn('res.groups=1', keys[0])
+            self.assertIn('res.groups=2', keys[1])
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import unittest
+from core.notify import ChangeBuffer
+from core.env import Environment
+
+# Mock CR recording queries
+class MockCr:
+    def __init__(self):
+        self.queries = []
+        self.notifications = ChangeBuffer()
+
+    async def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return []
+
+class TestChangeBuffer(unittest.TestCase):
+    def test_coalesce_per_model_operation(self):
+        buf = ChangeBuffer()
+        for i in range(1, 1001):
+            buf.add('res.partner', 'create', [i], uid=2)
+        buf.add('res.partner', 'write', [5, 9], uid=2)
+
+        messages = [json.loads(m) for m in buf.payloads()]
+        self.assertEqual(len(messages), 2)
+
+        created = [m for m in messages if m['type'] == 'create'][0]
+        self.assertEqual(created['ranges'], [[1, 1000]])
+        self.assertEqual(ChangeBuffer.expand_ids(created), list(range(1, 1001)))
+
+        written = [m for m in messages if m['type'] == 'write'][0]
+        self.assertEqual(written['ids'], [5, 9])
+
+    def test_split_under_payload_limit(self):
+        buf = ChangeBuffer()
+        ids = list(range(1, 20000, 2)) # No consecutive runs
+        buf.add('sale.order.line', 'write', ids)
+
+        messages = buf.payloads()
+        self.assertGreater(len(messages), 1)
+        for m in messages:
+            self.assertLess(len(m.encode('utf-8')), 8000)
+
+        restored = []
+        for m in messages:
+            restored.extend(ChangeBuffer.expand_ids(json.loads(m)))
+        self.assertEqual(sorted(restored), ids)
+
+    def test_overflow_becomes_model_wide(self):
+        buf = ChangeBuffer()
+        buf.add('sale.order.line', 'write', range(1, 500000, 2))
+
+        messages = [json.loads(m) for m in buf.payloads()]
+        self.assertEqual(len(messages), 1)
+        self.assertIsNone(messages[0]['ids'])
+        self.assertIsNone(ChangeBuffer.expand_ids(messages[0]))
+
+    def test_envs_share_transaction_buffer_and_flush_once(self):
+        cr = MockCr()
+        env = Environment(cr, uid=2)
+        sudo_env = Environment(cr, uid=1)
+        env.notifications.add('res.partner', 'write', [1], 2)
+        sudo_env.notifications.add('res.users', 'write', [1], 1)
+        self.assertIs(env.notifications, sudo_env.notifications)
+
+        asyncio.run(cr.notifications.flush(cr))
+        self.assertEqual(len(cr.queries), 1)
+        query, params = cr.queries[0]
+        self.assertIn('unnest', query)
+        self.assertEqual(params[0], 'record_change')
+        self.assertEqual(len(params[1]), 2)
+        self.assertFalse(cr.notifications)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import asyncio
+import random
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import perf_e2e_throughput as perf
+
+class TestThroughputReport(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = [i / 1000 for i in range(1, 101)] # 1..100 ms
+        self.assertEqual(perf.percentile(values, 50), 0.05)
+        self.assertEqual(perf.percentile(values, 95), 0.095)
+        self.assertEqual(perf.percentile(values, 99), 0.099)
+        self.assertEqual(perf.percentile([0.2], 99), 0.2)
+        self.assertIsNone(perf.percentile([], 50))
+
+    def test_summarize_excludes_errors_from_latency(self):
+        samples = [('list', 0.010, 3, True), ('list', 0.030, 5, True), ('form', 1.0, None, False)]
+        summary = perf.summarize(samples, elapsed=2.0)
+        self.assertEqual(summary['overall']['requests'], 3)
+        self.assertEqual(summary['overall']['errors'], 1)
+        self.assertEqual(summary['overall']['throughput'], 1.5)
+        self.assertEqual(summary['overall']['p99_ms'], 30.0)
+        self.assertEqual(summary['scenarios']['list']['queries_per_request'], 4.0)
+        self.assertIsNone(summary['scenarios']['form']['p50_ms'])
+
+    def test_baseline_comparison(self):
+        baseline = {'summary': {'overall': {'p95_ms': 100.0, 'throughput': 200.0}}}
+        summary = {'overall': {'p95_ms': 105.0, 'throughput': 150.0}}
+        self.assertEqual([r[0] for r in perf.compare(summary, baseline, 0.10)], ['throughput'])
+
+    def test_request_sample_and_rpc_error(self):
+        client = MagicMock()
+        ok = MagicMock(status_code=200, headers={'x-sql-stats': 'count=7; time=1.2ms; slowest=0.4ms'})
+        ok.json.return_value = {'result': [{'id': 1}]}
+        failed = MagicMock(status_code=200, headers={})
+        failed.json.return_value = {'error': {'message': 'Odoo Server Error'}}
+        client.post = AsyncMock(side_effect=[ok, failed])
+        user = perf.VirtualUser(client, 'admin', 'admin', [1], [1], random.Random(1))
+        user.csrf_token = 'tok'
+
+        self.assertEqual(asyncio.run(user.call('form', 'sale.order', 'read', [[1], ['name']])), [{'id': 1}])
+        self.assertIsNone(asyncio.run(user.call('form', 'sale.order', 'read', [[2], ['name']])))
+        self.assertEqual([(s[0], s[2], s[3]) for s in user.samples], [('form', 7, True), ('form', 0, False)])
+        self.assertEqual(client.post.call_args.kwargs['headers'], {'X-CSRF-Token': 'tok'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core import db_async
+from core.db_async import AsyncDatabase
+from core.pool import PoolGate, PoolTimeout
+
+class FakeTransaction:
+    async def __aenter__(self): pass
+    async def __aexit__(self, *args): return False
+
+class FakeConn:
+    def transaction(self, readonly=False):
+        return FakeTransaction()
+
+class FakePool:
+    def __init__(self):
+        self.in_use = 0
+
+    async def acquire(self, timeout=None):
+        self.in_use += 1
+        return FakeConn()
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+    def get_size(self): return 2
+    def get_idle_size(self): return 2 - self.in_use
+
+class TestPoolGate(unittest.TestCase):
+    def test_priority_order(self):
+        async def run():
+            gate = PoolGate('primary', 1)
+            await gate.acquire(PoolGate.UI)
+            order = []
+            async def waiter(priority, name):
+                await gate.acquire(priority)
+                order.append(name)
+                gate.release()
+            tasks = [asyncio.create_task(waiter(PoolGate.QUEUE, 'queue')),
+                     asyncio.create_task(waiter(PoolGate.API, 'api'))]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(waiter(PoolGate.UI, 'ui'))) # Arrives last
+            await asyncio.sleep(0)
+            self.assertEqual(gate.waiting(), {'ui': 1, 'api': 1, 'queue': 1})
+            gate.release()
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, ['ui', 'api', 'queue'])
+            self.assertEqual(gate.in_use, 0)
+        asyncio.run(run())
+
+    def test_reserved_slots_are_ui_only(self):
+        async def run():
+            gate = PoolGate('primary', 3, reserved=1, timeouts={PoolGate.API: 0.01})
+            await gate.acquire(PoolGate.API)
+            await gate.acquire(PoolGate.API)
+            with self.assertRaises(PoolTimeout):
+                await gate.acquire(PoolGate.API) # Last slot is reserved
+            await gate.acquire(PoolGate.UI)
+            self.assertEqual(gate.in_use, 3)
+            stats = gate.stats()
+            self.assertEqual(stats['classes']['api']['timeouts'], 1)
+            self.assertEqual(stats['classes']['api']['acquired'], 2)
+            self.assertEqual(stats['waiters'], {'ui': 0, 'api': 0, 'queue': 0})
+        asyncio.run(run())
+
+    def test_wait_histogram(self):
+        async def run():
+            gate = PoolGate('primary', 1)
+            await gate.acquire()
+            task = asyncio.create_task(gate.acquire(PoolGate.API))
+            await asyncio.sleep(0.02)
+            gate.release()
+            await task
+            buckets = gate.stats()['classes']['api']['wait_buckets']
+            self.assertEqual(sum(buckets), 1)
+            self.assertEqual(buckets[0], 0) # Waited more than 1ms
+        asyncio.run(run())
+
+    def test_acquire_timeout_releases_nothing(self):
+        async def run():
+            pool = FakePool()
+            gate = PoolGate('primary', 1, timeouts={PoolGate.API: 0.01})
+            with patch.object(db_async, '_pool', pool), patch.dict(AsyncDatabase._gates, {'primary': gate}):
+                async with AsyncDatabase.acquire(priority=PoolGate.UI):
+                    with self.assertRaises(PoolTimeout):
+                        async with AsyncDatabase.acquire(priority=PoolGate.API):
+                            pass
+                    self.assertEqual(pool.in_use, 1)
+                self.assertEqual(gate.in_use, 0)
+                self.assertEqual(pool.in_use, 0)
+                stats = AsyncDatabase.pool_stats()['primary']
+                self.assertEqual(stats['open'], 2)
+                self.assertEqual(stats['classes']['ui']['acquired'], 1)
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from core import profiler
+from core.profiler import Profiler, profiling
+
+def busy_json(ms):
+    import json
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        json.dumps({'k': list(range(200))})
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        Profiler.clear()
+
+    def test_wanted(self):
+        with patch.object(profiler, 'RATE', 0.0):
+            self.assertFalse(Profiler.wanted('/web/dataset/call_kw', 5))
+            self.assertFalse(Profiler.wanted('/web/dataset/call_kw', 5, header='1')) # Not admin, no token
+            self.assertTrue(Profiler.wanted('/web/dataset/call_kw', 1, header='1'))
+        with patch.object(profiler, 'RATE', 1.0), patch.object(profiler, 'ROUTES', ('/api/',)), patch.object(profiler, 'UIDS', frozenset([7])):
+            self.assertTrue(Profiler.wanted('/api/call', 5))
+            self.assertTrue(Profiler.wanted('/web/dataset/call_kw', 7))
+            self.assertFalse(Profiler.wanted('/web/dataset/call_kw', 5))
+
+    def test_running_and_awaiting_samples(self):
+        async def request():
+            with patch.object(profiler, 'RATE', 1.0):
+                with profiling('/web/dataset/call_kw', 2, method='res.partner.read') as profile:
+                    busy_json(60)
+                    await asyncio.sleep(0.06)
+            return profile
+
+        profile = asyncio.run(request())
+        self.assertIs(Profiler.recent(1)[0], profile)
+        self.assertGreater(profile.samples, 5)
+        self.assertIn('json', profile.categories)
+        self.assertIn('await', profile.categories)
+        folded = profile.collapsed()
+        self.assertTrue(any(line.startswith('await;') and 'test_profiler.py:' in line for line in folded.splitlines()))
+        self.assertTrue(any(line.startswith('cpu;') and 'busy_json' in line for line in folded.splitlines()))
+        self.assertEqual(profile.summary()['method'], 'res.partner.read')
+        self.assertEqual(Profiler.collapsed(5), folded)
+
+if __name__ == '__main__':
+    unittest.main()
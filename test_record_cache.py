@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from pypika import Table
+from core.orm import Model
+from core.fields import Char
+from core.env import Environment
+from core.cache import Cache
+from core.generations import ModelGenerations
+from test_cache_coherence import FakeRedis
+
+ROWS = {
+    1: {'id': 1, 'name': 'English', 'code': 'en_US', 'secret': 'x'},
+    2: {'id': 2, 'name': 'Spanish', 'code': 'es_ES', 'secret': 'y'},
+    3: {'id': 3, 'name': 'Klingon', 'code': 'tlh', 'secret': 'z'},
+}
+
+GENERATIONS = {}
+
+# Mock CR serving ROWS by id (generation lookups are not recorded)
+class MockCr:
+    def __init__(self, visible=None):
+        self.queries = []
+        self._result = []
+        self.visible = visible # ids the record rule lets through
+
+    async def execute(self, query, params=None):
+        if query.startswith('SELECT model, gen FROM'):
+            self._result = [{'model': m, 'gen': GENERATIONS[m]} for m in params[0] if m in GENERATIONS]
+            return
+        self.queries.append((query, params))
+        ids = [p for p in (params or []) if isinstance(p, int) and p in ROWS]
+        if self.visible is not None:
+            ids = [i for i in ids if i in self.visible]
+        if query.startswith('SELECT "id" FROM'):
+            self._result = [{'id': i} for i in ids]
+        else:
+            self._result = [ROWS[i] for i in ids]
+
+    def fetchall(self):
+        return self._result
+
+class CachedLang(Model):
+    _name = 'test.rc.lang'
+    _cache_records = True
+    _cache_records_exclude = ('secret',)
+    name = Char()
+    code = Char()
+    secret = Char()
+
+class TestRecordCache(unittest.TestCase):
+    def setUp(self):
+        Cache._setup_l1()
+        Cache.redis = FakeRedis()
+        Cache.use_redis = True
+        Cache.initialized = True
+        ModelGenerations.clear()
+        GENERATIONS.clear()
+
+    def tearDown(self):
+        Cache.use_redis = False
+
+    def test_second_request_skips_sql(self):
+        async def run():
+            cr1 = MockCr()
+            first = await Environment(cr1, uid=1)['test.rc.lang'].browse([1, 2]).read(['name', 'code'])
+            self.assertEqual(len(cr1.queries), 1)
+            self.assertIn('c:test.rc.lang:1:name:0', Cache.redis.data)
+            self.assertEqual(Cache.redis.sets['deps:test.rc.lang:2'], {'c:test.rc.lang:2:name:0', 'c:test.rc.lang:2:code:0'})
+
+            cr2 = MockCr()
+            second = await Environment(cr2, uid=1)['test.rc.lang'].browse([1, 2, 3]).read(['name', 'code'])
+            self.assertEqual(second[:2], first)
+            self.assertEqual(second[2]['name'], 'Klingon')
+            self.assertEqual(len(cr2.queries), 1)
+            self.assertEqual(list(cr2.queries[0][1]), [3]) # Only the uncached id hits SQL
+
+            # record_change (pg_listener) drops the entries
+            await Cache.invalidate_model('test.rc.lang', [1], publish=False)
+            cr3 = MockCr()
+            await Environment(cr3, uid=1)['test.rc.lang'].browse([1, 2]).read(['name'])
+            self.assertEqual(list(cr3.queries[0][1]), [1])
+        asyncio.run(run())
+
+    def test_generation_bump_invalidates_model_wide(self):
+        async def run():
+            await Environment(MockCr(), uid=1)['test.rc.lang'].browse([1, 2]).read(['name'])
+            ModelGenerations.apply({'test.rc.lang': 1}) # Model-wide change committed elsewhere
+            cr = MockCr()
+            await Environment(cr, uid=1)['test.rc.lang'].browse([1, 2]).read(['name'])
+            self.assertEqual(len(cr.queries), 1)
+            self.assertIn('c:test.rc.lang:1:name:1', Cache.redis.data)
+        asyncio.run(run())
+
+    def test_rules_filter_ids_before_serving(self):
+        async def run():
+            await Environment(MockCr(), uid=1)['test.rc.lang'].browse([1, 2, 3]).read(['name'])
+
+            cr = MockCr(visible={1, 3})
+            env = Environment(cr, uid=1)
+            rule = Table('test_rc_lang').code != 'es_ES'
+            with patch.object(CachedLang, '_apply_ir_rules', return_value=rule):
+                res = await env['test.rc.lang'].browse([1, 2, 3]).read(['name'])
+            self.assertEqual(len(cr.queries), 1) # Id-only rule check, values from cache
+            self.assertTrue(cr.queries[0][0].startswith('SELECT "id" FROM'))
+            self.assertEqual([r['name'] for r in res], ['English', None, 'Klingon'])
+        asyncio.run(run())
+
+    def test_bypassed_for_excluded_fields_and_dirty_transactions(self):
+        async def run():
+            await Environment(MockCr(), uid=1)['test.rc.lang'].browse([1]).read(['name'])
+
+            cr = MockCr()
+            await Environment(cr, uid=1)['test.rc.lang'].browse([1]).read(['name', 'secret'])
+            self.assertEqual(len(cr.queries), 1)
+            self.assertNotIn('c:test.rc.lang:1:secret:0', Cache.redis.data)
+
+            cr = MockCr()
+            env = Environment(cr, uid=1)
+            env.notifications.add('test.rc.lang', 'write', [1], 1)
+            await env['test.rc.lang'].browse([1]).read(['name'])
+            self.assertEqual(len(cr.queries), 1) # Own uncommitted writes: read from SQL
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
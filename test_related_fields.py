@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+from core.orm import Model
+from core.fields import Char, Many2one
+from core.registry import Registry
+from core.env import Environment
+
+# Mock CR recording queries
+class MockCr:
+    def __init__(self):
+        self.queries = []
+        self._result = []
+        self.next_id = 7
+
+    async def execute(self, query, params=None):
+        self.queries.append((query, params))
+        if 'RETURNING t.id, sub.val' in query:
+            self._result = [(5, 'Acme')]
+        elif query.startswith('INSERT'):
+            self._result = [{'id': self.next_id}]
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+class RelPartner(Model):
+    _name = 'test.rel.partner'
+    name = Char()
+
+class RelOrder(Model):
+    _name = 'test.rel.order'
+    partner_id = Many2one('test.rel.partner')
+
+class RelLine(Model):
+    _name = 'test.rel.line'
+    order_id = Many2one('test.rel.order')
+    partner_name = Char(related='order_id.partner_id.name', store=True, index=True)
+
+class TestRelatedFields(unittest.TestCase):
+    def setUp(self):
+        self.cr = MockCr()
+        self.env = Environment(self.cr, uid=1)
+
+    def _related_updates(self):
+        return [(q, p) for q, p in self.cr.queries if 'UPDATE "test_rel_line" AS t' in q]
+
+    def test_dependency_index(self):
+        self.assertIn(('test.rel.line', 'partner_name', 0), Registry.related_dependents('test.rel.line', 'order_id'))
+        self.assertIn(('test.rel.line', 'partner_name', 1), Registry.related_dependents('test.rel.order', 'partner_id'))
+        self.assertIn(('test.rel.line', 'partner_name', 2), Registry.related_dependents('test.rel.partner', 'name'))
+        self.assertTrue(RelLine._fields['partner_name'].readonly)
+
+    def test_source_write_is_one_update_from(self):
+        partners = self.env['test.rel.partner'].browse([1, 2])
+        asyncio.run(partners.write({'name': 'Acme'}))
+
+        updates = self._related_updates()
+        self.assertEqual(len(updates), 1)
+        query, params = updates[0]
+        self.assertIn('FROM (', query)
+        self.assertIn('LEFT JOIN "test_rel_order" AS h1 ON h1.id = t0."order_id"', query)
+        self.assertIn('LEFT JOIN "test_rel_partner" AS h2 ON h2.id = h1."partner_id"', query)
+        self.assertIn('h2.id = ANY($1)', query)
+        self.assertEqual(sorted(params[0]), [1, 2])
+
+        # Dependents refreshed in env cache from RETURNING
+        self.assertEqual(self.env.cache[('test.rel.line', 5, 'partner_name')], 'Acme')
+        self.assertFalse(self.env.to_relate)
+        # Dependent rows queued like any write (generation bump, WS notification)
+        self.assertIn(('test.rel.line', 'write', 1), self.env.notifications._changes)
+        self.assertEqual(self.env.notifications._changes[('test.rel.line', 'write', 1)], {5})
+
+    def test_create_only_propagates_own_hop(self):
+        asyncio.run(self.env['test.rel.order'].create({'partner_id': 3}))
+        self.assertEqual(self._related_updates(), [])
+
+        asyncio.run(self.env['test.rel.line'].create({'order_id': 4}))
+        updates = self._related_updates()
+        self.assertEqual(len(updates), 1)
+        self.assertIn('t0.id = ANY($1)', updates[0][0])
+        self.assertEqual(updates[0][1], ([7],))
+
+    def test_unstored_related_rejected(self):
+        with self.assertRaises(ValueError):
+            Char(related='order_id.name', store=False)
+
+if __name__ == "__main__":
+    unittest.main()
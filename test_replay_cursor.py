@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+import asyncpg
+from core.db_async import AsyncCursor
+from core.env import Environment
+from core.tests.replay import ReplayConnection, FakeRecord, make_records
+import perf_orm_overhead
+
+class TestReplayConnection(unittest.TestCase):
+    def setUp(self):
+        self.conn = ReplayConnection(perf_orm_overhead.make_dataset(20), log=True)
+        self.env = Environment(AsyncCursor(self.conn), uid=1, context={})
+
+    def test_fake_record(self):
+        [rec] = make_records(['id', 'name'], [(7, 'Acme')])
+        self.assertEqual(rec[0], 7)
+        self.assertEqual(rec['name'], 'Acme')
+        self.assertEqual(dict(rec), {'id': 7, 'name': 'Acme'})
+        self.assertEqual(list(rec), [7, 'Acme'])
+
+    def test_orm_on_synthesized_rows(self):
+        async def run():
+            Partner = self.env['bench.partner']
+            found = await Partner.search([('name', 'ilike', 'partner')], limit=5)
+            rows = await Partner.browse([3, 4]).read(['name', 'credit'])
+            created = await Partner.create([{'name': 'A'}, {'name': 'B'}])
+            return found, rows, created
+        found, rows, created = asyncio.run(run())
+        self.assertEqual(list(found.ids), [1, 2, 3, 4, 5])
+        self.assertEqual([(r['id'], r['name']) for r in rows], [(3, 'Partner 3'), (4, 'Partner 4')])
+        self.assertEqual(list(created.ids), [21, 22])
+
+    def test_search_read_join_is_unambiguous(self):
+        async def run():
+            return await self.env['bench.partner'].search_read(perf_orm_overhead.DOMAIN, ['name', 'parent_id'], limit=3, order='name desc')
+        rows = asyncio.run(run())
+        self.assertEqual(len(rows), 3)
+        query = self.conn.log[-1][0]
+        self.assertIn('AS "parent_id_rel"', query)
+        self.assertIn('"bench_partner"."name" ILIKE', query)
+        self.assertIn('ORDER BY "bench_partner"."name" DESC', query)
+
+    def test_ambiguous_column_rejected(self):
+        query = 'SELECT "bench_partner"."name" FROM "bench_partner" LEFT JOIN "bench_partner" AS "p" ON "bench_partner"."parent_id" = "p".id WHERE "name" = $1'
+        with self.assertRaises(asyncpg.exceptions.AmbiguousColumnError):
+            asyncio.run(self.conn.fetch(query, 'x'))
+
+    def test_recording_replayed_first(self):
+        query = 'SELECT "id","name" FROM "bench_partner" WHERE "id" IN ($1)'
+        conn = ReplayConnection(recording=[{'query': query, 'args': [1], 'columns': ['id', 'name'], 'rows': [[1, 'Recorded']]}])
+        rows = asyncio.run(conn.fetch(query, 1))
+        self.assertEqual(rows[0]['name'], 'Recorded')
+
+    def test_baseline_comparison(self):
+        results = {'read': {'records': 80, 'median_us': 130.0}, 'write': {'records': 80, 'median_us': 100.0}}
+        baseline = {'results': {'read': {'records': 80, 'median_us': 100.0}, 'write': {'records': 80, 'median_us': 100.0}}}
+        regressions = perf_orm_overhead.compare(results, baseline, 0.10)
+        self.assertEqual([r[0] for r in regressions], ['read'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core import db_async
+from core.db_async import AsyncDatabase
+
+class FakeTransaction:
+    def __init__(self, conn, readonly):
+        self.conn = conn
+        self.readonly = readonly
+
+    async def __aenter__(self):
+        self.conn.log.append('BEGIN READ ONLY' if self.readonly else 'BEGIN')
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.conn.log.append('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+class FakeConn:
+    def __init__(self, name):
+        self.name = name
+        self.log = []
+        self.rows = []
+
+    def transaction(self, readonly=False):
+        return FakeTransaction(self, readonly)
+
+    async def fetch(self, query, *args):
+        self.log.append('FETCH')
+        return self.rows
+
+class FakePool:
+    def __init__(self, name, fail=False):
+        self.conn = FakeConn(name)
+        self.fail = fail
+        self.in_use = 0
+
+    async def acquire(self, timeout=None):
+        if self.fail: raise OSError("connection refused")
+        self.in_use += 1
+        return self.conn
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key, default=None, l1_ttl=None):
+        return self.data.get(key, default)
+
+    async def set(self, key, value, ttl=3600, l1_ttl=None):
+        self.data[key] = value
+
+class TestReplicaRouting(unittest.TestCase):
+    def setUp(self):
+        self.primary = FakePool('primary')
+        self.replica = FakePool('replica')
+        self.cache = FakeCache()
+        AsyncDatabase._recent_writers.clear()
+        self.patches = [
+            patch.object(db_async, '_pool', self.primary),
+            patch.object(db_async, '_replica_pool', self.replica),
+            patch('core.cache.Cache', self.cache),
+        ]
+        for p in self.patches: p.start()
+
+    def tearDown(self):
+        for p in self.patches: p.stop()
+
+    def test_readonly_goes_to_replica(self):
+        async def run():
+            async with AsyncDatabase.acquire(readonly=True, uid=2) as cr:
+                self.assertTrue(cr.is_replica)
+                self.assertTrue(cr.readonly)
+            self.assertEqual(self.replica.conn.log, ['BEGIN READ ONLY', 'COMMIT'])
+            self.assertEqual(self.primary.conn.log, [])
+            self.assertEqual(self.replica.in_use, 0)
+        asyncio.run(run())
+
+    def test_read_your_writes_window(self):
+        async def run():
+            async with AsyncDatabase.acquire(uid=2) as cr:
+                cr.notifications.add('res.partner', 'write', [1], uid=2)
+                cr.notifications.flush = lambda cr: asyncio.sleep(0)
+            self.assertIn('ryw:2', self.cache.data) # Shared with other workers
+
+            async with AsyncDatabase.acquire(readonly=True, uid=2) as cr:
+                self.assertFalse(cr.is_replica) # Own write is recent: primary
+            async with AsyncDatabase.acquire(readonly=True, uid=3) as cr:
+                self.assertTrue(cr.is_replica) # Other users unaffected
+
+            AsyncDatabase._recent_writers.clear()
+            self.assertTrue(await AsyncDatabase.recently_wrote(2)) # Another worker's mark
+            self.cache.data.clear()
+            self.assertFalse(await AsyncDatabase.recently_wrote(2))
+        asyncio.run(run())
+
+    def test_replica_down_falls_back_to_primary(self):
+        async def run():
+            self.replica.fail = True
+            async with AsyncDatabase.acquire(readonly=True, uid=2) as cr:
+                self.assertFalse(cr.is_replica)
+            self.assertEqual(self.primary.conn.log, ['BEGIN READ ONLY', 'COMMIT'])
+            self.assertEqual(self.primary.in_use, 0)
+        asyncio.run(run())
+
+    def test_no_replica_configured(self):
+        async def run():
+            with patch.object(db_async, '_replica_pool', None):
+                async with AsyncDatabase.acquire(readonly=True) as cr:
+                    self.assertFalse(cr.is_replica)
+            self.assertEqual(self.primary.conn.log, ['BEGIN READ ONLY', 'COMMIT'])
+        asyncio.run(run())
+
+class TestReadonlyDetection(unittest.TestCase):
+    def test_call_kw_methods(self):
+        from core import rpc
+        class Req:
+            def __init__(self, json): self.json = json
+        self.assertTrue(rpc.readonly_call_kw(Req({'params': {'model': 'res.partner', 'method': 'search_read'}})))
+        self.assertFalse(rpc.readonly_call_kw(Req({'params': {'model': 'res.partner', 'method': 'write'}})))
+        reads = [{'model': 'ir.ui.menu', 'method': 'load_menus'}, {'model': 'res.partner', 'method': 'read'}]
+        self.assertTrue(rpc.readonly_call_kw_batch(Req({'params': {'calls': reads}})))
+        self.assertFalse(rpc.readonly_call_kw_batch(Req({'params': {'calls': reads + [{'model': 'res.partner', 'method': 'create'}]}})))
+
+    def test_api_readonly_write_replayed_on_primary(self):
+        import asyncpg
+        from contextlib import asynccontextmanager
+        from core.api import router
+        opened = []
+
+        @asynccontextmanager
+        async def fake_env(session, http_request, readonly=False, method=None):
+            opened.append(readonly)
+            yield readonly
+
+        async def misclassified(readonly):
+            if readonly:
+                raise asyncpg.exceptions.ReadOnlySQLTransactionError("read-only transaction")
+            return 'written'
+
+        async def run():
+            with patch.object(router, '_env', fake_env):
+                res = await router._run_rpc(None, None, True, 'res.partner.search', misclassified)
+            self.assertEqual(res, 'written')
+            self.assertEqual(opened, [True, False])
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
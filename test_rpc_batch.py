@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from core import rpc
+from core.notify import ChangeBuffer
+
+# Savepoint that records commits/rollbacks (asyncpg nested transaction stand-in)
+class FakeSavepoint:
+    def __init__(self, cr):
+        self.cr = cr
+
+    async def __aenter__(self):
+        self.cr.log.append('SAVEPOINT')
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.cr.log.append('ROLLBACK TO' if exc_type else 'RELEASE')
+        return False
+
+class MockCr:
+    def __init__(self):
+        self.log = []
+
+    def savepoint(self):
+        return FakeSavepoint(self)
+
+class FakeModel:
+    def __init__(self, env, ids=()):
+        self.env = env
+        self.ids = list(ids)
+
+    def browse(self, ids):
+        return FakeModel(self.env, ids)
+
+    async def search(self, domain):
+        self.env.calls.append(('search', domain))
+        return FakeModel(self.env, [1, 2])
+
+    async def read(self, fields=None):
+        self.env.calls.append(('read', self.ids))
+        return [{'id': i} for i in self.ids]
+
+    async def unlink(self):
+        self.env.notifications.add('res.partner', 'unlink', self.ids, 1)
+        raise ValueError("Cannot delete")
+
+    async def touch(self):
+        self.env.pending_writes[('x', 1)] = {'a': 1}
+        self.env.notifications.add('res.partner', 'write', self.ids, 1)
+
+    async def recompute(self):
+        self.env.calls.append(('recompute',))
+        self.env.pending_writes.clear()
+
+class FakeRegistry:
+    @staticmethod
+    def get(name):
+        return FakeModel if name == 'res.partner' else None
+
+class MockEnv:
+    registry = FakeRegistry
+
+    def __init__(self):
+        self.cr = MockCr()
+        self.calls = []
+        self.discarded = 0
+        self.to_compute = set()
+        self.pending_writes = {}
+        self.to_relate = {}
+        self.notifications = ChangeBuffer()
+
+    def __getitem__(self, name):
+        return FakeModel(self)
+
+    def discard_pending(self):
+        self.discarded += 1
+
+class TestRpcBatch(unittest.TestCase):
+    def test_ordered_results_one_environment(self):
+        async def run():
+            env = MockEnv()
+            results, failure = await rpc.call_kw_batch(env, [
+                {'model': 'res.partner', 'method': 'search', 'args': [[]]},
+                {'model': 'res.partner', 'method': 'read', 'args': [[1, 2], ['name']]},
+            ])
+            self.assertIsNone(failure)
+            self.assertEqual(results, [{'result': [1, 2]}, {'result': [{'id': 1}, {'id': 2}]}])
+            self.assertEqual(env.calls, [('search', []), ('read', [1, 2])])
+            self.assertEqual(env.cr.log, ['SAVEPOINT', 'RELEASE']) # Whole batch in one savepoint
+        asyncio.run(run())
+
+    def test_atomic_stops_at_first_error(self):
+        async def run():
+            env = MockEnv()
+            results, failure = await rpc.call_kw_batch(env, [
+                {'model': 'res.partner', 'method': 'search', 'args': [[]]},
+                {'model': 'res.partner', 'method': 'unlink', 'args': [[1]]},
+                {'model': 'res.partner', 'method': 'read', 'args': [[1]]},
+            ])
+            self.assertEqual(len(results), 1)
+            index, error = failure
+            self.assertEqual(index, 1)
+            self.assertEqual(error['message'], 'Cannot delete')
+            self.assertEqual(env.cr.log, ['SAVEPOINT', 'ROLLBACK TO'])
+            self.assertEqual(env.discarded, 1)
+            self.assertFalse(env.notifications)
+            self.assertNotIn(('read', [1]), env.calls)
+        asyncio.run(run())
+
+    def test_savepoints_isolate_failures(self):
+        async def run():
+            env = MockEnv()
+            results, failure = await rpc.call_kw_batch(env, [
+                {'model': 'res.partner', 'method': 'unlink', 'args': [[1]]},
+                {'model': 'res.partner', 'method': 'touch', 'args': [[1]]},
+                {'model': 'res.partner', 'method': 'read', 'args': [[1]]},
+            ], savepoints=True)
+            self.assertIsNone(failure)
+            self.assertIn('error', results[0])
+            self.assertEqual(results[2], {'result': [{'id': 1}]})
+            self.assertEqual(env.cr.log, ['SAVEPOINT', 'ROLLBACK TO', 'SAVEPOINT', 'RELEASE', 'SAVEPOINT', 'RELEASE'])
+            self.assertIn(('recompute',), env.calls) # Pending writes flushed inside the savepoint
+            # The rolled back unlink is not announced, the kept write is
+            self.assertEqual(env.notifications._changes, {('res.partner', 'write', 1): {1}})
+        asyncio.run(run())
+
+    def test_invalid_batches(self):
+        async def run():
+            env = MockEnv()
+            with self.assertRaises(rpc.RpcError):
+                await rpc.call_kw_batch(env, [])
+            with self.assertRaises(rpc.RpcError):
+                await rpc.call_kw_batch(env, [{'model': 'res.partner'}])
+            with self.assertRaises(rpc.RpcError):
+                await rpc.call_kw_batch(env, [{'model': 'x', 'method': 'y'}] * (rpc.BATCH_MAX + 1))
+            self.assertEqual(env.cr.log, [])
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
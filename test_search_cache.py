@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+from core.orm import Model
+from core.fields import Char, Many2one, One2many
+from core.env import Environment
+from core.cache import Cache
+from core.generations import ModelGenerations
+from test_cache_coherence import FakeRedis
+
+ROWS = [{'id': i, 'name': f'Cur {i}'} for i in range(1, 6)]
+
+# Mock CR: id searches return ROWS, generation lookups are not recorded
+class MockCr:
+    def __init__(self):
+        self.queries = []
+        self._result = []
+
+    async def execute(self, query, params=None):
+        if query.startswith('SELECT model, gen FROM'):
+            self._result = []
+            return
+        self.queries.append((query, params))
+        if 'ir_rule' in query:
+            self._result = []
+        elif query.startswith('SELECT "id" FROM'):
+            self._result = [{'id': r['id']} for r in ROWS]
+        else:
+            self._result = [r for r in ROWS if r['id'] in (params or [])]
+
+    def fetchall(self):
+        return self._result
+
+class SearchCur(Model):
+    _name = 'test.sc.currency'
+    _cache_search = True
+    _cache_search_max = 10
+    name = Char()
+
+RATES = [{'id': i, 'name': f'Rate {i}', 'currency_id_vals_id': i % 2 or None, 'currency_id_vals_name': 'Cur 1'}
+         for i in (1, 2, 3)]
+
+# Mock CR for rates: every statement answers with the superset rows
+class RateCr(MockCr):
+    async def execute(self, query, params=None):
+        self._result = []
+        if query.startswith('SELECT model, gen FROM') or 'ir_rule' in query:
+            return
+        self.queries.append((query, params))
+        self._result = [{'id': r['id']} for r in RATES] if query.startswith('SELECT "id" FROM') else RATES
+
+class SearchRate(Model):
+    _name = 'test.sc.rate'
+    _cache_search = True
+    name = Char()
+    currency_id = Many2one('test.sc.currency')
+    parent_id = Many2one('test.sc.rate')
+    child_ids = One2many('test.sc.rate', 'parent_id')
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        Cache._setup_l1()
+        Cache.redis = FakeRedis()
+        Cache.use_redis = True
+        Cache.initialized = True
+        ModelGenerations.clear()
+
+    def tearDown(self):
+        Cache.use_redis = False
+
+    def search(self, cr, domain, **kwargs):
+        return asyncio.run(Environment(cr, uid=1)['test.sc.currency'].search(domain, **kwargs))
+
+    def test_identical_search_skips_sql(self):
+        cr = MockCr()
+        first = self.search(cr, [('name', 'ilike', 'Cur')], order='name', limit=5)
+        second = self.search(cr, [('name', 'ilike', 'Cur')], order='name', limit=5)
+        self.assertEqual(first.ids, second.ids)
+        self.assertEqual(len(cr.queries), 1)
+
+        self.search(cr, [('name', 'ilike', 'Cur')], order='name', limit=2) # Other limit, other key
+        self.assertEqual(len(cr.queries), 2)
+
+    def test_generation_and_dirty_transaction(self):
+        cr = MockCr()
+        self.search(cr, [])
+        ModelGenerations.apply({'test.sc.currency': 1}) # Committed change
+        self.search(cr, [])
+        self.assertEqual(len(cr.queries), 2)
+
+        env = Environment(cr, uid=1)
+        env.notifications.add('test.sc.currency', 'create', [6], 1)
+        asyncio.run(env['test.sc.currency'].search([]))
+        self.assertEqual(len(cr.queries), 3)
+
+    def test_size_bound(self):
+        cr = MockCr()
+        SearchCur._cache_search_max = 3
+        try:
+            self.search(cr, [])
+            self.search(cr, [])
+        finally:
+            SearchCur._cache_search_max = 10
+        self.assertEqual(len(cr.queries), 2)
+
+    def test_search_read_and_rules_are_cached(self):
+        async def run():
+            cr = MockCr()
+            env = Environment(cr, uid=1)
+            res = await env['test.sc.currency'].search_read([], ['name'], limit=2)
+            self.assertEqual(res[0]['name'], 'Cur 1')
+
+            user_env = Environment(cr, uid=2)
+            await user_env['test.sc.currency']._apply_ir_rules('read')
+            await user_env['test.sc.currency']._apply_ir_rules('read')
+            self.assertEqual(len([q for q, p in cr.queries if 'ir_rule' in q]), 1)
+        asyncio.run(run())
+
+    def test_search_read_output_matches_sql_path(self):
+        async def run(cached):
+            SearchRate._cache_search = cached
+            try:
+                env = Environment(RateCr(), uid=1)
+                return await env['test.sc.rate'].search_read([], ['name', 'currency_id', 'child_ids'])
+            finally:
+                SearchRate._cache_search = True
+        cached = asyncio.run(run(True))
+        self.assertEqual(cached, asyncio.run(run(False)))
+        self.assertEqual(cached[0], {'id': 1, 'name': 'Rate 1', 'currency_id': (1, 'Cur 1')})
+        self.assertEqual(cached[1]['currency_id'], False)
+
+    def test_dotted_domain_follows_comodel_generation(self):
+        rates = Environment(RateCr(), uid=1)['test.sc.rate']
+        self.assertEqual(rates._domain_models([('currency_id.name', '=', 'EUR'), ('name', '=', 'x')]),
+                         ['test.sc.currency', 'test.sc.rate'])
+        cr = RateCr()
+        search = lambda: asyncio.run(Environment(cr, uid=1)['test.sc.rate'].search([('currency_id.name', '=', 'EUR')]))
+        search()
+        search()
+        self.assertEqual(len(cr.queries), 1)
+        ModelGenerations.apply({'test.sc.currency': 5}) # Currency renamed elsewhere
+        search()
+        self.assertEqual(len(cr.queries), 2)
+
+if __name__ == "__main__":
+    unittest.main()
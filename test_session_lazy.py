@@ -0,0 +1,85 @@
+import asyncio
+import json
+import unittest
+from core.cache import Cache
+from core.session import Session, get_session
+from test_cache_coherence import FakeRedis
+
+class FakeRequest:
+    def __init__(self, cookies=None, headers=None):
+        self.cookies = cookies or {}
+        self.headers = headers or {}
+
+class TestLazySession(unittest.TestCase):
+    def setUp(self):
+        Cache._setup_l1()
+        self.redis = FakeRedis()
+        Cache.redis = self.redis
+        Cache.use_redis = True
+        Cache.initialized = True
+
+    def tearDown(self):
+        Cache.use_redis = False
+
+    def test_anonymous_request_writes_nothing(self):
+        async def run():
+            session = await get_session(FakeRequest())
+            self.assertFalse(session.check_csrf('guess'))
+            self.assertFalse(await session.save_if_dirty())
+            self.assertFalse(session.is_stored)
+            self.assertEqual(self.redis.data, {})
+
+            # Handing out a CSRF token makes it worth storing
+            token = session.csrf_token
+            self.assertTrue(await session.save_if_dirty())
+            loaded = await get_session(FakeRequest(cookies={'session_id': session.sid}))
+            self.assertTrue(loaded.check_csrf(token))
+            self.assertFalse(loaded.is_dirty)
+        asyncio.run(run())
+
+    def test_login_rotate_and_destroy_publish_evictions(self):
+        async def run():
+            session = await Session.new()
+            session.csrf_token
+            await session.save()
+            old_sid = session.sid
+
+            await session.rotate()
+            session.uid = 2
+            self.assertTrue(await session.save_if_dirty())
+            self.assertNotIn(f"session:{old_sid}", self.redis.data)
+            evicted = [json.loads(d) for c, d in self.redis.published if json.loads(d).get('op') == 'del']
+            self.assertIn(f"session:{old_sid}", [k for m in evicted for k in m['k']])
+
+            Cache.memory_store.clear() # Another worker: L1 miss, one Redis read, then L1
+            loaded = await Session.load(session.sid)
+            self.assertEqual(loaded.uid, 2)
+            self.assertIn(f"session:{session.sid}", Cache.memory_store)
+
+            await loaded.destroy()
+            self.assertIsNone(await Session.load(session.sid))
+            self.assertFalse(await loaded.save_if_dirty())
+        asyncio.run(run())
+
+    def test_signed_token_skips_store(self):
+        async def run():
+            session = await Session.new()
+            session.uid = 2
+            session.login = 'admin'
+            token = session.issue_token()
+
+            stateless = await get_session(FakeRequest(headers={'authorization': f'Bearer {token}'}))
+            self.assertTrue(stateless.stateless)
+            self.assertEqual((stateless.uid, stateless.login), (2, 'admin'))
+            stateless.context['lang'] = 'es_ES'
+            stateless.mark_dirty()
+            self.assertFalse(await stateless.save_if_dirty())
+            self.assertEqual(self.redis.data, {})
+
+            fallback = await get_session(FakeRequest(headers={'authorization': 'Bearer forged'}))
+            self.assertFalse(fallback.stateless)
+            self.assertIsNone(fallback.uid)
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core.db_async import AsyncCursor
+from core.slow_query import SlowQueryLog, searching, is_write
+
+class SlowConn:
+    async def fetch(self, query, *args):
+        await asyncio.sleep(0.01)
+        return []
+
+    async def execute(self, query, *args):
+        await asyncio.sleep(0.01)
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def start(self):
+        self.conn.log.append('BEGIN')
+
+    async def rollback(self):
+        self.conn.log.append('ROLLBACK')
+
+# Separate connection used for EXPLAIN sampling
+class ExplainConn:
+    def __init__(self):
+        self.log = []
+
+    def is_closed(self):
+        return False
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query, *args):
+        self.log.append(query)
+
+    async def fetchval(self, query, *args):
+        self.log.append(query)
+        return '[{"Plan": {"Node Type": "Seq Scan"}}]'
+
+class TestSlowQueryLog(unittest.TestCase):
+    def setUp(self):
+        SlowQueryLog.clear()
+        self.explain_conn = ExplainConn()
+        async def connect():
+            return self.explain_conn
+        self.patches = [
+            patch.object(SlowQueryLog, 'THRESHOLD_MS', 5),
+            patch.object(SlowQueryLog, 'EXPLAIN_RATE', 1.0),
+            patch.object(SlowQueryLog, '_conn', None),
+            patch('core.db_async.AsyncDatabase.connect', connect),
+            patch('core.logger.logger'),
+        ]
+        for p in self.patches: p.start()
+
+    def tearDown(self):
+        for p in self.patches: p.stop()
+        SlowQueryLog.clear()
+
+    def test_slow_read_is_explained_with_analyze(self):
+        async def run():
+            cr = AsyncCursor(SlowConn())
+            cr.uid = 7
+            with searching('res.partner', [('name', 'ilike', 'agro')]):
+                await cr.execute('SELECT id FROM "res_partner" WHERE "name" ILIKE $1', ('%agro%',))
+            await asyncio.gather(*SlowQueryLog._tasks)
+            entry = SlowQueryLog.recent()[0]
+            self.assertEqual(entry['sql'], 'SELECT id FROM "res_partner" WHERE "name" ILIKE ?')
+            self.assertEqual(entry['param_types'], ['str'])
+            self.assertIn('test_slow_query.py', entry['call_site'])
+            self.assertEqual(entry['search']['model'], 'res.partner')
+            self.assertIn('agro', entry['search']['domain'])
+            self.assertEqual(entry['plan'][0]['Plan']['Node Type'], 'Seq Scan')
+            log = self.explain_conn.log
+            self.assertEqual(log[0], 'BEGIN')
+            self.assertTrue(log[-2].startswith('EXPLAIN (ANALYZE, BUFFERS'))
+            self.assertEqual(log[-1], 'ROLLBACK')
+            self.assertIn("SELECT set_config('app.current_uid', $1::text, true)", log)
+        asyncio.run(run())
+
+    def test_write_gets_plain_explain(self):
+        async def run():
+            cr = AsyncCursor(SlowConn())
+            await cr.execute('UPDATE "res_partner" SET "name" = $1 WHERE id = $2', ('A', 1))
+            await asyncio.gather(*SlowQueryLog._tasks)
+            self.assertTrue(SlowQueryLog.recent()[0]['write'])
+            self.assertTrue(self.explain_conn.log[-2].startswith('EXPLAIN (FORMAT JSON)'))
+        asyncio.run(run())
+
+    def test_fast_queries_and_buffer_bound(self):
+        async def run():
+            with patch.object(SlowQueryLog, 'THRESHOLD_MS', 1000):
+                await AsyncCursor(SlowConn()).execute('SELECT 1')
+            self.assertEqual(SlowQueryLog.recent(), [])
+        asyncio.run(run())
+        for i in range(SlowQueryLog.entries.maxlen + 5):
+            SlowQueryLog.entries.append({'n': i})
+        self.assertEqual(len(SlowQueryLog.entries), SlowQueryLog.entries.maxlen)
+
+    def test_is_write(self):
+        self.assertFalse(is_write('SELECT * FROM t'))
+        self.assertFalse(is_write('WITH x AS (SELECT 1) SELECT * FROM x'))
+        self.assertTrue(is_write('WITH b AS (INSERT INTO t VALUES (1) RETURNING id) SELECT * FROM b'))
+        self.assertTrue(is_write("SELECT nextval('seq')"))
+        self.assertTrue(is_write('DELETE FROM t'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core import sql_stats
+from core.db_async import AsyncCursor
+from core.sql_stats import QueryStats, fingerprint
+
+class FakeConn:
+    async def fetch(self, query, *args):
+        return []
+
+    async def execute(self, query, *args):
+        pass
+
+class TestSqlStats(unittest.TestCase):
+    def test_fingerprint(self):
+        a = fingerprint('SELECT "name" FROM "res_partner" WHERE id = $1')
+        b = fingerprint('SELECT "name"   FROM "res_partner"\n WHERE id = 42')
+        self.assertEqual(a, b)
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE name = 'O''Neil' AND id IN (1, 2, 3)"),
+                         "SELECT * FROM t WHERE name = ? AND id IN (?+)")
+
+    def test_counts_and_slowest(self):
+        stats = QueryStats()
+        stats.record('SELECT 1', 0.002)
+        stats.record('SELECT 2', 0.010)
+        stats.record('UPDATE t SET a = $1', 0.001)
+        summary = stats.summary()
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['distinct'], 2)
+        self.assertEqual(summary['slowest'], 'SELECT ?')
+        self.assertEqual(summary['slowest_ms'], 10.0)
+        self.assertEqual(summary['n_plus_one'], [])
+
+    def test_n_plus_one_with_call_site(self):
+        async def run():
+            cr = AsyncCursor(FakeConn())
+            cr.stats = QueryStats(threshold=5)
+            for i in range(8):
+                await cr.execute('SELECT "name" FROM "res_partner" WHERE id = $1', (i,))
+            suspects = cr.stats.n_plus_one()
+            self.assertEqual(len(suspects), 1)
+            self.assertEqual(suspects[0]['count'], 8)
+            self.assertIn('test_sql_stats.py', suspects[0]['site'])
+            self.assertIn('n+1=1', cr.stats.header())
+        asyncio.run(run())
+
+    def test_report_is_structured_and_filtered(self):
+        stats = QueryStats()
+        stats.record('SELECT 1', 0.001)
+        with patch('core.logger.logger') as logger:
+            sql_stats.report('/web/dataset/call_kw', stats)
+            logger.info.assert_not_called() # Light request: nothing logged
+
+            stats.sites['SELECT ?'] = 'addons/sale/models/sale_order.py:10 in _compute -> read'
+            sql_stats.report('/web/dataset/call_kw', stats, method='sale.order.read')
+            context = logger.warning.call_args.kwargs['extra']['context']
+            self.assertEqual(context['event'], 'sql_stats')
+            self.assertEqual(context['method'], 'sale.order.read')
+            self.assertEqual(context['count'], 1)
+
+if __name__ == "__main__":
+    unittest.main()